@@ -1 +0,0 @@
-# This file is intentionally left empty to make the directory a Python package.
@@ -0,0 +1,117 @@
+"""Baseline schema
+
+Tables as created by Base.metadata.create_all before migrations were
+introduced; existing databases are stamped at this revision. Everything
+added since is in later revisions.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 01:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('api_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_api_keys_id'), 'api_keys', ['id'], unique=False)
+    op.create_index(op.f('ix_api_keys_key'), 'api_keys', ['key'], unique=True)
+    op.create_table('servers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('game_type', sa.String(), nullable=True),
+    sa.Column('image', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('memory_limit', sa.Integer(), nullable=True),
+    sa.Column('cpu_limit', sa.Float(), nullable=True),
+    sa.Column('disk_limit', sa.Integer(), nullable=True),
+    sa.Column('port', sa.Integer(), nullable=True),
+    sa.Column('ip_address', sa.String(), nullable=True),
+    sa.Column('container_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_servers_game_type'), 'servers', ['game_type'], unique=False)
+    op.create_index(op.f('ix_servers_id'), 'servers', ['id'], unique=False)
+    op.create_index(op.f('ix_servers_name'), 'servers', ['name'], unique=False)
+    op.create_table('backups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('path', sa.String(), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_backups_id'), 'backups', ['id'], unique=False)
+    op.create_table('server_variables',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(), nullable=True),
+    sa.Column('value', sa.String(), nullable=True),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_server_variables_id'), 'server_variables', ['id'], unique=False)
+    op.create_table('user_server_association',
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+    )
+
+
+def downgrade():
+    op.drop_table('user_server_association')
+    op.drop_index(op.f('ix_server_variables_id'), table_name='server_variables')
+    op.drop_table('server_variables')
+    op.drop_index(op.f('ix_backups_id'), table_name='backups')
+    op.drop_table('backups')
+    op.drop_index(op.f('ix_servers_name'), table_name='servers')
+    op.drop_index(op.f('ix_servers_id'), table_name='servers')
+    op.drop_index(op.f('ix_servers_game_type'), table_name='servers')
+    op.drop_table('servers')
+    op.drop_index(op.f('ix_api_keys_key'), table_name='api_keys')
+    op.drop_index(op.f('ix_api_keys_id'), table_name='api_keys')
+    op.drop_table('api_keys')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
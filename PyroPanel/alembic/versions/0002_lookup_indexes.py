@@ -0,0 +1,67 @@
+"""Indexes on foreign key lookups, primary key for user_server_association
+
+Every per-server variable and backup lookup, per-owner server listing and
+per-user API key listing was a full table scan. The association table had
+no key at all, so duplicate grants were possible; it is rebuilt with a
+(user_id, server_id) primary key, keeping one row per pair.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 01:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_server_variables_server_id'), 'server_variables', ['server_id'], unique=False)
+    op.create_index(op.f('ix_backups_server_id'), 'backups', ['server_id'], unique=False)
+    op.create_index(op.f('ix_servers_owner_id'), 'servers', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_api_keys_user_id'), 'api_keys', ['user_id'], unique=False)
+
+    # Rebuild the association table with a composite key, dropping
+    # duplicate and incomplete rows on the way
+    op.create_table('user_server_association_new',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('server_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'server_id')
+    )
+    op.execute(
+        "INSERT INTO user_server_association_new (user_id, server_id) "
+        "SELECT DISTINCT user_id, server_id FROM user_server_association "
+        "WHERE user_id IS NOT NULL AND server_id IS NOT NULL"
+    )
+    op.drop_table('user_server_association')
+    op.rename_table('user_server_association_new', 'user_server_association')
+    op.create_index(op.f('ix_user_server_association_server_id'), 'user_server_association', ['server_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_server_association_server_id'), table_name='user_server_association')
+    op.create_table('user_server_association_old',
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+    )
+    op.execute(
+        "INSERT INTO user_server_association_old (user_id, server_id) "
+        "SELECT user_id, server_id FROM user_server_association"
+    )
+    op.drop_table('user_server_association')
+    op.rename_table('user_server_association_old', 'user_server_association')
+
+    op.drop_index(op.f('ix_api_keys_user_id'), table_name='api_keys')
+    op.drop_index(op.f('ix_servers_owner_id'), table_name='servers')
+    op.drop_index(op.f('ix_backups_server_id'), table_name='backups')
+    op.drop_index(op.f('ix_server_variables_server_id'), table_name='server_variables')
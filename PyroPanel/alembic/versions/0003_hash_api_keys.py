@@ -0,0 +1,58 @@
+"""Store API keys as SHA-256 digests with a lookup prefix
+
+Existing keys keep working: their first characters become the prefix and
+the plaintext column is dropped. Downgrading can't recover the keys, so
+keys created before the downgrade have to be reissued.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 01:16:57.087273
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+PREFIX_LENGTH = 8
+
+
+def upgrade():
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('prefix', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('key_hash', sa.String(length=64), nullable=True))
+
+    api_keys = sa.table('api_keys', sa.column('id', sa.Integer), sa.column('key', sa.String),
+                        sa.column('prefix', sa.String), sa.column('key_hash', sa.String))
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(api_keys.c.id, api_keys.c.key).where(api_keys.c.key.isnot(None))).all()
+    for key_id, key in rows:
+        connection.execute(
+            api_keys.update().where(api_keys.c.id == key_id).values(
+                prefix=key[:PREFIX_LENGTH],
+                key_hash=hashlib.sha256(key.encode()).hexdigest(),
+            )
+        )
+
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_keys_key'))
+        batch_op.drop_column('key')
+        batch_op.create_index(batch_op.f('ix_api_keys_prefix'), ['prefix'], unique=False)
+        batch_op.create_index(batch_op.f('ix_api_keys_key_hash'), ['key_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_keys_key_hash'))
+        batch_op.drop_index(batch_op.f('ix_api_keys_prefix'))
+        batch_op.add_column(sa.Column('key', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_api_keys_key'), ['key'], unique=True)
+        batch_op.drop_column('key_hash')
+        batch_op.drop_column('prefix')
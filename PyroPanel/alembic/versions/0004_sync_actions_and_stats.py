@@ -0,0 +1,158 @@
+"""Sync revisions, tombstones, server actions, stat samples and rollups
+
+Everything the models gained after the API key change. Existing servers
+are numbered into the sync counter and existing backups are marked as
+full archives.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 01:30:17.071889
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('host_stat_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('host', sa.String(), nullable=True),
+    sa.Column('resolution', sa.Integer(), nullable=True),
+    sa.Column('bucket', sa.Integer(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=True),
+    sa.Column('cpu_avg', sa.Float(), nullable=True),
+    sa.Column('cpu_max', sa.Float(), nullable=True),
+    sa.Column('memory_avg', sa.Float(), nullable=True),
+    sa.Column('memory_max', sa.Float(), nullable=True),
+    sa.Column('memory_used_avg', sa.Float(), nullable=True),
+    sa.Column('disk_avg', sa.Float(), nullable=True),
+    sa.Column('disk_max', sa.Float(), nullable=True),
+    sa.Column('disk_used_avg', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('host', 'resolution', 'bucket', name='uq_host_stat_rollups_bucket')
+    )
+    op.create_table('host_stat_samples',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('host', sa.String(), nullable=True),
+    sa.Column('ts', sa.Integer(), nullable=True),
+    sa.Column('cpu_percent', sa.Float(), nullable=True),
+    sa.Column('memory_used', sa.BigInteger(), nullable=True),
+    sa.Column('memory_total', sa.BigInteger(), nullable=True),
+    sa.Column('memory_percent', sa.Float(), nullable=True),
+    sa.Column('disk_used', sa.BigInteger(), nullable=True),
+    sa.Column('disk_total', sa.BigInteger(), nullable=True),
+    sa.Column('disk_percent', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_host_stat_samples_host_ts', 'host_stat_samples', ['host', 'ts'], unique=False)
+
+    op.create_table('server_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.Column('revision', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_server_tombstones_id'), 'server_tombstones', ['id'], unique=False)
+    op.create_index(op.f('ix_server_tombstones_revision'), 'server_tombstones', ['revision'], unique=False)
+    op.create_index(op.f('ix_server_tombstones_server_id'), 'server_tombstones', ['server_id'], unique=False)
+
+    op.create_table('sync_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('server_actions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_server_actions_id'), 'server_actions', ['id'], unique=False)
+    op.create_index(op.f('ix_server_actions_server_id'), 'server_actions', ['server_id'], unique=False)
+    op.create_index(op.f('ix_server_actions_status'), 'server_actions', ['status'], unique=False)
+
+    op.create_table('server_stat_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.Column('resolution', sa.Integer(), nullable=True),
+    sa.Column('bucket', sa.Integer(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=True),
+    sa.Column('cpu_avg', sa.Float(), nullable=True),
+    sa.Column('cpu_max', sa.Float(), nullable=True),
+    sa.Column('memory_avg', sa.Float(), nullable=True),
+    sa.Column('memory_max', sa.BigInteger(), nullable=True),
+    sa.Column('disk_avg', sa.Float(), nullable=True),
+    sa.Column('disk_max', sa.BigInteger(), nullable=True),
+    sa.Column('players_avg', sa.Float(), nullable=True),
+    sa.Column('players_max', sa.Integer(), nullable=True),
+    sa.Column('uptime_max', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('server_id', 'resolution', 'bucket', name='uq_server_stat_rollups_bucket')
+    )
+    op.create_table('server_stat_samples',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_id', sa.Integer(), nullable=True),
+    sa.Column('ts', sa.Integer(), nullable=True),
+    sa.Column('cpu_usage', sa.Float(), nullable=True),
+    sa.Column('memory_usage', sa.BigInteger(), nullable=True),
+    sa.Column('disk_usage', sa.BigInteger(), nullable=True),
+    sa.Column('uptime', sa.Integer(), nullable=True),
+    sa.Column('player_count', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['server_id'], ['servers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_server_stat_samples_server_ts', 'server_stat_samples', ['server_id', 'ts'], unique=False)
+
+    op.add_column('backups', sa.Column('kind', sa.String(), nullable=True))
+    op.execute("UPDATE backups SET kind = 'full'")
+
+    # Existing servers get revisions 1..n in id order and the counter starts
+    # after them, so the first daemon sync after upgrading sees every server
+    op.add_column('servers', sa.Column('revision', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_servers_revision'), 'servers', ['revision'], unique=False)
+    op.execute("UPDATE servers SET revision = (SELECT COUNT(*) FROM servers AS s WHERE s.id <= servers.id)")
+    op.execute("INSERT INTO sync_counters (name, value) SELECT 'servers', COUNT(*) FROM servers")
+
+
+def downgrade():
+    with op.batch_alter_table('servers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_servers_revision'))
+        batch_op.drop_column('revision')
+
+    with op.batch_alter_table('backups', schema=None) as batch_op:
+        batch_op.drop_column('kind')
+
+    op.drop_index('ix_server_stat_samples_server_ts', table_name='server_stat_samples')
+    op.drop_table('server_stat_samples')
+    op.drop_table('server_stat_rollups')
+
+    op.drop_index(op.f('ix_server_actions_status'), table_name='server_actions')
+    op.drop_index(op.f('ix_server_actions_server_id'), table_name='server_actions')
+    op.drop_index(op.f('ix_server_actions_id'), table_name='server_actions')
+    op.drop_table('server_actions')
+    op.drop_table('sync_counters')
+
+    op.drop_index(op.f('ix_server_tombstones_server_id'), table_name='server_tombstones')
+    op.drop_index(op.f('ix_server_tombstones_revision'), table_name='server_tombstones')
+    op.drop_index(op.f('ix_server_tombstones_id'), table_name='server_tombstones')
+    op.drop_table('server_tombstones')
+
+    op.drop_index('ix_host_stat_samples_host_ts', table_name='host_stat_samples')
+    op.drop_table('host_stat_samples')
+    op.drop_table('host_stat_rollups')
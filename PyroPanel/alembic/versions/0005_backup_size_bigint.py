@@ -0,0 +1,31 @@
+"""Store backup sizes as 64-bit integers
+
+backups.size was a 32-bit INTEGER on PostgreSQL and MySQL, so registering
+an archive of 2 GiB or more failed with an out of range error. SQLite
+integers are 64-bit already; the table is rebuilt there only to keep the
+declared type in line with the model.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 01:36:39.665970
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('backups', schema=None) as batch_op:
+        batch_op.alter_column('size', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('backups', schema=None) as batch_op:
+        batch_op.alter_column('size', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=True)
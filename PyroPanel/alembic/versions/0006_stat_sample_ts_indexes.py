@@ -0,0 +1,29 @@
+"""Indexes on stat sample timestamps
+
+Latest-sample lookups for the dashboard, rollups and retention all filter
+samples by time across every server or host; the (server_id, ts) and
+(host, ts) indexes couldn't serve them, so each was a full table scan.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 01:40:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_server_stat_samples_ts_server', 'server_stat_samples', ['ts', 'server_id'], unique=False)
+    op.create_index('ix_host_stat_samples_ts_host', 'host_stat_samples', ['ts', 'host'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_host_stat_samples_ts_host', table_name='host_stat_samples')
+    op.drop_index('ix_server_stat_samples_ts_server', table_name='server_stat_samples')
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from typing import Dict, Set
+
+logger = logging.getLogger("PyroPanel")
+
+class ActionHub:
+    """
+    Fan-out of new server actions to daemons connected over WebSocket
+
+    Each connected daemon gets its own queue. The hub is per process: with
+    several web workers a daemon only hears about actions recorded by the
+    worker it is connected to, and picks up the rest through the backlog
+    sent on connect or the polling fallback.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a daemon connection"""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a daemon connection"""
+        self._subscribers.discard(queue)
+
+    def publish(self, action: Dict) -> int:
+        """Push an action to every connected daemon, returns the number reached"""
+        delivered = 0
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(action)
+                delivered += 1
+            except asyncio.QueueFull:
+                # A stuck connection will get it from the backlog after reconnecting
+                logger.warning("Action channel queue full, dropping live delivery")
+        return delivered
+
+# Shared hub for this process
+action_hub = ActionHub()
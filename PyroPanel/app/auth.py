@@ -1,11 +1,17 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import schemas, models
+from app.cache import TTLCache
 from app.database import get_db
 import os
 from dotenv import load_dotenv
@@ -18,8 +24,30 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Resolved principals by token subject, so authenticated requests skip the
+# user query; crud.update_user/delete_user invalidate entries
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+# API keys are random hex strings; the first characters are stored in clear
+# to find the row, the whole key only as a SHA-256 digest. Resolved keys are
+# cached by digest so daemons polling the API don't hit the database.
+API_KEY_PREFIX_LENGTH = 8
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "60"))
+api_key_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=API_KEY_CACHE_TTL)
+
+# Password hashing; hashes using another scheme or a different bcrypt cost
+# are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+pwd_context = CryptContext(schemes=PASSWORD_SCHEMES, deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Hashing is CPU-bound and takes ~250 ms at the default cost, so it runs in
+# a small dedicated pool rather than on the event loop; the pool size caps
+# how many hashes run at once during a login burst
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+_hash_executor = ThreadPoolExecutor(max_workers=max(1, PASSWORD_HASH_WORKERS), thread_name_prefix="password-hash")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -32,6 +60,29 @@ def get_password_hash(password):
     """Generate password hash"""
     return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    """Generate password hash in the hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the hashing pool
+
+    Returns (valid, new_hash); new_hash is set when the stored hash uses an
+    outdated scheme or cost and should be replaced.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+def api_key_digest(key: str) -> str:
+    """Stored form of an API key"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -46,13 +97,56 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get current user from JWT token"""
-    credentials_exception = HTTPException(
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """Get current user from a JWT or API key bearer token"""
+    return await authenticate_token(token, db)
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def authenticate_api_key(key: str, db: AsyncSession):
+    """Resolve an API key to its owner, raising HTTPException otherwise"""
+    digest = api_key_digest(key)
+    user = api_key_cache.get(digest)
+    if user is not None:
+        return user
+    
+    rows = (await db.execute(
+        select(models.ApiKey, models.User)
+        .join(models.User, models.User.id == models.ApiKey.user_id)
+        .where(models.ApiKey.prefix == key[:API_KEY_PREFIX_LENGTH])
+    )).all()
+    match = None
+    for api_key, db_user in rows:
+        # Compare every candidate so timing doesn't depend on the match
+        if hmac.compare_digest(api_key.key_hash, digest):
+            match = (api_key, db_user)
+    if match is None:
+        raise _credentials_exception()
+    
+    api_key, db_user = match
+    ttl = None
+    if api_key.expires_at is not None:
+        ttl = (_as_utc(api_key.expires_at) - datetime.now(timezone.utc)).total_seconds()
+        if ttl <= 0:
+            raise _credentials_exception()
+    if not db_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    
+    user = schemas.User.model_validate(db_user)
+    api_key_cache.set(digest, user, ttl=ttl)
+    return user
+
+async def authenticate_token(token: str, db: AsyncSession):
+    """Resolve a bearer token (JWT or API key) to an active user, raising HTTPException otherwise"""
+    if token.count(".") != 2:
+        return await authenticate_api_key(token, db)
+    
+    credentials_exception = _credentials_exception()
     
     try:
         # Decode JWT token
@@ -66,11 +160,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    # Get user from database
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
-    
+    # Get user from the cache or the database
+    user = principal_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        db_user = await db.scalar(select(models.User).where(models.User.username == token_data.username))
+        if db_user is None:
+            raise credentials_exception
+        user = schemas.User.model_validate(db_user)
+        principal_cache.set(token_data.username, user)
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
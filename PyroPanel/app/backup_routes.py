@@ -0,0 +1,233 @@
+import os
+import re
+from email.utils import formatdate
+from typing import List, Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.auth import get_current_user
+from app.database import get_db
+
+router = APIRouter(tags=["backups"])
+
+# Where uploaded archives are stored; downloads need the panel to see the
+# daemon's backup_dir (same host or shared storage)
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_UPLOAD_MAX_SIZE = int(os.getenv("BACKUP_UPLOAD_MAX_SIZE", str(64 * 1024 ** 3)))
+
+ARCHIVE_EXTENSIONS = (".tar.gz", ".tgz", ".tar.zst")
+ARCHIVE_MAGIC = (b"\x1f\x8b", b"\x28\xb5\x2f\xfd")  # gzip, zstd
+CHUNK_SIZE = 1024 * 1024
+
+async def get_accessible_server(server_id: int, current_user: schemas.User, db: AsyncSession):
+    """Get a server the current user may access, or raise 404/403"""
+    server = await crud.get_server(db, server_id=server_id)
+    if server is None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    if current_user.role != "admin" and server.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return server
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end)
+
+    Returns None for no or multi-range requests (served in full); raises
+    416 when the range can't be satisfied.
+    """
+    if not header:
+        return None
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", header)
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong validator for a backup file"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+class BackupFileResponse(Response):
+    """
+    Streams (part of) a file without loading it into memory
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server
+    offers it, otherwise reads the file in chunks in a worker thread.
+    """
+
+    def __init__(self, path: str, stat_result: os.stat_result, filename: str,
+                 byte_range: Optional[Tuple[int, int]] = None):
+        super().__init__(
+            status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            media_type="application/octet-stream"
+        )
+        size = stat_result.st_size
+        self.path = path
+        self.start, self.end = byte_range or (0, size - 1)
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["etag"] = file_etag(stat_result)
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        self.headers["content-disposition"] = f'attachment; filename="{filename}"'
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if scope["method"] == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank underneath us; end the body rather than hang
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+@router.get("/servers/{server_id}/backups", response_model=List[schemas.Backup])
+async def read_backups(
+    server_id: int,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List a server's backups"""
+    await get_accessible_server(server_id, current_user, db)
+    return await crud.get_backups(db, server_id=server_id)
+
+@router.api_route("/servers/{server_id}/backups/{backup_id}/download", methods=["GET", "HEAD"])
+async def download_backup(
+    server_id: int,
+    backup_id: int,
+    request: Request,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Download a backup archive (supports Range and If-Range for resuming)"""
+    await get_accessible_server(server_id, current_user, db)
+    backup = await crud.get_backup(db, backup_id=backup_id)
+    if backup is None or backup.server_id != server_id:
+        raise HTTPException(status_code=404, detail="Backup not found")
+    if backup.kind == "incremental":
+        raise HTTPException(status_code=409, detail="Incremental backups are not a single archive")
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, backup.path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Backup file not found")
+
+    # A resumed download only gets a range if the file is still the same
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() in (file_etag(stat_result), formatdate(stat_result.st_mtime, usegmt=True)):
+        byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+
+    return BackupFileResponse(backup.path, stat_result, os.path.basename(backup.path), byte_range)
+
+def _archive_name(name: str) -> str:
+    """Validate the file name of an uploaded archive"""
+    name = os.path.basename(name.strip())
+    if not name or name.startswith(".") or not name.endswith(ARCHIVE_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Archive name must end with one of {', '.join(ARCHIVE_EXTENSIONS)}"
+        )
+    return name
+
+@router.post("/servers/{server_id}/backups/upload", response_model=schemas.Backup, status_code=status.HTTP_201_CREATED)
+async def upload_backup(
+    server_id: int,
+    name: str,
+    request: Request,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload an external archive as a backup
+
+    The request body is the raw archive; it is streamed to disk in chunks
+    and registered once complete.
+    """
+    await get_accessible_server(server_id, current_user, db)
+    name = _archive_name(name)
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > BACKUP_UPLOAD_MAX_SIZE:
+        raise HTTPException(status_code=413, detail="Archive too large")
+
+    backup_dir = os.path.join(BACKUP_DIR, str(server_id))
+    await run_in_threadpool(os.makedirs, backup_dir, exist_ok=True)
+    path = os.path.join(backup_dir, name)
+    if await run_in_threadpool(os.path.exists, path):
+        raise HTTPException(status_code=409, detail="A backup with this name already exists")
+
+    part_path = path + ".part"
+    size = 0
+    buffer = bytearray()
+    try:
+        f = await run_in_threadpool(open, part_path, "xb")
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="An upload with this name is already in progress")
+    try:
+        async for chunk in request.stream():
+            if size == 0 and chunk and not chunk.startswith(ARCHIVE_MAGIC):
+                raise HTTPException(status_code=415, detail="Not a gzip or zstd archive")
+            size += len(chunk)
+            if size > BACKUP_UPLOAD_MAX_SIZE:
+                raise HTTPException(status_code=413, detail="Archive too large")
+            buffer += chunk
+            if len(buffer) >= CHUNK_SIZE:
+                await run_in_threadpool(f.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(f.write, bytes(buffer))
+        await run_in_threadpool(f.close)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty archive")
+        await run_in_threadpool(os.replace, part_path, path)
+    except BaseException:
+        f.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    backup = schemas.BackupCreate(name=name, path=path, size=size, kind="full")
+    return await crud.create_backup(db, backup=backup, server_id=server_id)
@@ -1,29 +1,43 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+import time
+from sqlalchemy import and_, delete, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func
 from typing import List, Optional
-from app import models, schemas
-from app.auth import get_password_hash, verify_password
+from app import models, schemas, timeseries
+from app.response_cache import response_cache
+from app.serialization import BACKUP_FIELDS, SERVER_FIELDS, VARIABLE_FIELDS
+from app.auth import API_KEY_PREFIX_LENGTH, api_key_cache, api_key_digest, hash_password, principal_cache, verify_and_update_password
 
 # User CRUD operations
-def get_user(db: Session, user_id: int):
+async def get_user(db: AsyncSession, user_id: int):
     """Get user by ID"""
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
 
-def get_user_by_username(db: Session, username: str):
+async def get_user_by_username(db: AsyncSession, username: str):
     """Get user by username"""
-    return db.query(models.User).filter(models.User.username == username).first()
+    return await db.scalar(select(models.User).where(models.User.username == username))
 
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     """Get user by email"""
-    return db.query(models.User).filter(models.User.email == email).first()
+    return await db.scalar(select(models.User).where(models.User.email == email))
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
+def _page(query, model, skip: int, limit: int, after_id: Optional[int]):
+    """Order by id and apply a keyset cursor (after_id) or, for old clients, an offset"""
+    query = query.order_by(model.id).limit(limit)
+    if after_id is not None:
+        return query.where(model.id > after_id)
+    return query.offset(skip) if skip else query
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
     """Get list of users"""
-    return db.query(models.User).offset(skip).limit(limit).all()
+    result = await db.scalars(_page(select(models.User), models.User, skip, limit, after_id))
+    return result.all()
 
-def create_user(db: Session, user: schemas.UserCreate):
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
     """Create new user"""
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -32,62 +46,186 @@ def create_user(db: Session, user: schemas.UserCreate):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user: schemas.UserCreate):
+async def update_user(db: AsyncSession, user_id: int, user: schemas.UserCreate):
     """Update user"""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id)
     if db_user:
+        old_username = db_user.username
         db_user.username = user.username
         db_user.email = user.email
         db_user.full_name = user.full_name
         db_user.role = user.role
         
         if user.password:
-            db_user.hashed_password = get_password_hash(user.password)
+            db_user.hashed_password = await hash_password(user.password)
         
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        principal_cache.pop(old_username)
+        api_key_cache.clear()
+        await db.refresh(db_user)
     return db_user
 
-def delete_user(db: Session, user_id: int):
+async def delete_user(db: AsyncSession, user_id: int):
     """Delete user"""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id)
     if db_user:
-        db.delete(db_user)
-        db.commit()
+        await db.delete(db_user)
+        await db.commit()
+        principal_cache.pop(db_user.username)
+        api_key_cache.clear()
     return db_user
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """Authenticate user with username and password"""
-    user = get_user_by_username(db, username)
+    user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # Stored hash predates the current scheme or cost
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
+# Sync revision helpers
+async def next_revision(db: AsyncSession, name: str = "servers", count: int = 1) -> int:
+    """
+    Atomically increment and return a sync counter
+
+    With count > 1 a block of revisions is reserved and the last one is
+    returned; the block is (result - count + 1) .. result.
+    """
+    result = await db.execute(
+        update(models.SyncCounter)
+        .where(models.SyncCounter.name == name)
+        .values(value=models.SyncCounter.value + count)
+    )
+    if result.rowcount == 0:
+        db.add(models.SyncCounter(name=name, value=count))
+        await db.flush()
+        return count
+    return await db.scalar(select(models.SyncCounter.value).where(models.SyncCounter.name == name))
+
+async def get_revision(db: AsyncSession, name: str = "servers") -> int:
+    """Get the current value of a sync counter"""
+    value = await db.scalar(select(models.SyncCounter.value).where(models.SyncCounter.name == name))
+    return value or 0
+
+async def touch_server(db: AsyncSession, db_server: models.Server):
+    """Give a server a new sync revision (call before committing a change)"""
+    db_server.revision = await next_revision(db)
+    response_cache.invalidate_server(db_server.id)
+
+async def get_sync_floor(db: AsyncSession) -> int:
+    """Oldest revision an incremental sync can start from (older tombstones are pruned)"""
+    floor = await db.scalar(
+        select(models.SyncCounter.value).where(models.SyncCounter.name == timeseries.TOMBSTONE_FLOOR)
+    )
+    return floor or 0
+
+async def get_server_changes(db: AsyncSession, since: int = 0):
+    """
+    Get servers changed and deleted after revision `since`
+
+    Returns (revision, servers, deleted_ids), servers as plain dicts (see
+    get_server_dicts). The revision is read first so a change committed
+    while the lists are being read is sent again on the next sync rather
+    than skipped.
+    """
+    revision = await get_revision(db)
+    servers = await _server_dicts(db, select(models.Server).where(models.Server.revision > since).order_by(models.Server.id))
+    deleted = []
+    if since > 0:
+        deleted = (await db.scalars(
+            select(models.ServerTombstone.server_id).where(models.ServerTombstone.revision > since)
+        )).all()
+    return revision, servers, deleted
+
+# Server loading strategy: variables and backups are only loaded where a
+# server is serialized as schemas.Server, with one IN query each however
+# many servers are loaded. Listings don't load ORM objects at all, see
+# get_server_dicts.
+SERVER_DETAIL_OPTIONS = (
+    selectinload(models.Server.variables),
+    selectinload(models.Server.backups),
+)
+
 # Server CRUD operations
-def get_server(db: Session, server_id: int):
-    """Get server by ID"""
-    return db.query(models.Server).filter(models.Server.id == server_id).first()
+async def get_server(db: AsyncSession, server_id: int):
+    """Get server by ID, without its variables and backups (ownership checks, status updates)"""
+    return await db.scalar(select(models.Server).where(models.Server.id == server_id))
 
-def get_servers(db: Session, skip: int = 0, limit: int = 100):
-    """Get list of all servers"""
-    return db.query(models.Server).offset(skip).limit(limit).all()
+async def get_server_detail(db: AsyncSession, server_id: int):
+    """Get server by ID with variables and backups, reloading it if already in the session"""
+    return await db.scalar(
+        select(models.Server).options(*SERVER_DETAIL_OPTIONS).where(models.Server.id == server_id)
+        .execution_options(populate_existing=True)
+    )
 
-def get_user_servers(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """Get servers owned by or accessible to a user"""
-    return db.query(models.Server).filter(
+async def get_server_version(db: AsyncSession, server_id: int):
+    """Get a server's (revision, owner_id) without loading it, None if it doesn't exist"""
+    result = await db.execute(
+        select(models.Server.revision, models.Server.owner_id).where(models.Server.id == server_id)
+    )
+    return result.first()
+
+def _user_servers_query(user_id: int):
+    return select(models.Server).where(
         (models.Server.owner_id == user_id) | 
         (models.Server.users_with_access.any(models.User.id == user_id))
-    ).offset(skip).limit(limit).all()
+    )
 
-def create_server(db: Session, server: schemas.ServerCreate, user_id: int):
-    """Create new server"""
-    db_server = models.Server(
+# Read-only server loading for API responses: plain rows shaped like
+# schemas.Server, no ORM objects. A page costs three queries however many
+# servers it holds (servers, variables, backups); children are fetched per
+# chunk of IDs to stay under bind parameter limits.
+IN_CHUNK_SIZE = 1000
+
+async def _attach_children(db: AsyncSession, servers: List[dict], model, fields, key: str):
+    by_id = {server["id"]: server[key] for server in servers}
+    ids = list(by_id)
+    columns = [getattr(model, field) for field in fields]
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        rows = await db.execute(
+            select(*columns).where(model.server_id.in_(ids[start:start + IN_CHUNK_SIZE])).order_by(model.id)
+        )
+        for row in rows:
+            child = dict(zip(fields, row))
+            by_id[child["server_id"]].append(child)
+
+async def server_dicts_from_rows(db: AsyncSession, rows) -> List[dict]:
+    """Shape rows of SERVER_FIELDS columns into server dicts, with variables and backups attached"""
+    servers = [dict(zip(SERVER_FIELDS, row), variables=[], backups=[]) for row in rows]
+    if servers:
+        await _attach_children(db, servers, models.ServerVariable, VARIABLE_FIELDS, "variables")
+        await _attach_children(db, servers, models.Backup, BACKUP_FIELDS, "backups")
+    return servers
+
+async def _server_dicts(db: AsyncSession, query) -> List[dict]:
+    """Run a select(models.Server) query as plain rows, with variables and backups attached"""
+    rows = await db.execute(query.with_only_columns(*[getattr(models.Server, field) for field in SERVER_FIELDS]))
+    return await server_dicts_from_rows(db, rows.all())
+
+async def get_server_dicts(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                           user_id: Optional[int] = None) -> List[dict]:
+    """Get a page of all servers (or those owned by or shared with user_id), as dicts ready for serialization"""
+    query = select(models.Server) if user_id is None else _user_servers_query(user_id)
+    return await _server_dicts(db, _page(query, models.Server, skip, limit, after_id))
+
+async def get_server_dict(db: AsyncSession, server_id: int) -> Optional[dict]:
+    """Like get_server, as a dict ready for serialization"""
+    servers = await _server_dicts(db, select(models.Server).where(models.Server.id == server_id))
+    return servers[0] if servers else None
+
+def _server_values(server: schemas.ServerCreate, user_id: int) -> dict:
+    """Column values of a new server"""
+    return dict(
         name=server.name,
         description=server.description,
         game_type=server.game_type,
@@ -98,165 +236,472 @@ def create_server(db: Session, server: schemas.ServerCreate, user_id: int):
         port=server.port,
         owner_id=user_id
     )
+
+async def create_server(db: AsyncSession, server: schemas.ServerCreate, user_id: int):
+    """Create new server"""
+    # Variables go in through the relationship, so a single flush inserts both
+    db_server = models.Server(
+        **_server_values(server, user_id),
+        variables=[models.ServerVariable(key=var.key, value=var.value) for var in server.variables or []]
+    )
+    await touch_server(db, db_server)
     db.add(db_server)
-    db.commit()
-    db.refresh(db_server)
+    await db.commit()
+    
+    return await get_server_detail(db, db_server.id)
+
+async def create_servers(db: AsyncSession, servers: List[schemas.ServerCreate], user_id: int):
+    """
+    Create many servers in one transaction
+
+    Returns (id, revision) rows in request order. Each server gets its own
+    revision from a reserved block, which also maps the generated IDs back
+    to the request without RETURNING, so rows are inserted with one
+    executemany per table on every backend.
+    """
+    if not servers:
+        return []
+    last = await next_revision(db, count=len(servers))
+    first = last - len(servers) + 1
+    await db.execute(insert(models.Server), [
+        dict(_server_values(server, user_id), revision=first + index)
+        for index, server in enumerate(servers)
+    ])
+    rows = (await db.execute(
+        select(models.Server.id, models.Server.revision)
+        .where(models.Server.revision.between(first, last))
+        .order_by(models.Server.revision)
+    )).all()
     
-    # Add server variables if provided
+    variables = [
+        {"key": var.key, "value": var.value, "server_id": row.id}
+        for row, server in zip(rows, servers)
+        for var in server.variables or []
+    ]
+    if variables:
+        await db.execute(insert(models.ServerVariable), variables)
+    await db.commit()
+    response_cache.invalidate_lists()
+    return rows
+
+SERVER_UPDATE_FIELDS = ("name", "description", "game_type", "image", "memory_limit", "cpu_limit", "disk_limit", "port")
+
+async def _sync_variables(db: AsyncSession, db_server: models.Server, variables: List[schemas.ServerVariableCreate]) -> bool:
+    """
+    Make a server's variables match `variables`, touching only changed keys
+
+    Returns whether any row was inserted, updated or deleted.
+    """
+    wanted = {var.key: var.value for var in variables}
+    changed = False
+    for db_var in list(db_server.variables):
+        if db_var.key not in wanted:
+            await db.delete(db_var)
+            changed = True
+            continue
+        value = wanted.pop(db_var.key)
+        if db_var.value != value:
+            db_var.value = value
+            changed = True
+    for key, value in wanted.items():
+        db_server.variables.append(models.ServerVariable(key=key, value=value))
+        changed = True
+    return changed
+
+async def _apply_server_update(db: AsyncSession, db_server: models.Server, server: schemas.ServerCreate) -> bool:
+    """
+    Copy an update onto a loaded server (without committing)
+
+    Only differing fields are assigned, so an unchanged server isn't
+    written; returns whether anything changed.
+    """
+    changed = False
+    for field in SERVER_UPDATE_FIELDS:
+        value = getattr(server, field)
+        if getattr(db_server, field) != value:
+            setattr(db_server, field, value)
+            changed = True
+    
+    # Sync variables if provided
     if server.variables:
-        for var in server.variables:
-            db_var = models.ServerVariable(
-                key=var.key,
-                value=var.value,
-                server_id=db_server.id
-            )
-            db.add(db_var)
-        db.commit()
-        db.refresh(db_server)
+        changed = await _sync_variables(db, db_server, server.variables) or changed
+    return changed
+
+async def update_server(db: AsyncSession, server_id: int, server: schemas.ServerCreate):
+    """Update server; the revision (and updated_at) only move when something changed"""
+    db_server = await get_server_detail(db, server_id)
+    if db_server and await _apply_server_update(db, db_server, server):
+        await touch_server(db, db_server)
+        await db.commit()
+        db_server = await get_server_detail(db, server_id)
     
     return db_server
 
-def update_server(db: Session, server_id: int, server: schemas.ServerCreate):
-    """Update server"""
-    db_server = get_server(db, server_id)
+async def update_servers(db: AsyncSession, updates: List[schemas.ServerBulkUpdate]):
+    """
+    Update many servers in one transaction
+
+    Returns the server for each item, None where the server doesn't exist.
+    Only servers that actually changed get a new revision.
+    """
+    ids = {item.id for item in updates}
+    db_servers = {
+        db_server.id: db_server
+        for db_server in (await db.scalars(
+            select(models.Server).options(selectinload(models.Server.variables)).where(models.Server.id.in_(ids))
+        )).all()
+    }
+    changed = []
+    for item in updates:
+        db_server = db_servers.get(item.id)
+        if db_server is not None and await _apply_server_update(db, db_server, item):
+            changed.append(db_server)
+    if changed:
+        last = await next_revision(db, count=len(changed))
+        for revision, db_server in enumerate(changed, start=last - len(changed) + 1):
+            db_server.revision = revision
+            response_cache.invalidate_server(db_server.id)
+        await db.commit()
+    return [db_servers.get(item.id) for item in updates]
+
+async def get_server_owners(db: AsyncSession, server_ids: List[int]):
+    """Map server ID to owner ID for the given servers that exist"""
+    rows = await db.execute(
+        select(models.Server.id, models.Server.owner_id).where(models.Server.id.in_(server_ids))
+    )
+    return dict(rows.all())
+
+async def delete_server(db: AsyncSession, server_id: int):
+    """Delete server, returning it as it was (with variables and backups) before deletion"""
+    db_server = await get_server_detail(db, server_id)
     if db_server:
-        db_server.name = server.name
-        db_server.description = server.description
-        db_server.game_type = server.game_type
-        db_server.image = server.image
-        db_server.memory_limit = server.memory_limit
-        db_server.cpu_limit = server.cpu_limit
-        db_server.disk_limit = server.disk_limit
-        db_server.port = server.port
+        # Delete associated variables, backups, actions and stats
+        for model in (models.ServerVariable, models.Backup, models.ServerAction,
+                      models.ServerStatSample, models.ServerStatRollup):
+            await db.execute(delete(model).where(model.server_id == server_id))
+        
+        # Revoke shared access
+        await db.execute(delete(models.user_server_association).where(
+            models.user_server_association.c.server_id == server_id
+        ))
         
-        db.commit()
-        db.refresh(db_server)
+        # Leave a tombstone so daemons drop the server on their next sync
+        db.add(models.ServerTombstone(server_id=server_id, revision=await next_revision(db)))
         
-        # Update variables if provided
-        if server.variables:
-            # Delete existing variables
-            db.query(models.ServerVariable).filter(
-                models.ServerVariable.server_id == server_id
-            ).delete()
-            
-            # Add new variables
-            for var in server.variables:
-                db_var = models.ServerVariable(
-                    key=var.key,
-                    value=var.value,
-                    server_id=db_server.id
-                )
-                db.add(db_var)
-            
-            db.commit()
-            db.refresh(db_server)
+        # Delete server; the loaded copy is detached rather than deleted
+        # through the session, which would unlink its children first
+        db.expunge(db_server)
+        await db.execute(delete(models.Server).where(models.Server.id == server_id))
+        await db.commit()
+        response_cache.invalidate_server(server_id)
     
     return db_server
 
-def delete_server(db: Session, server_id: int):
-    """Delete server"""
-    db_server = get_server(db, server_id)
+async def update_server_status(db: AsyncSession, server_id: int, status: str, container_id: Optional[str] = None):
+    """Update server status reported by a daemon"""
+    db_server = await get_server(db, server_id)
     if db_server:
-        # Delete associated variables
-        db.query(models.ServerVariable).filter(
-            models.ServerVariable.server_id == server_id
-        ).delete()
-        
-        # Delete associated backups
-        db.query(models.Backup).filter(
-            models.Backup.server_id == server_id
-        ).delete()
-        
-        # Delete server
-        db.delete(db_server)
-        db.commit()
+        if container_id is None:
+            container_id = db_server.container_id
+        # Daemons report on every sync; only a real change is worth a revision
+        if (db_server.status, db_server.container_id) != (status, container_id):
+            db_server.status = status
+            db_server.container_id = container_id
+            await touch_server(db, db_server)
+            await db.commit()
+        db_server = await get_server_detail(db, server_id)
     
     return db_server
 
-def add_user_to_server(db: Session, server_id: int, user_id: int):
+async def add_user_to_server(db: AsyncSession, server_id: int, user_id: int):
     """Grant user access to server"""
-    db_server = get_server(db, server_id)
-    db_user = get_user(db, user_id)
+    db_server = await get_server(db, server_id)
+    db_user = await get_user(db, user_id)
     
     if db_server and db_user:
-        db_server.users_with_access.append(db_user)
-        db.commit()
-        db.refresh(db_server)
+        await db.refresh(db_server, attribute_names=["users_with_access"])
+        if db_user not in db_server.users_with_access:
+            db_server.users_with_access.append(db_user)
+            # The server now shows up in another user's list
+            await touch_server(db, db_server)
+            await db.commit()
+        db_server = await get_server_detail(db, server_id)
     
     return db_server
 
-def remove_user_from_server(db: Session, server_id: int, user_id: int):
+async def remove_user_from_server(db: AsyncSession, server_id: int, user_id: int):
     """Revoke user access to server"""
-    db_server = get_server(db, server_id)
-    db_user = get_user(db, user_id)
+    db_server = await get_server(db, server_id)
+    db_user = await get_user(db, user_id)
     
-    if db_server and db_user and db_user in db_server.users_with_access:
-        db_server.users_with_access.remove(db_user)
-        db.commit()
-        db.refresh(db_server)
+    if db_server and db_user:
+        await db.refresh(db_server, attribute_names=["users_with_access"])
+        if db_user in db_server.users_with_access:
+            db_server.users_with_access.remove(db_user)
+            await touch_server(db, db_server)
+            await db.commit()
+        db_server = await get_server_detail(db, server_id)
     
     return db_server
 
 # API Key CRUD operations
-def create_api_key(db: Session, api_key: schemas.ApiKeyCreate, user_id: int):
-    """Create new API key"""
+async def create_api_key(db: AsyncSession, api_key: schemas.ApiKeyCreate, user_id: int):
+    """
+    Create new API key
+
+    Returns (db_api_key, key); only the digest is stored, so the key itself
+    has to be handed to the caller now.
+    """
     import secrets
     
     # Generate random API key
-    key = secrets.token_hex(16)
+    key = secrets.token_hex(24)
     
     db_api_key = models.ApiKey(
-        key=key,
+        prefix=key[:API_KEY_PREFIX_LENGTH],
+        key_hash=api_key_digest(key),
         description=api_key.description,
+        expires_at=api_key.expires_at,
         user_id=user_id
     )
     
     db.add(db_api_key)
-    db.commit()
-    db.refresh(db_api_key)
+    await db.commit()
+    await db.refresh(db_api_key)
     
-    return db_api_key
+    return db_api_key, key
 
-def get_api_keys(db: Session, user_id: int):
+async def get_api_key(db: AsyncSession, api_key_id: int):
+    """Get API key by ID"""
+    return await db.scalar(select(models.ApiKey).where(models.ApiKey.id == api_key_id))
+
+async def get_api_keys(db: AsyncSession, user_id: int):
     """Get API keys for a user"""
-    return db.query(models.ApiKey).filter(models.ApiKey.user_id == user_id).all()
+    result = await db.scalars(select(models.ApiKey).where(models.ApiKey.user_id == user_id))
+    return result.all()
 
-def delete_api_key(db: Session, api_key_id: int):
+async def delete_api_key(db: AsyncSession, api_key_id: int):
     """Delete API key"""
-    db_api_key = db.query(models.ApiKey).filter(models.ApiKey.id == api_key_id).first()
+    db_api_key = await get_api_key(db, api_key_id)
     
     if db_api_key:
-        db.delete(db_api_key)
-        db.commit()
+        await db.delete(db_api_key)
+        await db.commit()
+        api_key_cache.pop(db_api_key.key_hash)
     
     return db_api_key
 
+# Server action CRUD operations
+async def create_action(db: AsyncSession, server_id: int, action: str, user_id: Optional[int] = None):
+    """Record a server action for the daemons to execute"""
+    db_action = models.ServerAction(
+        server_id=server_id,
+        action=action,
+        status="pending",
+        requested_by=user_id
+    )
+    
+    db.add(db_action)
+    await db.commit()
+    await db.refresh(db_action)
+    
+    return db_action
+
+async def create_actions(db: AsyncSession, server_ids: List[int], action: str, user_id: Optional[int] = None):
+    """Record the same action for many servers in one transaction"""
+    db_actions = [
+        models.ServerAction(server_id=server_id, action=action, status="pending", requested_by=user_id)
+        for server_id in server_ids
+    ]
+    db.add_all(db_actions)
+    await db.commit()
+    return db_actions
+
+async def get_action(db: AsyncSession, action_id: int):
+    """Get server action by ID"""
+    return await db.scalar(select(models.ServerAction).where(models.ServerAction.id == action_id))
+
+async def get_pending_actions(db: AsyncSession):
+    """Get actions not yet completed (pending or dispatched), oldest first"""
+    result = await db.scalars(select(models.ServerAction).where(
+        models.ServerAction.status.in_(("pending", "dispatched"))
+    ).order_by(models.ServerAction.id))
+    return result.all()
+
+async def mark_actions_dispatched(db: AsyncSession, action_ids: List[int]):
+    """Mark pending actions as delivered to a daemon"""
+    if not action_ids:
+        return
+    await db.execute(
+        update(models.ServerAction)
+        .where(models.ServerAction.id.in_(action_ids), models.ServerAction.status == "pending")
+        .values(status="dispatched")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def complete_action(db: AsyncSession, action_id: int, status: str = "completed", message: Optional[str] = None):
+    """Record the outcome of a server action"""
+    db_action = await get_action(db, action_id)
+    
+    if db_action:
+        db_action.status = status
+        db_action.message = message
+        db_action.completed_at = func.now()
+        await db.commit()
+        await db.refresh(db_action)
+    
+    return db_action
+
 # Backup CRUD operations
-def create_backup(db: Session, backup: schemas.BackupCreate, server_id: int):
+async def create_backup(db: AsyncSession, backup: schemas.BackupCreate, server_id: int):
     """Create new backup"""
     db_backup = models.Backup(
         name=backup.name,
         path=backup.path,
         size=backup.size,
+        kind=backup.kind,
         server_id=server_id
     )
     
     db.add(db_backup)
-    db.commit()
-    db.refresh(db_backup)
+    db_server = await get_server(db, server_id)
+    if db_server:
+        await touch_server(db, db_server)
+    await db.commit()
+    await db.refresh(db_backup)
     
     return db_backup
 
-def get_backups(db: Session, server_id: int):
+async def get_backup(db: AsyncSession, backup_id: int):
+    """Get backup by ID"""
+    return await db.scalar(select(models.Backup).where(models.Backup.id == backup_id))
+
+async def get_backups(db: AsyncSession, server_id: int):
     """Get backups for a server"""
-    return db.query(models.Backup).filter(models.Backup.server_id == server_id).all()
+    result = await db.scalars(select(models.Backup).where(models.Backup.server_id == server_id))
+    return result.all()
 
-def delete_backup(db: Session, backup_id: int):
+async def delete_backup(db: AsyncSession, backup_id: int):
     """Delete backup"""
-    db_backup = db.query(models.Backup).filter(models.Backup.id == backup_id).first()
+    db_backup = await get_backup(db, backup_id)
     
     if db_backup:
-        db.delete(db_backup)
-        db.commit()
+        db_server = await get_server(db, db_backup.server_id)
+        if db_server:
+            await touch_server(db, db_server)
+        await db.delete(db_backup)
+        await db.commit()
     
     return db_backup
+
+# Stats ingestion
+async def _mark_late_samples(db: AsyncSession, kind: str, earliest: int):
+    """Flag samples behind the minute rollup watermark so maintenance re-rolls their buckets"""
+    name = f"rollup:{kind}:{timeseries.MINUTE}"
+    watermark = await db.scalar(select(models.SyncCounter.value).where(models.SyncCounter.name == name))
+    if not watermark or earliest >= watermark:
+        return
+    result = await db.execute(timeseries.lower_late_marker(name, earliest))
+    if result.rowcount == 0:
+        try:
+            async with db.begin_nested():
+                db.add(models.SyncCounter(name=timeseries.late_marker(name), value=earliest))
+        except IntegrityError:
+            # A concurrent ingest created the marker first
+            await db.execute(timeseries.lower_late_marker(name, earliest))
+
+async def ingest_stats(db: AsyncSession, batch: schemas.StatsBatch):
+    """Store a batch of server and host samples in a single transaction"""
+    now = int(time.time())
+    
+    server_ids = {sample.server_id for sample in batch.servers}
+    known_ids = set()
+    if server_ids:
+        known_ids = set((await db.scalars(
+            select(models.Server.id).where(models.Server.id.in_(server_ids))
+        )).all())
+    
+    server_rows = [
+        {
+            "server_id": sample.server_id,
+            "ts": int(sample.timestamp) if sample.timestamp else now,
+            "cpu_usage": sample.cpu_usage,
+            "memory_usage": sample.memory_usage,
+            "disk_usage": sample.disk_usage,
+            "uptime": sample.uptime,
+            "player_count": sample.player_count
+        }
+        for sample in batch.servers if sample.server_id in known_ids
+    ]
+    host_rows = [
+        {
+            "host": sample.host,
+            "ts": int(sample.timestamp) if sample.timestamp else now,
+            "cpu_percent": sample.cpu_percent,
+            "memory_used": sample.memory_used,
+            "memory_total": sample.memory_total,
+            "memory_percent": sample.memory_percent,
+            "disk_used": sample.disk_used,
+            "disk_total": sample.disk_total,
+            "disk_percent": sample.disk_percent
+        }
+        for sample in batch.hosts
+    ]
+    
+    if server_rows:
+        await db.execute(insert(models.ServerStatSample), server_rows)
+        await _mark_late_samples(db, "server", min(row["ts"] for row in server_rows))
+    if host_rows:
+        await db.execute(insert(models.HostStatSample), host_rows)
+        await _mark_late_samples(db, "host", min(row["ts"] for row in host_rows))
+    await db.commit()
+    
+    return schemas.StatsBatchResult(
+        servers=len(server_rows),
+        hosts=len(host_rows),
+        skipped=len(batch.servers) - len(server_rows)
+    )
+
+# Bulk import (records in the shape of the NDJSON export, IDs preserved)
+async def import_users(db: AsyncSession, users: List[schemas.UserInDB]):
+    """Insert a batch of exported users (without committing)"""
+    if users:
+        await db.execute(insert(models.User), [user.model_dump() for user in users])
+
+async def import_servers(db: AsyncSession, servers: List[schemas.Server]):
+    """
+    Insert a batch of exported servers and their variables (without committing)
+
+    Servers get new revisions so daemons pick them up; variables get new
+    IDs. Backups are imported separately.
+    """
+    if not servers:
+        return
+    last = await next_revision(db, count=len(servers))
+    await db.execute(insert(models.Server), [
+        dict(server.model_dump(exclude={"variables", "backups"}), revision=revision)
+        for revision, server in enumerate(servers, start=last - len(servers) + 1)
+    ])
+    variables = [
+        {"key": var.key, "value": var.value, "server_id": server.id}
+        for server in servers
+        for var in server.variables
+    ]
+    if variables:
+        await db.execute(insert(models.ServerVariable), variables)
+
+async def import_backups(db: AsyncSession, backups: List[schemas.Backup]):
+    """Insert a batch of exported backups (without committing)"""
+    if backups:
+        await db.execute(insert(models.Backup), [backup.model_dump() for backup in backups])
+
+async def sync_id_sequence(db: AsyncSession, model):
+    """Move a PostgreSQL ID sequence past explicitly inserted IDs (no-op elsewhere)"""
+    connection = await db.connection()
+    if connection.dialect.name != "postgresql":
+        return
+    table = model.__tablename__
+    await db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+    ))
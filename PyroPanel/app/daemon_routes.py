@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app import schemas, crud
+from app.action_hub import action_hub
+from app.auth import authenticate_token, get_current_user
+from app.database import AsyncSessionLocal, get_db
+from app.response_cache import not_modified
+from app.serialization import ORJSONResponse
+
+logger = logging.getLogger("PyroPanel")
+
+router = APIRouter(prefix="/api", tags=["daemon"])
+
+async def get_daemon_user(current_user: schemas.User = Depends(get_current_user)):
+    """Daemon endpoints expose every server, so they require an admin principal"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+def revision_etag(revision: int) -> str:
+    """Strong ETag for the server list at a given sync revision"""
+    return f'"servers-{revision}"'
+
+@router.get("/servers", response_model=List[schemas.Server])
+async def read_all_servers(
+    request: Request,
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the full server list (supports If-None-Match)"""
+    etag = revision_etag(await crud.get_revision(db))
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    _, servers, _ = await crud.get_server_changes(db, since=0)
+    return ORJSONResponse(servers, headers={"ETag": etag})
+
+@router.get("/servers/changes", response_model=schemas.ServerChanges)
+async def read_server_changes(
+    request: Request,
+    since: int = 0,
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get servers changed or deleted after revision `since`
+
+    since=0, or a revision older than the tombstone retention, returns the
+    full list with full=true. Pass the returned revision as `since` next
+    time, together with the ETag in If-None-Match to get a 304 when
+    nothing changed.
+    """
+    revision = await crud.get_revision(db)
+    etag = revision_etag(revision)
+    if since >= revision and not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # A client ahead of us (e.g. after a database restore) or behind the
+    # oldest tombstone still kept must resync fully
+    if since > revision or since < await crud.get_sync_floor(db):
+        since = 0
+
+    revision, servers, deleted = await crud.get_server_changes(db, since=since)
+    return ORJSONResponse(
+        {"revision": revision, "full": since == 0, "servers": servers, "deleted": deleted},
+        headers={"ETag": revision_etag(revision)}
+    )
+
+@router.put("/servers/{server_id}/status", response_model=schemas.Server)
+async def update_server_status(
+    server_id: int,
+    server_status: schemas.ServerStatusUpdate,
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Update server status reported by a daemon"""
+    db_server = await crud.update_server_status(
+        db, server_id=server_id, status=server_status.status, container_id=server_status.container_id
+    )
+    if db_server is None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    return db_server
+
+@router.post("/servers/{server_id}/backups", response_model=schemas.Backup, status_code=status.HTTP_201_CREATED)
+async def register_backup(
+    server_id: int,
+    backup: schemas.BackupCreate,
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Record a backup (archive or incremental manifest) created by a daemon"""
+    if backup.kind not in ("full", "incremental"):
+        raise HTTPException(status_code=400, detail="Invalid backup kind")
+    if await crud.get_server(db, server_id=server_id) is None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    return await crud.create_backup(db, backup=backup, server_id=server_id)
+
+# Stats ingestion
+@router.post("/stats/batch", response_model=schemas.StatsBatchResult)
+async def ingest_stats(
+    batch: schemas.StatsBatch,
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Store per-server and host samples from one daemon flush in a single transaction"""
+    return await crud.ingest_stats(db, batch)
+
+# Action delivery
+def action_message(action) -> dict:
+    """Payload pushed to daemons for one action"""
+    return {"id": action.id, "server_id": action.server_id, "action": action.action}
+
+@router.get("/actions/pending")
+async def read_pending_actions(
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get actions waiting for a daemon (polling fallback for the action channel)"""
+    actions = await crud.get_pending_actions(db)
+    await crud.mark_actions_dispatched(db, [action.id for action in actions if action.status == "pending"])
+    return [action_message(action) for action in actions]
+
+@router.put("/actions/{action_id}/complete", response_model=schemas.ActionRecord)
+async def complete_action(
+    action_id: int,
+    result: Optional[schemas.ActionComplete] = None,
+    current_user: schemas.User = Depends(get_daemon_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Record the outcome of an action"""
+    result = result or schemas.ActionComplete()
+    db_action = await crud.complete_action(db, action_id=action_id, status=result.status, message=result.message)
+    if db_action is None:
+        raise HTTPException(status_code=404, detail="Action not found")
+    return db_action
+
+async def _authenticate_websocket(websocket: WebSocket):
+    """Resolve the daemon principal from the WebSocket's Authorization header"""
+    authorization = websocket.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    
+    async with AsyncSessionLocal() as db:
+        user = await authenticate_token(token, db)
+    
+    if user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return user
+
+async def _pending_backlog():
+    """Actions a daemon missed while it was not connected"""
+    async with AsyncSessionLocal() as db:
+        actions = await crud.get_pending_actions(db)
+        await crud.mark_actions_dispatched(db, [action.id for action in actions if action.status == "pending"])
+        return [action_message(action) for action in actions]
+
+def _parse_ack(text: str) -> Optional[schemas.ActionAck]:
+    """Ack carried by a channel frame; None for other or malformed frames"""
+    try:
+        message = json.loads(text)
+    except ValueError:
+        logger.warning("Ignoring action channel frame that is not JSON")
+        return None
+    if not isinstance(message, dict) or message.get("type") != "ack":
+        return None
+    try:
+        return schemas.ActionAck.model_validate(message)
+    except ValidationError as e:
+        logger.warning(f"Ignoring malformed action ack: {e.errors(include_url=False)}")
+        return None
+
+async def _record_ack(ack: schemas.ActionAck):
+    """Store a completion ack received over the channel"""
+    async with AsyncSessionLocal() as db:
+        await crud.complete_action(db, action_id=ack.id, status=ack.status, message=ack.message)
+
+@router.websocket("/actions/ws")
+async def action_channel(websocket: WebSocket):
+    """
+    Persistent action channel for daemons
+
+    Server -> daemon: {"type": "action", "action": {id, server_id, action}}
+    Daemon -> server: {"type": "ack", "id": ..., "status": "completed"|"failed", "message": ...}
+    """
+    try:
+        await _authenticate_websocket(websocket)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    queue = action_hub.subscribe()
+    
+    async def send_actions():
+        # Subscribe before reading the backlog so nothing falls in between;
+        # duplicates are fine, daemons ignore action IDs they already run
+        for action in await _pending_backlog():
+            await websocket.send_json({"type": "action", "action": action})
+        while True:
+            action = await queue.get()
+            await websocket.send_json({"type": "action", "action": action})
+    
+    sender = asyncio.ensure_future(send_actions())
+    try:
+        while True:
+            ack = _parse_ack(await websocket.receive_text())
+            if ack is not None:
+                await _record_ack(ack)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Action channel closed: {e}")
+    finally:
+        sender.cancel()
+        action_hub.unsubscribe(queue)
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import os
 from dotenv import load_dotenv
 
@@ -10,21 +13,77 @@ load_dotenv()
 # Get database URL from environment or use SQLite as default
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pyropanel.db")
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# Connection pool settings (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Async drivers used for each backend unless ASYNC_DATABASE_URL is set
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+def async_database_url(url: str) -> str:
+    """Derive the async driver URL from a (sync) database URL"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}, set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+def _engine_options(url: str) -> dict:
+    """Pool and connection options for a database URL"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+    # SQLite: one shared connection for in-memory databases, otherwise wait
+    # on the file lock instead of failing with "database is locked"
+    options = {"connect_args": {"check_same_thread": False, "timeout": DB_POOL_TIMEOUT}}
+    if parsed.database in (None, "", ":memory:"):
+        options["poolclass"] = StaticPool
+    return options
+
+def _configure_sqlite(engine):
+    """WAL lets readers run alongside the single writer"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+# Create SQLAlchemy engine (CLI setup, migrations and background jobs)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+# Async engine used by the web app
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    _configure_sqlite(engine)
+    _configure_sqlite(async_engine.sync_engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions keep loaded attributes after commit so responses can be
+# built without another round trip
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,190 @@
+import logging
+import os
+import zlib
+from typing import AsyncIterator, Iterator, List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, models, schemas
+from app.auth import get_current_user
+from app.database import AsyncSessionLocal
+from app.response_cache import response_cache
+from app.serialization import BACKUP_FIELDS, SERVER_FIELDS, USER_FIELDS, USER_FIELDS_WITH_HASH, dumps
+
+logger = logging.getLogger("PyroPanel")
+
+router = APIRouter(prefix="/admin", tags=["export"])
+
+# Rows fetched per round trip from the server-side cursor, and records
+# inserted per executemany on import
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+MAX_LINE_SIZE = 1024 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+EXPORT_KINDS = ("servers", "users", "backups")
+
+# Record schema and batch insert for each importable kind; import users,
+# then servers, then backups so references resolve
+IMPORTERS = {
+    "users": (schemas.UserInDB, crud.import_users, models.User),
+    "servers": (schemas.Server, crud.import_servers, models.Server),
+    "backups": (schemas.Backup, crud.import_backups, models.Backup),
+}
+
+async def get_admin_user(current_user: schemas.User = Depends(get_current_user)):
+    """Exports contain every user's data, so they require an admin principal"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+def _check_kind(kind: str):
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown export, use one of {', '.join(EXPORT_KINDS)}")
+
+async def _records(kind: str, include_password_hashes: bool) -> AsyncIterator[bytes]:
+    """
+    NDJSON chunks for one kind, one chunk per cursor partition
+
+    Rows come from a server-side cursor (yield_per), so memory stays
+    constant however large the table is. Server children are looked up in
+    a second session because some drivers can't run queries while an
+    unbuffered cursor is open.
+    """
+    model, fields = {
+        "servers": (models.Server, SERVER_FIELDS),
+        "users": (models.User, USER_FIELDS_WITH_HASH if include_password_hashes else USER_FIELDS),
+        "backups": (models.Backup, BACKUP_FIELDS),
+    }[kind]
+    query = (
+        select(*[getattr(model, field) for field in fields])
+        .order_by(model.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    async with AsyncSessionLocal() as db, AsyncSessionLocal() as lookup_db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            if kind == "servers":
+                records = await crud.server_dicts_from_rows(lookup_db, partition)
+            else:
+                records = [dict(zip(fields, row)) for row in partition]
+            yield b"".join(dumps(record) + b"\n" for record in records)
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/export/{kind}")
+async def export_records(
+    kind: str,
+    gzip: bool = False,
+    include_password_hashes: bool = False,
+    current_user: schemas.User = Depends(get_admin_user)
+):
+    """
+    Stream every server, user or backup as NDJSON (admin only)
+
+    Servers include their variables and backups. Users only include
+    password hashes when asked to, which a migration needs.
+    """
+    _check_kind(kind)
+    chunks = _records(kind, include_password_hashes)
+    filename = f"{kind}.ndjson"
+    if gzip:
+        return StreamingResponse(
+            _gzip(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _inflate(decompressor, data: bytes) -> Iterator[bytes]:
+    """Decompress in pieces of at most MAX_LINE_SIZE so a gzip bomb never expands all at once"""
+    while data:
+        yield decompressor.decompress(data, MAX_LINE_SIZE)
+        data = decompressor.unconsumed_tail
+
+async def _lines(request: Request) -> AsyncIterator[bytes]:
+    """Lines of a (possibly gzipped) request body, read incrementally"""
+    decompressor = None
+    buffer = b""
+    first = True
+    async for chunk in request.stream():
+        if first and chunk:
+            first = False
+            if chunk.startswith(GZIP_MAGIC):
+                decompressor = zlib.decompressobj(31)
+        for piece in [chunk] if decompressor is None else _inflate(decompressor, chunk):
+            buffer += piece
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line
+            if len(buffer) > MAX_LINE_SIZE:
+                raise HTTPException(status_code=413, detail="Record too large")
+    if decompressor is not None:
+        buffer += decompressor.flush()
+    for line in buffer.split(b"\n"):
+        yield line
+
+@router.post("/import/{kind}")
+async def import_records(
+    kind: str,
+    request: Request,
+    current_user: schemas.User = Depends(get_admin_user)
+):
+    """
+    Import NDJSON in the export format (admin only), gzipped or not
+
+    Records keep their IDs and are inserted in batches within a single
+    transaction: a bad record or an ID that already exists rolls back the
+    whole import. User records need password hashes.
+    """
+    _check_kind(kind)
+    schema, insert_batch, model = IMPORTERS[kind]
+
+    imported = 0
+    batch: List = []
+    async with AsyncSessionLocal() as db:
+        try:
+            line_number = 0
+            async for line in _lines(request):
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(schema.model_validate_json(line))
+                except ValidationError as e:
+                    raise HTTPException(status_code=400, detail=f"Line {line_number}: {e.errors()[0]['msg']}")
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await insert_batch(db, batch)
+                    imported += len(batch)
+                    batch = []
+            await insert_batch(db, batch)
+            imported += len(batch)
+            await crud.sync_id_sequence(db, model)
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            logger.warning(f"Import of {kind} rejected: {e.orig}")
+            raise HTTPException(status_code=409, detail="Records conflict with existing data or reference missing rows")
+
+    if kind == "servers":
+        response_cache.clear()
+    return {"kind": kind, "imported": imported}
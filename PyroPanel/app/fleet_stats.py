@@ -0,0 +1,199 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import AsyncSessionLocal
+
+# How long a computed dashboard is reused, and how old a sample may be to
+# still count as a server's "latest"
+FLEET_STATS_TTL = float(os.getenv("FLEET_STATS_TTL", "10"))
+LATEST_SAMPLE_WINDOW = int(os.getenv("FLEET_LATEST_SAMPLE_WINDOW", "300"))
+
+def _latest_samples(model, key, since: int):
+    """Subquery of the newest sample timestamp per key since `since`"""
+    return (
+        select(key.label("key"), func.max(model.ts).label("ts"))
+        .where(model.ts >= since)
+        .group_by(key)
+        .subquery()
+    )
+
+def load_fleet_arrays(db: Session, now: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Load every server with its latest sample into columnar arrays
+
+    One query returns (id, owner, game type, status, cpu, memory) rows;
+    servers without a recent sample get NaN usage.
+    """
+    now = now or int(time.time())
+    S = models.ServerStatSample
+    latest = _latest_samples(S, S.server_id, now - LATEST_SAMPLE_WINDOW)
+
+    rows = db.execute(
+        select(
+            models.Server.id, models.Server.name, models.Server.owner_id,
+            models.Server.game_type, models.Server.status,
+            S.cpu_usage, S.memory_usage,
+        )
+        .outerjoin(latest, latest.c.key == models.Server.id)
+        .outerjoin(S, and_(S.server_id == latest.c.key, S.ts == latest.c.ts))
+        .order_by(models.Server.id)
+    ).all()
+
+    if not rows:
+        empty = np.empty(0)
+        return {"id": empty.astype(np.int64), "name": empty.astype(object), "owner": empty.astype(np.int64),
+                "game_type": empty.astype(object), "running": empty.astype(bool),
+                "cpu": empty, "memory": empty}
+
+    ids, names, owners, game_types, statuses, cpu, memory = zip(*rows)
+    ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+
+    # Two samples with the same timestamp would duplicate a server
+    ids, first = np.unique(ids, return_index=True)
+    return {
+        "id": ids,
+        "name": np.array(names, dtype=object)[first],
+        "owner": np.array([o if o is not None else -1 for o in owners], dtype=np.int64)[first],
+        "game_type": np.array([g or "" for g in game_types], dtype=object)[first],
+        "running": (np.array(statuses, dtype=object) == "running")[first],
+        "cpu": np.array([np.nan if v is None else v for v in cpu], dtype=np.float64)[first],
+        "memory": np.array([np.nan if v is None else v for v in memory], dtype=np.float64)[first],
+    }
+
+def group_totals(arrays: Dict[str, np.ndarray]):
+    """Server count, running count, CPU and memory totals per game type"""
+    game_types, codes = np.unique(arrays["game_type"].astype(str), return_inverse=True)
+    k = len(game_types)
+    servers = np.bincount(codes, minlength=k)
+    running = np.bincount(codes, weights=arrays["running"].astype(np.float64), minlength=k)
+    cpu = np.bincount(codes, weights=np.nan_to_num(arrays["cpu"]), minlength=k)
+    memory = np.bincount(codes, weights=np.nan_to_num(arrays["memory"]), minlength=k)
+    return [
+        {
+            "game_type": str(game_types[i]),
+            "servers": int(servers[i]),
+            "active_servers": int(running[i]),
+            "cpu_usage": float(cpu[i]),
+            "memory_usage": int(memory[i]),
+        }
+        for i in np.argsort(-cpu, kind="stable")
+    ]
+
+def top_servers(arrays: Dict[str, np.ndarray], n: int):
+    """The n servers with the highest CPU usage"""
+    cpu = np.nan_to_num(arrays["cpu"], nan=-1.0)
+    valid = np.flatnonzero(cpu >= 0)
+    if not len(valid) or n <= 0:
+        return []
+    n = min(n, len(valid))
+    candidates = valid[np.argpartition(-cpu[valid], n - 1)[:n]]
+    order = candidates[np.argsort(-cpu[candidates], kind="stable")]
+    return [
+        {
+            "id": int(arrays["id"][i]),
+            "name": arrays["name"][i],
+            "cpu_usage": float(arrays["cpu"][i]),
+            "memory_usage": int(arrays["memory"][i]) if not np.isnan(arrays["memory"][i]) else None,
+        }
+        for i in order
+    ]
+
+def grouped_percentile(keys: np.ndarray, values: np.ndarray, q: float):
+    """
+    Percentile of values per key, linear interpolation like np.percentile
+
+    Sorts once by (key, value) and indexes every group's rank position at
+    the same time instead of calling np.percentile per group.
+    """
+    mask = ~np.isnan(values)
+    keys, values = keys[mask], values[mask]
+    if not len(keys):
+        return np.empty(0, dtype=keys.dtype), np.empty(0, dtype=np.int64), np.empty(0)
+
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    unique_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+
+    position = starts + (q / 100.0) * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    fraction = position - lower
+    result = values[lower] + (values[upper] - values[lower]) * fraction
+    return unique_keys, counts, result
+
+def compute_dashboard(db: Session, top_n: int = 10) -> Dict:
+    """Compute fleet-wide dashboard metrics from the latest samples"""
+    now = int(time.time())
+    arrays = load_fleet_arrays(db, now)
+
+    owners, counts, p95 = grouped_percentile(arrays["owner"], arrays["memory"], 95)
+
+    H = models.HostStatSample
+    latest_hosts = _latest_samples(H, H.host, now - LATEST_SAMPLE_WINDOW)
+    system_load = db.execute(
+        select(func.avg(H.cpu_percent))
+        .join(latest_hosts, and_(H.host == latest_hosts.c.key, H.ts == latest_hosts.c.ts))
+    ).scalar()
+
+    return {
+        "total_servers": int(len(arrays["id"])),
+        "active_servers": int(arrays["running"].sum()),
+        "total_users": db.query(func.count(models.User.id)).scalar() or 0,
+        "system_load": float(system_load or 0.0),
+        "total_cpu_usage": float(np.nansum(arrays["cpu"])),
+        "total_memory_usage": int(np.nansum(arrays["memory"])),
+        "by_game_type": group_totals(arrays),
+        "top_servers": top_servers(arrays, top_n),
+        "owner_memory_p95": [
+            {"owner_id": int(owner), "servers": int(count), "memory_p95": float(value)}
+            for owner, count, value in zip(owners, counts, p95)
+        ],
+        "generated_at": now,
+    }
+
+class FleetStatsCache:
+    """
+    Keeps computed dashboards for a short TTL so refreshes don't recompute
+
+    Concurrent misses for the same top_n share one computation, which runs
+    in its own session so it finishes even if the request that started it
+    goes away.
+    """
+
+    def __init__(self, ttl: float = FLEET_STATS_TTL):
+        self.ttl = ttl
+        self._entries: Dict[int, tuple] = {}
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, top_n: int = 10) -> Dict:
+        with self._lock:
+            entry = self._entries.get(top_n)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            task = self._inflight.get(top_n)
+            if task is None:
+                task = asyncio.ensure_future(self._compute(top_n))
+                self._inflight[top_n] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, top_n: int) -> Dict:
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.run_sync(compute_dashboard, top_n)
+            with self._lock:
+                self._entries[top_n] = (time.monotonic(), result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(top_n, None)
+
+fleet_stats_cache = FleetStatsCache()
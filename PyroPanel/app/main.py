@@ -1,21 +1,27 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import List, Optional, Union
+import asyncio
 import os
+import time
 
 # Import local modules
-from app import models, schemas, crud
-from app.database import engine, get_db
+from app import schemas, crud, serialization, timeseries
+from app.database import get_db
 from app.auth import create_access_token, get_current_user, get_password_hash, verify_password
 from app.server_routes import router as server_router
-
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+from app.daemon_routes import action_message, router as daemon_router
+from app.backup_routes import router as backup_router
+from app.export_routes import router as export_router
+from app.action_hub import action_hub
+from app.fleet_stats import fleet_stats_cache
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, paginate
+from app.response_cache import json_response, list_etag, not_modified, not_modified_response, response_cache, server_etag
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -33,6 +39,20 @@ templates = Jinja2Templates(directory="templates")
 # OAuth2 setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Daemon-facing API
+app.include_router(daemon_router)
+
+# Backup download/upload
+app.include_router(backup_router)
+
+# NDJSON export/import
+app.include_router(export_router)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start stats rollup/retention maintenance"""
+    asyncio.ensure_future(timeseries.maintenance_loop())
+
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -40,9 +60,9 @@ async def root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request, "title": "PyroPanel"})
 
 @app.post("/token")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """Authenticate user and return JWT token"""
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    user = await crud.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,23 +80,44 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 # Server routes
 @app.get("/servers/", response_model=List[schemas.Server])
 async def read_servers(
-    skip: int = 0, 
-    limit: int = 100, 
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True),
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get list of servers"""
-    if current_user.role != "admin":
-        servers = crud.get_user_servers(db, user_id=current_user.id, skip=skip, limit=limit)
-    else:
-        servers = crud.get_servers(db, skip=skip, limit=limit)
-    return servers
+    """
+    Get list of servers ordered by id; pass the X-Next-Cursor header back as `cursor` for the next page
+
+    Pages are cached per principal scope until the next server change;
+    send the ETag back in If-None-Match to get a 304.
+    """
+    after_id = decode_cursor(cursor)
+    scope = "admin" if current_user.role == "admin" else f"user-{current_user.id}"
+    key = (scope, after_id, limit, skip)
+    revision = await crud.get_revision(db)
+    etag = list_etag(key, revision)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    cached = response_cache.get_list(key, revision)
+    if cached is None:
+        user_id = current_user.id if current_user.role != "admin" else None
+        servers = await crud.get_server_dicts(db, skip=skip, limit=limit + 1, after_id=after_id, user_id=user_id)
+        servers, next_cursor = paginate(servers, limit, response)
+        cached = (serialization.dumps(servers), next_cursor)
+        response_cache.set_list(key, revision, *cached)
+    
+    body, next_cursor = cached
+    return json_response(body, etag, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @app.post("/servers/", response_model=schemas.Server)
 async def create_server(
     server: schemas.ServerCreate, 
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new server"""
     if current_user.role != "admin":
@@ -84,16 +125,152 @@ async def create_server(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return crud.create_server(db=db, server=server, user_id=current_user.id)
+    return await crud.create_server(db=db, server=server, user_id=current_user.id)
+
+# Bulk routes (declared before /servers/{server_id} so "bulk" isn't taken for an ID)
+@app.post("/servers/bulk", response_model=schemas.BulkResult)
+async def create_servers(
+    request: schemas.ServerBulkCreate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create many servers in one transaction (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    rows = await crud.create_servers(db, servers=request.servers, user_id=current_user.id)
+    return {"results": [
+        {"index": index, "id": row.id, "status_code": status.HTTP_201_CREATED, "revision": row.revision}
+        for index, row in enumerate(rows)
+    ]}
+
+@app.put("/servers/bulk", response_model=schemas.BulkResult)
+async def update_servers(
+    request: schemas.ServerBulkUpdateRequest,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Update many servers in one transaction (admin only); missing servers are reported per item"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    # An ID listed twice would be applied twice in the same transaction
+    seen = set()
+    results, updates = [], []
+    for index, item in enumerate(request.servers):
+        if item.id in seen:
+            results.append({"index": index, "id": item.id, "status_code": 400, "detail": "Duplicate server ID"})
+        else:
+            seen.add(item.id)
+            updates.append((index, item))
+    
+    db_servers = await crud.update_servers(db, updates=[item for _, item in updates])
+    for (index, item), db_server in zip(updates, db_servers):
+        if db_server is None:
+            results.append({"index": index, "id": item.id, "status_code": 404, "detail": "Server not found"})
+        else:
+            results.append({"index": index, "id": item.id, "status_code": 200, "revision": db_server.revision})
+    results.sort(key=lambda result: result["index"])
+    return {"results": results}
+
+@app.post("/servers/bulk/action", response_model=schemas.BulkResult)
+async def bulk_server_action(
+    request: schemas.BulkServerAction,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Perform one action (start, stop, restart, backup) on many servers"""
+    if request.action not in schemas.ACTIONS:
+        raise HTTPException(status_code=400, detail="Invalid action")
+    
+    owners = await crud.get_server_owners(db, server_ids=request.server_ids)
+    seen = set()
+    results, allowed = [], []
+    for index, server_id in enumerate(request.server_ids):
+        result = {"index": index, "id": server_id}
+        if server_id not in owners:
+            result.update(status_code=404, detail="Server not found")
+        elif current_user.role != "admin" and owners[server_id] != current_user.id:
+            result.update(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        elif server_id in seen:
+            result.update(status_code=400, detail="Duplicate server ID")
+        else:
+            seen.add(server_id)
+            allowed.append(result)
+        results.append(result)
+    
+    # Record every action in one commit, then push them to connected daemons
+    db_actions = await crud.create_actions(
+        db, server_ids=[result["id"] for result in allowed], action=request.action, user_id=current_user.id
+    )
+    delivered = [db_action.id for db_action in db_actions if action_hub.publish(action_message(db_action))]
+    await crud.mark_actions_dispatched(db, delivered)
+    for result, db_action in zip(allowed, db_actions):
+        result.update(status_code=status.HTTP_202_ACCEPTED, action_id=db_action.id)
+    return {"results": results}
 
 @app.get("/servers/{server_id}", response_model=schemas.Server)
 async def read_server(
     server_id: int, 
+    request: Request,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get server details (cached per revision, supports If-None-Match)"""
+    version = await crud.get_server_version(db, server_id=server_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    
+    # Check if user has access to this server
+    if current_user.role != "admin" and version.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    etag = server_etag(server_id, version.revision)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    body = response_cache.get_server(server_id, version.revision)
+    if body is None:
+        server = await crud.get_server_dict(db, server_id=server_id)
+        if server is None:
+            raise HTTPException(status_code=404, detail="Server not found")
+        # Cache under the revision actually loaded, which may be newer
+        body = serialization.dumps(server)
+        response_cache.set_server(server_id, server["revision"], body)
+        etag = server_etag(server_id, server["revision"])
+    
+    return json_response(body, etag)
+
+def _stats_range(start: Optional[int], end: Optional[int], resolution: Optional[int]):
+    """Validate a stats range query, defaulting to the last hour"""
+    end = end or int(time.time())
+    start = start if start is not None else end - 3600
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if resolution is not None and resolution not in timeseries.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="resolution must be 0, 60 or 3600")
+    return start, end
+
+@app.get("/servers/{server_id}/stats", response_model=schemas.StatsSeries)
+async def read_server_stats(
+    server_id: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    resolution: Optional[int] = None,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get server details"""
-    server = crud.get_server(db, server_id=server_id)
+    """Get a server's stats series; resolution is picked from the range unless given"""
+    server = await crud.get_server(db, server_id=server_id)
     if server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     
@@ -104,17 +281,37 @@ async def read_server(
             detail="Not enough permissions"
         )
     
-    return server
+    start, end = _stats_range(start, end, resolution)
+    return await db.run_sync(timeseries.get_server_series, server_id, start, end, resolution)
+
+@app.get("/hosts/{host}/stats", response_model=schemas.HostStatsSeries)
+async def read_host_stats(
+    host: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    resolution: Optional[int] = None,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a daemon host's stats series (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    start, end = _stats_range(start, end, resolution)
+    return await db.run_sync(timeseries.get_host_series, host, start, end, resolution)
 
 @app.post("/servers/{server_id}/action")
 async def server_action(
     server_id: int,
     action: schemas.ServerAction,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Perform action on server (start, stop, restart)"""
-    server = crud.get_server(db, server_id=server_id)
+    server = await crud.get_server(db, server_id=server_id)
     if server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     
@@ -125,22 +322,44 @@ async def server_action(
             detail="Not enough permissions"
         )
     
-    # TODO: Implement actual server control logic via daemon
-    if action.action == "start":
-        return {"status": "success", "message": f"Server {server_id} started"}
-    elif action.action == "stop":
-        return {"status": "success", "message": f"Server {server_id} stopped"}
-    elif action.action == "restart":
-        return {"status": "success", "message": f"Server {server_id} restarted"}
-    else:
+    if action.action not in schemas.ACTIONS:
         raise HTTPException(status_code=400, detail="Invalid action")
+    
+    # Record the action and push it to connected daemons right away;
+    # daemons that are not connected pick it up by polling
+    db_action = await crud.create_action(db, server_id=server_id, action=action.action, user_id=current_user.id)
+    if action_hub.publish(action_message(db_action)):
+        await crud.mark_actions_dispatched(db, [db_action.id])
+    
+    return {
+        "status": "success",
+        "action_id": db_action.id,
+        "message": f"Server {server_id} {action.action} requested"
+    }
+
+# Dashboard routes
+@app.get("/dashboard/stats", response_model=schemas.DashboardStats)
+async def read_dashboard_stats(
+    top: int = 10,
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """Fleet-wide usage: totals per game type, heaviest servers, p95 memory per owner (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    if not 0 <= top <= 100:
+        raise HTTPException(status_code=400, detail="top must be between 0 and 100")
+    
+    return await fleet_stats_cache.get(top_n=top)
 
 # User routes
 @app.post("/users/", response_model=schemas.User)
 async def create_user(
     user: schemas.UserCreate, 
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new user (admin only)"""
     if current_user.role != "admin":
@@ -149,17 +368,73 @@ async def create_user(
             detail="Not enough permissions"
         )
     
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    return crud.create_user(db=db, user=user)
+    return await crud.create_user(db=db, user=user)
+
+@app.get("/users/", response_model=List[schemas.User])
+async def read_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get list of users ordered by id (admin only), paginated like /servers/"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    users = await crud.get_users(db, limit=limit + 1, after_id=decode_cursor(cursor))
+    users, _ = paginate(users, limit, response)
+    return users
 
 @app.get("/users/me", response_model=schemas.User)
 async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
+# API key routes
+@app.get("/api-keys/", response_model=List[schemas.ApiKey])
+async def read_api_keys(
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the current user's API keys"""
+    return await crud.get_api_keys(db, user_id=current_user.id)
+
+@app.post("/api-keys/", response_model=schemas.ApiKeyCreated)
+async def create_api_key(
+    api_key: schemas.ApiKeyCreate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create an API key for the current user; the key is only shown in this response"""
+    db_api_key, key = await crud.create_api_key(db, api_key=api_key, user_id=current_user.id)
+    return schemas.ApiKeyCreated(**schemas.ApiKey.model_validate(db_api_key).model_dump(), key=key)
+
+@app.delete("/api-keys/{api_key_id}", response_model=schemas.ApiKey)
+async def delete_api_key(
+    api_key_id: int,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke an API key (own keys, or any key for admins)"""
+    db_api_key = await crud.get_api_key(db, api_key_id=api_key_id)
+    if db_api_key is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    if current_user.role != "admin" and db_api_key.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    return await crud.delete_api_key(db, api_key_id=api_key_id)
+
 # Main entry point
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,38 @@
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.database import engine
+
+logger = logging.getLogger("PyroPanel")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Revision matching the schema Base.metadata.create_all used to produce
+BASELINE_REVISION = "0001"
+
+def alembic_config() -> Config:
+    """Alembic configuration usable from any working directory"""
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "alembic"))
+    # Keep the application's logging setup
+    config.attributes["configure_logger"] = False
+    return config
+
+def upgrade_database(revision: str = "head"):
+    """
+    Bring the database schema up to date
+
+    Databases created before migrations existed (tables but no
+    alembic_version) are stamped at the baseline first, so only the newer
+    migrations run against them. Run once per deployment, not per worker.
+    """
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        logger.info(f"Existing database without migration history, stamping revision {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Table
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Index, Integer, String, Float, DateTime, Text, Table, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -7,8 +7,8 @@ from app.database import Base
 user_server_association = Table(
     'user_server_association',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
-    Column('server_id', Integer, ForeignKey('servers.id'))
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('server_id', Integer, ForeignKey('servers.id'), primary_key=True, index=True)
 )
 
 class User(Base):
@@ -57,12 +57,15 @@ class Server(Base):
     # Docker container ID
     container_id = Column(String, nullable=True)
     
+    # Sync revision, bumped on every change the daemons need to see
+    revision = Column(Integer, default=0, index=True)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Owner relationship
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     owner = relationship("User", back_populates="owned_servers")
     
     # Users with access
@@ -72,7 +75,7 @@ class Server(Base):
         back_populates="accessible_servers"
     )
     
-    # Server variables
+    # Server variables (loaded with the server, responses always include them)
     variables = relationship("ServerVariable", back_populates="server")
     
     # Backups
@@ -87,21 +90,22 @@ class ServerVariable(Base):
     value = Column(String)
     
     # Server relationship
-    server_id = Column(Integer, ForeignKey("servers.id"))
+    server_id = Column(Integer, ForeignKey("servers.id"), index=True)
     server = relationship("Server", back_populates="variables")
 
 class ApiKey(Base):
-    """API keys for programmatic access"""
+    """API keys for programmatic access (only a SHA-256 digest of the key is stored)"""
     __tablename__ = "api_keys"
 
     id = Column(Integer, primary_key=True, index=True)
-    key = Column(String, unique=True, index=True)
+    prefix = Column(String(16), index=True)
+    key_hash = Column(String(64), unique=True, index=True)
     description = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=True)
     
     # User relationship
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     user = relationship("User", back_populates="api_keys")
 
 class Backup(Base):
@@ -111,9 +115,128 @@ class Backup(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     path = Column(String)
-    size = Column(Integer)  # Size in bytes
+    size = Column(BigInteger)  # Size in bytes
+    kind = Column(String, default="full")  # full archive or incremental manifest
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Server relationship
-    server_id = Column(Integer, ForeignKey("servers.id"))
+    server_id = Column(Integer, ForeignKey("servers.id"), index=True)
     server = relationship("Server", back_populates="backups")
+
+class ServerTombstone(Base):
+    """Record of a deleted server, so daemons can drop it on incremental sync"""
+    __tablename__ = "server_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    server_id = Column(Integer, index=True)
+    revision = Column(Integer, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SyncCounter(Base):
+    """Monotonic counters used to order changes for incremental sync"""
+    __tablename__ = "sync_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, default=0)
+
+class ServerAction(Base):
+    """Action requested on a server (start, stop, restart, backup), executed by a daemon"""
+    __tablename__ = "server_actions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    action = Column(String)
+    status = Column(String, default="pending", index=True)  # pending, dispatched, completed, failed
+    message = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Server relationship
+    server_id = Column(Integer, ForeignKey("servers.id"), index=True)
+    server = relationship("Server")
+    
+    # User who requested the action
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class ServerStatSample(Base):
+    """Raw resource usage sample for a game server"""
+    __tablename__ = "server_stat_samples"
+
+    id = Column(Integer, primary_key=True)
+    server_id = Column(Integer, ForeignKey("servers.id"))
+    ts = Column(Integer)  # Unix timestamp (seconds)
+    cpu_usage = Column(Float)
+    memory_usage = Column(BigInteger)  # bytes
+    disk_usage = Column(BigInteger, nullable=True)  # bytes
+    uptime = Column(Integer)  # seconds
+    player_count = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_server_stat_samples_server_ts", "server_id", "ts"),
+        # Time-range scans across all servers (latest samples, rollups, retention)
+        Index("ix_server_stat_samples_ts_server", "ts", "server_id"),
+    )
+
+class HostStatSample(Base):
+    """Raw resource usage sample for a daemon host"""
+    __tablename__ = "host_stat_samples"
+
+    id = Column(Integer, primary_key=True)
+    host = Column(String)
+    ts = Column(Integer)  # Unix timestamp (seconds)
+    cpu_percent = Column(Float)
+    memory_used = Column(BigInteger)
+    memory_total = Column(BigInteger)
+    memory_percent = Column(Float)
+    disk_used = Column(BigInteger)
+    disk_total = Column(BigInteger)
+    disk_percent = Column(Float)
+
+    __table_args__ = (
+        Index("ix_host_stat_samples_host_ts", "host", "ts"),
+        Index("ix_host_stat_samples_ts_host", "ts", "host"),
+    )
+
+class ServerStatRollup(Base):
+    """Downsampled server stats (resolution 60 = per minute, 3600 = per hour)"""
+    __tablename__ = "server_stat_rollups"
+
+    id = Column(Integer, primary_key=True)
+    server_id = Column(Integer, ForeignKey("servers.id"))
+    resolution = Column(Integer)  # bucket size in seconds
+    bucket = Column(Integer)  # Unix timestamp of the bucket start
+    samples = Column(Integer)
+    cpu_avg = Column(Float)
+    cpu_max = Column(Float)
+    memory_avg = Column(Float)
+    memory_max = Column(BigInteger)
+    disk_avg = Column(Float, nullable=True)
+    disk_max = Column(BigInteger, nullable=True)
+    players_avg = Column(Float, nullable=True)
+    players_max = Column(Integer, nullable=True)
+    uptime_max = Column(Integer)
+
+    __table_args__ = (
+        UniqueConstraint("server_id", "resolution", "bucket", name="uq_server_stat_rollups_bucket"),
+    )
+
+class HostStatRollup(Base):
+    """Downsampled host stats (resolution 60 = per minute, 3600 = per hour)"""
+    __tablename__ = "host_stat_rollups"
+
+    id = Column(Integer, primary_key=True)
+    host = Column(String)
+    resolution = Column(Integer)
+    bucket = Column(Integer)
+    samples = Column(Integer)
+    cpu_avg = Column(Float)
+    cpu_max = Column(Float)
+    memory_avg = Column(Float)  # percent
+    memory_max = Column(Float)
+    memory_used_avg = Column(Float)
+    disk_avg = Column(Float)  # percent
+    disk_max = Column(Float)
+    disk_used_avg = Column(Float)
+
+    __table_args__ = (
+        UniqueConstraint("host", "resolution", "bucket", name="uq_host_stat_rollups_bucket"),
+    )
@@ -0,0 +1,45 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+# Keyset pagination: pages are ordered by id and a cursor holds the last id
+# of the previous page, so any page costs one index range scan
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor pointing after last_id"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Last id of the previous page, None for the first page"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+        if not isinstance(last_id, int):
+            raise ValueError(last_id)
+        return last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(rows: List, limit: int, response: Response) -> Tuple[List, Optional[str]]:
+    """
+    Trim a page fetched with limit + 1 rows (objects or dicts with an id)
+    and set the next-page header
+
+    Returns (page, next_cursor); next_cursor is None on the last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    next_cursor = encode_cursor(last["id"] if isinstance(last, dict) else last.id)
+    response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return page, next_cursor
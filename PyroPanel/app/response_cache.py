@@ -0,0 +1,79 @@
+import hashlib
+import os
+from typing import Hashable, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+from app.cache import TTLCache
+
+# Serialized server responses. Entries are stored with the revision they
+# were built at and only served for that revision, so a write made by any
+# worker is never hidden; crud write paths also evict entries locally.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client already holds the representation for etag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+def server_etag(server_id: int, revision: int) -> str:
+    """Strong ETag for one server at a given revision"""
+    return f'"server-{server_id}-{revision}"'
+
+def list_etag(key: Tuple, revision: int) -> str:
+    """Strong ETag for a server list page (principal scope and query) at a given sync revision"""
+    digest = hashlib.sha256(repr(key).encode()).hexdigest()[:16]
+    return f'"servers-{revision}-{digest}"'
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+def json_response(body: bytes, etag: str, headers: Optional[dict] = None) -> Response:
+    """Response for a cached body; clients must revalidate, which is cheap with the ETag"""
+    response = Response(content=body, media_type="application/json", headers=headers)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+class ResponseCache:
+    """Serialized server detail and list responses, keyed by revision"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self._servers = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lists = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _current(entry, revision: int):
+        if entry is None or entry[0] != revision:
+            return None
+        return entry[1]
+
+    def get_server(self, server_id: int, revision: int) -> Optional[bytes]:
+        return self._current(self._servers.get(server_id), revision)
+
+    def set_server(self, server_id: int, revision: int, body: bytes):
+        self._servers.set(server_id, (revision, body))
+
+    def get_list(self, key: Hashable, revision: int) -> Optional[Tuple[bytes, Optional[str]]]:
+        """(body, next_cursor) of a list page"""
+        return self._current(self._lists.get(key), revision)
+
+    def set_list(self, key: Hashable, revision: int, body: bytes, next_cursor: Optional[str]):
+        self._lists.set(key, (revision, (body, next_cursor)))
+
+    def invalidate_server(self, server_id: int):
+        """Drop a server's detail and every list page (any of them may include it)"""
+        self._servers.pop(server_id)
+        self._lists.clear()
+
+    def invalidate_lists(self):
+        self._lists.clear()
+
+    def clear(self):
+        self._servers.clear()
+        self._lists.clear()
+
+response_cache = ResponseCache()
@@ -21,6 +21,7 @@ class BackupBase(BaseModel):
     name: str
     path: str
     size: int
+    kind: str = "full"  # "full" archive or "incremental" manifest
 
 class BackupCreate(BackupBase):
     pass
@@ -37,11 +38,11 @@ class ApiKeyBase(BaseModel):
     description: Optional[str] = None
 
 class ApiKeyCreate(ApiKeyBase):
-    pass
+    expires_at: Optional[datetime] = None
 
 class ApiKey(ApiKeyBase):
     id: int
-    key: str
+    prefix: str
     user_id: int
     created_at: datetime
     expires_at: Optional[datetime] = None
@@ -49,6 +50,10 @@ class ApiKey(ApiKeyBase):
     class Config:
         from_attributes = True
 
+class ApiKeyCreated(ApiKey):
+    """Returned once on creation; the full key can't be retrieved later"""
+    key: str
+
 # User schemas
 class UserBase(BaseModel):
     username: str
@@ -85,12 +90,37 @@ class ServerBase(BaseModel):
 class ServerCreate(ServerBase):
     variables: Optional[List[ServerVariableCreate]] = None
 
+# Bulk schemas; each item gets its own result, with the status code and
+# detail the single-server endpoint would have returned
+BULK_MAX_ITEMS = 1000
+
+class ServerBulkCreate(BaseModel):
+    servers: List[ServerCreate] = Field(..., max_length=BULK_MAX_ITEMS)
+
+class ServerBulkUpdate(ServerCreate):
+    id: int
+
+class ServerBulkUpdateRequest(BaseModel):
+    servers: List[ServerBulkUpdate] = Field(..., max_length=BULK_MAX_ITEMS)
+
+class BulkItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[int] = Field(None, description="Server ID")
+    status_code: int
+    detail: Optional[str] = None
+    revision: Optional[int] = None
+    action_id: Optional[int] = None
+
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
+
 class Server(ServerBase):
     id: int
     status: str
     ip_address: Optional[str] = None
     container_id: Optional[str] = None
     owner_id: int
+    revision: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
     variables: List[ServerVariable] = []
@@ -99,9 +129,45 @@ class Server(ServerBase):
     class Config:
         from_attributes = True
 
+class ServerStatusUpdate(BaseModel):
+    status: str = Field(..., description="New status: running, stopped, error")
+    container_id: Optional[str] = None
+
+# Daemon sync schemas
+class ServerChanges(BaseModel):
+    revision: int = Field(..., description="Revision to pass as `since` on the next sync")
+    full: bool = Field(False, description="True when `servers` is the complete list")
+    servers: List[Server] = []
+    deleted: List[int] = []
+
 # Server action schema
+ACTIONS = ("start", "stop", "restart", "backup")
+
 class ServerAction(BaseModel):
-    action: str = Field(..., description="Action to perform: start, stop, restart")
+    action: str = Field(..., description="Action to perform: start, stop, restart, backup")
+
+class BulkServerAction(ServerAction):
+    server_ids: List[int] = Field(..., max_length=BULK_MAX_ITEMS)
+
+class ActionRecord(BaseModel):
+    id: int
+    server_id: int
+    action: str
+    status: str
+    message: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ActionComplete(BaseModel):
+    status: str = Field("completed", description="Outcome: completed or failed")
+    message: Optional[str] = None
+
+class ActionAck(ActionComplete):
+    """Completion ack sent by a daemon over the action channel"""
+    id: int
 
 # Token schemas
 class Token(BaseModel):
@@ -119,9 +185,99 @@ class ServerStats(BaseModel):
     uptime: int  # in seconds
     player_count: Optional[int] = None
 
+class ServerStatsSample(BaseModel):
+    server_id: int
+    timestamp: Optional[float] = Field(None, description="Unix time the sample was taken, defaults to receipt time")
+    cpu_usage: float
+    memory_usage: int
+    disk_usage: Optional[int] = None
+    uptime: int = 0
+    player_count: Optional[int] = None
+
+class HostStatsSample(BaseModel):
+    host: str
+    timestamp: Optional[float] = None
+    cpu_percent: float
+    memory_used: int
+    memory_total: int
+    memory_percent: float
+    disk_used: int
+    disk_total: int
+    disk_percent: float
+
+class StatsBatch(BaseModel):
+    servers: List[ServerStatsSample] = []
+    hosts: List[HostStatsSample] = []
+
+class StatsBatchResult(BaseModel):
+    servers: int
+    hosts: int
+    skipped: int = Field(0, description="Samples dropped because their server no longer exists")
+
+class StatsPoint(BaseModel):
+    t: int = Field(..., description="Bucket start (Unix time)")
+    samples: int
+    cpu_avg: Optional[float] = None
+    cpu_max: Optional[float] = None
+    memory_avg: Optional[float] = None
+    memory_max: Optional[int] = None
+    disk_avg: Optional[float] = None
+    disk_max: Optional[int] = None
+    players_avg: Optional[float] = None
+    players_max: Optional[int] = None
+    uptime_max: Optional[int] = None
+
+class StatsSeries(BaseModel):
+    resolution: int = Field(..., description="Bucket size in seconds, 0 for raw samples")
+    start: int
+    end: int
+    points: List[StatsPoint] = []
+
+class HostStatsPoint(BaseModel):
+    t: int
+    samples: int
+    cpu_avg: Optional[float] = None
+    cpu_max: Optional[float] = None
+    memory_avg: Optional[float] = None
+    memory_max: Optional[float] = None
+    memory_used_avg: Optional[float] = None
+    disk_avg: Optional[float] = None
+    disk_max: Optional[float] = None
+    disk_used_avg: Optional[float] = None
+
+class HostStatsSeries(BaseModel):
+    resolution: int
+    start: int
+    end: int
+    points: List[HostStatsPoint] = []
+
 # Dashboard schemas
+class GameTypeStats(BaseModel):
+    game_type: str
+    servers: int
+    active_servers: int
+    cpu_usage: float
+    memory_usage: int
+
+class TopServer(BaseModel):
+    id: int
+    name: str
+    cpu_usage: float
+    memory_usage: Optional[int] = None
+
+class OwnerMemoryStats(BaseModel):
+    owner_id: int
+    servers: int
+    memory_p95: float
+
 class DashboardStats(BaseModel):
     total_servers: int
     active_servers: int
     total_users: int
     system_load: float
+    total_cpu_usage: float = 0.0
+    total_memory_usage: int = 0
+    by_game_type: List[GameTypeStats] = []
+    top_servers: List[TopServer] = []
+    owner_memory_p95: List[OwnerMemoryStats] = []
+    generated_at: Optional[int] = None
@@ -0,0 +1,30 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+from app import schemas
+
+# Fast path for large server responses: rows are read as plain tuples,
+# shaped into dicts with the field order of the schemas and encoded with
+# orjson, skipping ORM objects and pydantic validation of data that came
+# straight from the database. The output is the same JSON the
+# response_model path produces (OPT_UTC_Z writes UTC as "Z" like pydantic).
+SERVER_FIELDS = tuple(name for name in schemas.Server.model_fields if name not in ("variables", "backups"))
+VARIABLE_FIELDS = tuple(schemas.ServerVariable.model_fields)
+BACKUP_FIELDS = tuple(schemas.Backup.model_fields)
+USER_FIELDS = tuple(schemas.User.model_fields)
+USER_FIELDS_WITH_HASH = tuple(schemas.UserInDB.model_fields)
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+def dumps(content: Any) -> bytes:
+    """Encode trusted data to JSON bytes"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class ORJSONResponse(Response):
+    """JSON response encoded with orjson; content is not validated against a response_model"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,35 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app import schemas, crud
 from app.database import get_db
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.Server])
-async def read_servers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_servers(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
     """Get list of servers"""
-    return crud.get_servers(db, skip=skip, limit=limit)
+    servers = await crud.get_server_dicts(db, limit=limit + 1, after_id=decode_cursor(cursor))
+    servers, _ = paginate(servers, limit, response)
+    return servers
 
 @router.post("/", response_model=schemas.Server)
-async def create_server(server: schemas.ServerCreate, db: Session = Depends(get_db)):
+async def create_server(server: schemas.ServerCreate, db: AsyncSession = Depends(get_db)):
     """Create a new server"""
-    return crud.create_server(db=db, server=server)
+    return await crud.create_server(db=db, server=server)
 
 @router.get("/{server_id}", response_model=schemas.Server)
-async def read_server(server_id: int, db: Session = Depends(get_db)):
+async def read_server(server_id: int, db: AsyncSession = Depends(get_db)):
     """Get server by ID"""
-    db_server = crud.get_server(db, server_id=server_id)
+    db_server = await crud.get_server_detail(db, server_id=server_id)
     if db_server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     return db_server
 
 @router.put("/{server_id}", response_model=schemas.Server)
-async def update_server(server_id: int, server: schemas.ServerCreate, db: Session = Depends(get_db)):
+async def update_server(server_id: int, server: schemas.ServerCreate, db: AsyncSession = Depends(get_db)):
     """Update a server"""
-    return crud.update_server(db=db, server_id=server_id, server=server)
+    return await crud.update_server(db=db, server_id=server_id, server=server)
 
 @router.delete("/{server_id}", response_model=schemas.Server)
-async def delete_server(server_id: int, db: Session = Depends(get_db)):
+async def delete_server(server_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a server"""
-    return crud.delete_server(db=db, server_id=server_id)
+    return await crud.delete_server(db=db, server_id=server_id)
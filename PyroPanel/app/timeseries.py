@@ -0,0 +1,390 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger("PyroPanel")
+
+# Raw samples are downsampled into per-minute rollups, those into per-hour
+# rollups, and each tier is pruned once past its retention. Range queries
+# read the coarsest tier that still gives enough points for a graph.
+
+RAW = 0
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = (RAW, MINUTE, HOUR)
+
+# Retention per tier and maintenance settings
+RAW_RETENTION = int(os.getenv("STATS_RAW_RETENTION_HOURS", "48")) * HOUR
+MINUTE_RETENTION = int(os.getenv("STATS_MINUTE_RETENTION_DAYS", "30")) * 86400
+HOUR_RETENTION = int(os.getenv("STATS_HOUR_RETENTION_DAYS", "365")) * 86400
+ROLLUP_INTERVAL = int(os.getenv("STATS_ROLLUP_INTERVAL", "60"))
+# Minutes are rolled up this long after they end; samples arriving later
+# (e.g. buffered by a daemon while the API was down) re-roll their buckets
+ROLLUP_DELAY = int(os.getenv("STATS_ROLLUP_DELAY", "120"))
+# Deleted servers are remembered this long for incremental daemon syncs
+TOMBSTONE_RETENTION = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30")) * 86400
+TOMBSTONE_FLOOR = "servers:tombstone_floor"
+
+SERVER_ROLLUP_COLUMNS = [
+    "server_id", "resolution", "bucket", "samples",
+    "cpu_avg", "cpu_max", "memory_avg", "memory_max",
+    "disk_avg", "disk_max", "players_avg", "players_max", "uptime_max",
+]
+HOST_ROLLUP_COLUMNS = [
+    "host", "resolution", "bucket", "samples",
+    "cpu_avg", "cpu_max", "memory_avg", "memory_max", "memory_used_avg",
+    "disk_avg", "disk_max", "disk_used_avg",
+]
+
+def _floor(ts: int, resolution: int) -> int:
+    return ts - ts % resolution
+
+def _weighted_avg(column, weight):
+    """Average of per-bucket averages, weighted by sample count (NULLs skipped)"""
+    return func.sum(column * weight) / func.nullif(
+        func.sum(case((column.isnot(None), weight), else_=0)), 0
+    )
+
+# Rollup queries: each returns rows in *_ROLLUP_COLUMNS order for [start, end)
+def _server_minute_select(start: int, end: int):
+    S = models.ServerStatSample
+    bucket = (S.ts // MINUTE) * MINUTE
+    return select(
+        S.server_id, literal(MINUTE), bucket, func.count(),
+        func.avg(S.cpu_usage), func.max(S.cpu_usage),
+        func.avg(S.memory_usage), func.max(S.memory_usage),
+        func.avg(S.disk_usage), func.max(S.disk_usage),
+        func.avg(S.player_count), func.max(S.player_count),
+        func.max(S.uptime),
+    ).where(S.ts >= start, S.ts < end).group_by(S.server_id, bucket)
+
+def _server_hour_select(start: int, end: int):
+    R = models.ServerStatRollup
+    bucket = (R.bucket // HOUR) * HOUR
+    return select(
+        R.server_id, literal(HOUR), bucket, func.sum(R.samples),
+        _weighted_avg(R.cpu_avg, R.samples), func.max(R.cpu_max),
+        _weighted_avg(R.memory_avg, R.samples), func.max(R.memory_max),
+        _weighted_avg(R.disk_avg, R.samples), func.max(R.disk_max),
+        _weighted_avg(R.players_avg, R.samples), func.max(R.players_max),
+        func.max(R.uptime_max),
+    ).where(R.resolution == MINUTE, R.bucket >= start, R.bucket < end).group_by(R.server_id, bucket)
+
+def _host_minute_select(start: int, end: int):
+    H = models.HostStatSample
+    bucket = (H.ts // MINUTE) * MINUTE
+    return select(
+        H.host, literal(MINUTE), bucket, func.count(),
+        func.avg(H.cpu_percent), func.max(H.cpu_percent),
+        func.avg(H.memory_percent), func.max(H.memory_percent), func.avg(H.memory_used),
+        func.avg(H.disk_percent), func.max(H.disk_percent), func.avg(H.disk_used),
+    ).where(H.ts >= start, H.ts < end).group_by(H.host, bucket)
+
+def _host_hour_select(start: int, end: int):
+    R = models.HostStatRollup
+    bucket = (R.bucket // HOUR) * HOUR
+    return select(
+        R.host, literal(HOUR), bucket, func.sum(R.samples),
+        _weighted_avg(R.cpu_avg, R.samples), func.max(R.cpu_max),
+        _weighted_avg(R.memory_avg, R.samples), func.max(R.memory_max),
+        _weighted_avg(R.memory_used_avg, R.samples),
+        _weighted_avg(R.disk_avg, R.samples), func.max(R.disk_max),
+        _weighted_avg(R.disk_used_avg, R.samples),
+    ).where(R.resolution == MINUTE, R.bucket >= start, R.bucket < end).group_by(R.host, bucket)
+
+# Watermarks ("rollup:<kind>:<resolution>") are kept in sync_counters and
+# hold the start of the first bucket that has not been rolled up yet. Late
+# markers ("<watermark>:late") hold the earliest timestamp that arrived
+# behind the watermark since the last maintenance run.
+def late_marker(name: str) -> str:
+    return f"{name}:late"
+
+def lower_late_marker(name: str, ts: int):
+    """Statement moving a late marker back to ts (no rows changed if there is none yet)"""
+    C = models.SyncCounter
+    return update(C).where(C.name == late_marker(name)).values(
+        value=case((C.value > ts, ts), else_=C.value)
+    )
+
+def _get_watermark(db: Session, name: str) -> int:
+    value = db.query(models.SyncCounter.value).filter(models.SyncCounter.name == name).scalar()
+    return value or 0
+
+def _set_watermark(db: Session, name: str, value: int):
+    result = db.execute(
+        update(models.SyncCounter).where(models.SyncCounter.name == name).values(value=value)
+    )
+    if result.rowcount == 0:
+        db.add(models.SyncCounter(name=name, value=value))
+
+def _mark_late(db: Session, name: str, ts: int):
+    if db.execute(lower_late_marker(name, ts)).rowcount == 0:
+        db.add(models.SyncCounter(name=late_marker(name), value=ts))
+        db.flush()
+
+def _rollup(db: Session, name: str, target, columns: List[str], build_select: Callable,
+            resolution: int, first_source_ts: Callable, until: int) -> int:
+    """Roll source rows between the watermark and `until` into target buckets"""
+    until = _floor(until, resolution)
+    start = _get_watermark(db, name)
+    if not start:
+        first = first_source_ts()
+        if first is None:
+            return 0
+        start = _floor(first, resolution)
+    if start >= until:
+        return start
+
+    db.execute(insert(target).from_select(columns, build_select(start, until)))
+    _set_watermark(db, name, until)
+    return until
+
+def _reroll(db: Session, name: str, target, columns: List[str], build_select: Callable,
+            resolution: int, retained_since: int) -> Optional[int]:
+    """
+    Recompute rolled-up buckets that received late source rows
+
+    Only buckets whose source rows are all still retained (from
+    `retained_since` on) are rebuilt. Returns the start of the first rebuilt
+    bucket, if any.
+    """
+    late = _get_watermark(db, late_marker(name))
+    if not late:
+        return None
+    C = models.SyncCounter
+    # Conditional, so a marker lowered by a concurrent ingest survives
+    db.execute(delete(C).where(C.name == late_marker(name), C.value == late))
+
+    start = max(_floor(late, resolution), _floor(retained_since, resolution) + resolution)
+    end = _get_watermark(db, name)
+    if start >= end:
+        return None
+    db.execute(delete(target).where(target.resolution == resolution, target.bucket >= start, target.bucket < end))
+    db.execute(insert(target).from_select(columns, build_select(start, end)))
+    return start
+
+def run_rollups(db: Session, now: Optional[int] = None):
+    """Rebuild buckets that received late samples, then advance the minute and hour rollups"""
+    now = now or int(time.time())
+    S, SR = models.ServerStatSample, models.ServerStatRollup
+    H, HR = models.HostStatSample, models.HostStatRollup
+
+    rerolled = _reroll(
+        db, "rollup:server:60", SR, SERVER_ROLLUP_COLUMNS, _server_minute_select, MINUTE, now - RAW_RETENTION
+    )
+    if rerolled is not None:
+        _mark_late(db, "rollup:server:3600", rerolled)
+    minute = _rollup(
+        db, "rollup:server:60", SR, SERVER_ROLLUP_COLUMNS, _server_minute_select, MINUTE,
+        lambda: db.query(func.min(S.ts)).scalar(), now - ROLLUP_DELAY
+    )
+    _reroll(
+        db, "rollup:server:3600", SR, SERVER_ROLLUP_COLUMNS, _server_hour_select, HOUR, now - MINUTE_RETENTION
+    )
+    _rollup(
+        db, "rollup:server:3600", SR, SERVER_ROLLUP_COLUMNS, _server_hour_select, HOUR,
+        lambda: db.query(func.min(SR.bucket)).filter(SR.resolution == MINUTE).scalar(), minute
+    )
+
+    rerolled = _reroll(
+        db, "rollup:host:60", HR, HOST_ROLLUP_COLUMNS, _host_minute_select, MINUTE, now - RAW_RETENTION
+    )
+    if rerolled is not None:
+        _mark_late(db, "rollup:host:3600", rerolled)
+    minute = _rollup(
+        db, "rollup:host:60", HR, HOST_ROLLUP_COLUMNS, _host_minute_select, MINUTE,
+        lambda: db.query(func.min(H.ts)).scalar(), now - ROLLUP_DELAY
+    )
+    _reroll(
+        db, "rollup:host:3600", HR, HOST_ROLLUP_COLUMNS, _host_hour_select, HOUR, now - MINUTE_RETENTION
+    )
+    _rollup(
+        db, "rollup:host:3600", HR, HOST_ROLLUP_COLUMNS, _host_hour_select, HOUR,
+        lambda: db.query(func.min(HR.bucket)).filter(HR.resolution == MINUTE).scalar(), minute
+    )
+
+def prune(db: Session, now: Optional[int] = None):
+    """Delete rows past retention, never before they have been rolled up"""
+    now = now or int(time.time())
+    S, SR = models.ServerStatSample, models.ServerStatRollup
+    H, HR = models.HostStatSample, models.HostStatRollup
+
+    for kind, raw, rollup, ts in (("server", S, SR, S.ts), ("host", H, HR, H.ts)):
+        raw_cutoff = min(now - RAW_RETENTION, _get_watermark(db, f"rollup:{kind}:60"))
+        minute_cutoff = min(now - MINUTE_RETENTION, _get_watermark(db, f"rollup:{kind}:3600"))
+        hour_cutoff = now - HOUR_RETENTION
+
+        db.execute(delete(raw).where(ts < raw_cutoff))
+        db.execute(delete(rollup).where(rollup.resolution == MINUTE, rollup.bucket < minute_cutoff))
+        db.execute(delete(rollup).where(rollup.resolution == HOUR, rollup.bucket < hour_cutoff))
+
+def prune_tombstones(db: Session, now: Optional[int] = None):
+    """
+    Delete server tombstones past retention
+
+    The highest pruned revision becomes the sync floor: a daemon that last
+    synced before it could miss those deletions, so it is sent the full
+    server list instead.
+    """
+    now = now or int(time.time())
+    T = models.ServerTombstone
+    cutoff = datetime.fromtimestamp(now - TOMBSTONE_RETENTION, timezone.utc)
+    floor = db.query(func.max(T.revision)).filter(T.deleted_at < cutoff).scalar()
+    if floor is None:
+        return
+    db.execute(delete(T).where(T.revision <= floor))
+    if floor > _get_watermark(db, TOMBSTONE_FLOOR):
+        _set_watermark(db, TOMBSTONE_FLOOR, floor)
+
+def analyze(db: Session):
+    """
+    Refresh SQLite's planner statistics (other backends keep their own)
+
+    Without them SQLite reads every sample to find the latest ones per
+    server instead of seeking through the timestamp indexes. The sample
+    count is capped, so this stays cheap on large tables.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    db.execute(text("PRAGMA analysis_limit=1000"))
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+def run_maintenance(db: Session, now: Optional[int] = None):
+    """Roll up and prune stats, and prune old server tombstones, in one transaction"""
+    try:
+        run_rollups(db, now)
+        prune(db, now)
+        prune_tombstones(db, now)
+        db.commit()
+    except IntegrityError:
+        # Another worker rolled up the same buckets first
+        db.rollback()
+        logger.debug("Stats rollup already done by another worker")
+        return
+    analyze(db)
+
+def _run_maintenance_session():
+    db = SessionLocal()
+    try:
+        run_maintenance(db)
+    finally:
+        db.close()
+
+async def maintenance_loop(interval: int = ROLLUP_INTERVAL):
+    """Background task running stats maintenance every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_run_maintenance_session)
+        except Exception as e:
+            logger.error(f"Stats maintenance failed: {e}")
+
+# Range queries
+def pick_resolution(start: int, end: int) -> int:
+    """Coarsest tier that still gives enough points for the range"""
+    span = end - start
+    if span <= 6 * HOUR and start >= time.time() - RAW_RETENTION:
+        return RAW
+    if span <= 7 * 86400:
+        return MINUTE
+    return HOUR
+
+def _rows_to_points(rows, columns: List[str], skip: int) -> List[Dict]:
+    """Map rollup rows to points, dropping the key/resolution columns"""
+    points = []
+    for row in rows:
+        point = dict(zip(columns[skip:], row[skip:]))
+        point["t"] = point.pop("bucket")
+        points.append(point)
+    return points
+
+def get_server_series(db: Session, server_id: int, start: int, end: int,
+                      resolution: Optional[int] = None) -> Dict:
+    """Stats for one server over [start, end) at the given or best resolution"""
+    resolution = pick_resolution(start, end) if resolution is None else resolution
+    S, SR = models.ServerStatSample, models.ServerStatRollup
+
+    if resolution == RAW:
+        rows = db.query(
+            S.ts, S.cpu_usage, S.memory_usage, S.disk_usage, S.player_count, S.uptime
+        ).filter(S.server_id == server_id, S.ts >= start, S.ts < end).order_by(S.ts).all()
+        points = [
+            {
+                "t": ts, "samples": 1,
+                "cpu_avg": cpu, "cpu_max": cpu,
+                "memory_avg": memory, "memory_max": memory,
+                "disk_avg": disk, "disk_max": disk,
+                "players_avg": players, "players_max": players,
+                "uptime_max": uptime,
+            }
+            for ts, cpu, memory, disk, players, uptime in rows
+        ]
+        return {"resolution": RAW, "start": start, "end": end, "points": points}
+
+    columns = [getattr(SR, name) for name in SERVER_ROLLUP_COLUMNS]
+    rows = db.query(*columns).filter(
+        SR.server_id == server_id, SR.resolution == resolution, SR.bucket >= start, SR.bucket < end
+    ).order_by(SR.bucket).all()
+    points = _rows_to_points(rows, SERVER_ROLLUP_COLUMNS, 2)
+
+    # Buckets past the watermark are not stored yet, aggregate them on the fly
+    watermark = _get_watermark(db, f"rollup:server:{resolution}")
+    if watermark < end:
+        build = _server_minute_select if resolution == MINUTE else _server_hour_select
+        S_or_SR = S if resolution == MINUTE else SR
+        tail = db.execute(
+            build(max(start, watermark), end).where(S_or_SR.server_id == server_id)
+        ).all()
+        points.extend(sorted(_rows_to_points(tail, SERVER_ROLLUP_COLUMNS, 2), key=lambda p: p["t"]))
+
+    return {"resolution": resolution, "start": start, "end": end, "points": points}
+
+def get_host_series(db: Session, host: str, start: int, end: int,
+                    resolution: Optional[int] = None) -> Dict:
+    """Stats for one daemon host over [start, end) at the given or best resolution"""
+    resolution = pick_resolution(start, end) if resolution is None else resolution
+    H, HR = models.HostStatSample, models.HostStatRollup
+
+    if resolution == RAW:
+        rows = db.query(
+            H.ts, H.cpu_percent, H.memory_percent, H.memory_used, H.disk_percent, H.disk_used
+        ).filter(H.host == host, H.ts >= start, H.ts < end).order_by(H.ts).all()
+        points = [
+            {
+                "t": ts, "samples": 1,
+                "cpu_avg": cpu, "cpu_max": cpu,
+                "memory_avg": memory, "memory_max": memory, "memory_used_avg": memory_used,
+                "disk_avg": disk, "disk_max": disk, "disk_used_avg": disk_used,
+            }
+            for ts, cpu, memory, memory_used, disk, disk_used in rows
+        ]
+        return {"resolution": RAW, "start": start, "end": end, "points": points}
+
+    columns = [getattr(HR, name) for name in HOST_ROLLUP_COLUMNS]
+    rows = db.query(*columns).filter(
+        HR.host == host, HR.resolution == resolution, HR.bucket >= start, HR.bucket < end
+    ).order_by(HR.bucket).all()
+    points = _rows_to_points(rows, HOST_ROLLUP_COLUMNS, 2)
+
+    watermark = _get_watermark(db, f"rollup:host:{resolution}")
+    if watermark < end:
+        build = _host_minute_select if resolution == MINUTE else _host_hour_select
+        H_or_HR = H if resolution == MINUTE else HR
+        tail = db.execute(
+            build(max(start, watermark), end).where(H_or_HR.host == host)
+        ).all()
+        points.extend(sorted(_rows_to_points(tail, HOST_ROLLUP_COLUMNS, 2), key=lambda p: p["t"]))
+
+    return {"resolution": resolution, "start": start, "end": end, "points": points}
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from daemon.api_client import ApiClient
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+# Handler receives an action and returns (status, message) for the ack
+ActionHandler = Callable[[Dict], Awaitable[Tuple[str, Optional[str]]]]
+
+
+class ActionChannel:
+    """
+    Persistent WebSocket channel that receives server actions from the panel
+
+    Actions are pushed the moment they are recorded and each one is run in
+    its own task, so a slow backup does not hold up a start/stop behind it.
+    Completion acks go back on the same socket. The connection is re-opened
+    with backoff whenever it drops; while it is down the daemon falls back
+    to polling.
+    """
+
+    def __init__(self, api: ApiClient, handler: ActionHandler, path: str = "/api/actions/ws",
+                 heartbeat: float = 30.0, max_reconnect_delay: float = 30.0):
+        self.api = api
+        self.handler = handler
+        self.path = path
+        self.heartbeat = heartbeat
+        self.max_reconnect_delay = max_reconnect_delay
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._tasks = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def run(self):
+        """Keep the channel connected until cancelled"""
+        delay = 1.0
+        while True:
+            try:
+                async with self.api.ws_connect(self.path, heartbeat=self.heartbeat) as ws:
+                    self._ws = ws
+                    delay = 1.0
+                    logger.info("Action channel connected")
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._on_message(json.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+                logger.warning("Action channel closed, falling back to polling")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Action channel unavailable ({e}), falling back to polling")
+            finally:
+                self._ws = None
+
+            await asyncio.sleep(delay)
+            delay = min(self.max_reconnect_delay, delay * 2)
+
+    def _on_message(self, message: Dict):
+        """Start a task for each action pushed by the panel"""
+        if message.get("type") != "action":
+            return
+        task = asyncio.ensure_future(self._run_action(message["action"]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_action(self, action: Dict):
+        """Run an action and ack its outcome"""
+        try:
+            result = await self.handler(action)
+            if result is None:
+                # Already running or handled elsewhere
+                return
+            status, message = result
+            await self.ack(action["id"], status, message)
+        except Exception as e:
+            logger.error(f"Error running action {action.get('id')}: {e}")
+
+    async def ack(self, action_id: int, status: str, message: Optional[str] = None):
+        """Send a completion ack, falling back to the REST endpoint"""
+        payload = {"type": "ack", "id": action_id, "status": status, "message": message}
+        if self.connected:
+            try:
+                await self._ws.send_json(payload)
+                return
+            except Exception as e:
+                logger.warning(f"Could not ack action {action_id} over the channel: {e}")
+        await self.api.put(f"/api/actions/{action_id}/complete", json={"status": status, "message": message})
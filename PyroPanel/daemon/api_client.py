@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Any, Dict, Mapping, Optional
+
+import aiohttp
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Methods that can be repeated without changing the result. A POST that hit
+# a timeout or a 5xx may still have been applied, so it is only retried when
+# the API can't have seen it: the connection failed or it was rate limited.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class ApiResponse:
+    """Fully-read response returned by ApiClient"""
+
+    def __init__(self, status_code: int, headers: Mapping[str, str], body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class ApiClient:
+    """
+    Shared async HTTP client for daemon -> panel API traffic
+
+    Keeps a single aiohttp session with a keep-alive connection pool so
+    every call reuses an open connection instead of a fresh TCP handshake.
+    Each call has its own timeout and is retried with exponential backoff
+    on connection errors and retryable status codes (for POST, only when the
+    request can't have been processed).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        keepalive_timeout: float = 60.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+    ):
+        """Initialize the client (the session is created lazily)"""
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ApiClient":
+        """Build a client from the daemon configuration"""
+        return cls(
+            base_url=config.get("api_url", "http://localhost:8000"),
+            api_key=config.get("api_key", ""),
+            timeout=config.get("api_timeout", 10),
+            max_connections=config.get("api_max_connections", 20),
+            keepalive_timeout=config.get("api_keepalive_timeout", 60),
+            retries=config.get("api_retries", 3),
+            backoff=config.get("api_retry_backoff", 0.5),
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._session
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        **kwargs,
+    ) -> ApiResponse:
+        """
+        Send a request to the API and return the fully-read response
+
+        Raises the last aiohttp/timeout error once the attempts run out (or
+        straight away for a POST the API may have received); a response
+        with a non-retryable status is returned as is.
+        """
+        url = f"{self.base_url}{path}"
+        attempts = (self.retries if retries is None else retries) + 1
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+        for attempt in range(attempts):
+            try:
+                async with self.session.request(method, url, timeout=client_timeout, **kwargs) as response:
+                    body = await response.read()
+                    result = ApiResponse(response.status, response.headers.copy(), body)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                never_sent = isinstance(e, aiohttp.ClientConnectorError)
+                if attempt == attempts - 1 or not (idempotent or never_sent):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"{method} {path} failed ({e!r}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            retryable = result.status_code == 429 or (idempotent and result.status_code in RETRY_STATUSES)
+            if retryable and attempt < attempts - 1:
+                delay = self._retry_delay(attempt)
+                retry_after = result.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                logger.warning(f"{method} {path} returned {result.status_code}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            return result
+
+    async def get(self, path: str, **kwargs) -> ApiResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> ApiResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs) -> ApiResponse:
+        return await self.request("PUT", path, **kwargs)
+
+    def ws_connect(self, path: str, **kwargs):
+        """Open a WebSocket to the API on the shared session (use as async context manager)"""
+        url = self.base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1) + path
+        return self.session.ws_connect(url, **kwargs)
+
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
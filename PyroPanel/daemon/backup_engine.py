@@ -0,0 +1,213 @@
+import collections
+import gzip
+import logging
+import os
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from daemon.io_throttle import BandwidthLimiter, ThrottledWriter
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional
+    zstandard = None
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+# progress(bytes_done, bytes_total)
+ProgressCallback = Callable[[int, int], None]
+
+COMPRESSIONS = ("gzip", "zstd")
+EXTENSIONS = {"gzip": ".tar.gz", "zstd": ".tar.zst"}
+
+
+class ParallelGzipWriter:
+    """
+    Write-only file object producing a multi-member gzip stream (pigz-style)
+
+    Input is cut into fixed-size blocks and every block is compressed as an
+    independent gzip member on the thread pool (zlib releases the GIL, so
+    blocks really compress in parallel). Members are written out in order;
+    the concatenation is a valid .gz file for gzip, tar and Python alike.
+    """
+
+    def __init__(self, fileobj, executor: ThreadPoolExecutor, level: int = 6,
+                 block_size: int = 4 * 1024 * 1024, max_pending: int = 8):
+        self.fileobj = fileobj
+        self.executor = executor
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = max_pending
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self._pending.append(self.executor.submit(gzip.compress, block, self.level))
+        # Bound memory: never hold more than max_pending blocks in flight
+        while len(self._pending) > self.max_pending:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self.fileobj.write(self._pending.popleft().result())
+        self.closed = True
+
+
+class _SourceReader:
+    """
+    Reads a file for tarfile while reporting progress
+
+    Game servers keep writing while a backup runs; if a file shrinks after
+    its header was written the rest is padded with zeros (like GNU tar) so
+    the stream stays consistent.
+    """
+
+    def __init__(self, fileobj, on_read: Callable[[int], None]):
+        self.fileobj = fileobj
+        self.on_read = on_read
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        if size and size > 0 and len(data) < size:
+            data += b"\0" * (size - len(data))
+        self.on_read(len(data))
+        return data
+
+
+class BackupEngine:
+    """
+    Creates compressed tar archives of server volumes off the event loop
+
+    create_archive is blocking and meant to be run in an executor; the
+    compression itself is spread over `workers` threads.
+    """
+
+    def __init__(self, compression: str = "gzip", level: Optional[int] = None, workers: int = 0,
+                 block_size: int = 4 * 1024 * 1024, read_limiter: Optional[BandwidthLimiter] = None,
+                 write_limiter: Optional[BandwidthLimiter] = None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown backup compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, falling back to gzip backups")
+            compression = "gzip"
+
+        self.compression = compression
+        self.level = level if level is not None else (3 if compression == "zstd" else 6)
+        self.workers = workers or os.cpu_count() or 1
+        self.block_size = block_size
+        self.read_limiter = read_limiter
+        self.write_limiter = write_limiter
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backup-compress")
+
+    @classmethod
+    def from_config(cls, config) -> "BackupEngine":
+        return cls(
+            compression=config.get("backup_compression", "gzip"),
+            level=config.get("backup_compression_level"),
+            workers=config.get("backup_workers", 0),
+            read_limiter=BandwidthLimiter.from_mb(config.get("backup_read_limit", 0)),
+            write_limiter=BandwidthLimiter.from_mb(config.get("backup_write_limit", 0)),
+        )
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.compression]
+
+    @staticmethod
+    def _total_size(sources: List[Tuple[str, str]]) -> int:
+        total = 0
+        for source, _ in sources:
+            for root, _, files in os.walk(source):
+                for name in files:
+                    try:
+                        total += os.lstat(os.path.join(root, name)).st_size
+                    except OSError:
+                        pass
+        return total
+
+    def _open_writer(self, fileobj):
+        if self.compression == "zstd":
+            compressor = zstandard.ZstdCompressor(level=self.level, threads=self.workers)
+            return compressor.stream_writer(fileobj, closefd=False)
+        return ParallelGzipWriter(fileobj, self.executor, self.level, self.block_size, self.workers * 2)
+
+    def _add_tree(self, tar: tarfile.TarFile, source: str, arcname: str, on_read: Callable[[int], None]):
+        """Add a directory tree, reading file contents through _SourceReader"""
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            rel = os.path.relpath(root, source)
+            base = arcname if rel == "." else os.path.join(arcname, rel)
+            entries = [(root, base)] + [(os.path.join(root, name), os.path.join(base, name)) for name in sorted(files)]
+            for path, name in entries:
+                try:
+                    info = tar.gettarinfo(path, arcname=name)
+                    if info is None:
+                        continue  # sockets and the like
+                    if info.isreg():
+                        with open(path, "rb") as f:
+                            tar.addfile(info, _SourceReader(f, on_read))
+                    else:
+                        tar.addfile(info)
+                except FileNotFoundError:
+                    # Deleted by the game server while we were walking
+                    continue
+
+    def create_archive(self, sources: List[Tuple[str, str]], dest_path: str,
+                       progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Archive (source directory, name in archive) pairs into dest_path
+
+        Writes to a temporary file that is renamed on success. Returns the
+        archive size in bytes.
+        """
+        total = self._total_size(sources)
+        done = 0
+
+        def on_read(n: int):
+            nonlocal done
+            if self.read_limiter is not None:
+                self.read_limiter.consume(n)
+            done += n
+            if progress is not None:
+                progress(done, total)
+
+        part_path = dest_path + ".part"
+        try:
+            with open(part_path, "wb") as raw:
+                writer = self._open_writer(ThrottledWriter(raw, self.write_limiter) if self.write_limiter else raw)
+                try:
+                    with tarfile.open(fileobj=writer, mode="w|") as tar:
+                        for source, arcname in sources:
+                            self._add_tree(tar, source, arcname.lstrip("/") or ".", on_read)
+                finally:
+                    writer.close()
+            os.replace(part_path, dest_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+        if progress is not None:
+            progress(total, total)
+        return os.path.getsize(dest_path)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
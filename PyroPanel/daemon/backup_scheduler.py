@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import logging
+import random
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+
+class BackupScheduler:
+    """
+    Spreads scheduled backups across the backup interval
+
+    Every server gets a fixed offset inside the interval (derived from its
+    ID, so it survives restarts) plus random jitter, instead of all servers
+    being backed up the moment the interval elapses. At most
+    `max_concurrent` backups run at a time; scheduled and on-demand
+    backups share the same limit.
+    """
+
+    def __init__(self, interval: float, max_concurrent: int = 1, jitter: float = 0):
+        self.interval = max(1.0, interval)
+        self.jitter = max(0.0, min(jitter, self.interval))
+        self.max_concurrent = max(1, max_concurrent)
+        self._semaphore = None
+        self._slots: Dict[int, float] = {}  # Server ID -> next slot (without jitter)
+        self._next_run: Dict[int, float] = {}  # Server ID -> next run time
+        self.in_progress: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, config) -> "BackupScheduler":
+        interval = config.get("backup_interval", 86400)
+        return cls(
+            interval,
+            max_concurrent=config.get("backup_concurrency", 1),
+            jitter=config.get("backup_jitter", min(600, interval / 10)),
+        )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Per-host backup slots (created lazily, inside the running loop)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    def offset(self, server_id: int) -> float:
+        """Stable position of a server inside the interval"""
+        digest = hashlib.sha256(str(server_id).encode()).digest()
+        return int.from_bytes(digest[:8], "big") % int(self.interval)
+
+    def _plan(self, server_id: int, slot: float):
+        self._slots[server_id] = slot
+        self._next_run[server_id] = slot + random.uniform(0, self.jitter)
+
+    def due(self, server_ids: Iterable[int], now: float) -> List[int]:
+        """
+        Servers whose backup time has come
+
+        Each returned server is advanced to its next slot, so it is only
+        returned once per interval.
+        """
+        server_ids = set(server_ids)
+        for server_id in list(self._slots):
+            if server_id not in server_ids:
+                self._slots.pop(server_id)
+                self._next_run.pop(server_id, None)
+
+        result = []
+        for server_id in server_ids:
+            if server_id not in self._slots:
+                slot = now - now % self.interval + self.offset(server_id)
+                if slot <= now:
+                    slot += self.interval
+                self._plan(server_id, slot)
+                continue
+
+            if now >= self._next_run[server_id]:
+                slot = self._slots[server_id]
+                while slot <= now:
+                    slot += self.interval
+                self._plan(server_id, slot)
+                result.append(server_id)
+        return result
+
+    def submit(self, server_id: int, coro):
+        """Run a backup coroutine in the background, skipping servers already being backed up"""
+        if server_id in self.in_progress:
+            coro.close()
+            logger.info(f"Backup of server {server_id} still running, skipping")
+            return None
+
+        async def run():
+            try:
+                await coro
+            finally:
+                self.in_progress.discard(server_id)
+
+        self.in_progress.add(server_id)
+        task = asyncio.ensure_future(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def close(self):
+        """Cancel running backups"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
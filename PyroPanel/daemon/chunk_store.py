@@ -0,0 +1,385 @@
+import hashlib
+import json
+import logging
+import os
+import stat
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from daemon.io_throttle import BandwidthLimiter
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Gear table for the rolling hash; derived deterministically so chunk
+# boundaries (and therefore deduplication) are stable across runs
+GEAR = np.array([int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "little") for i in range(256)],
+                dtype=np.uint64)
+
+# The hash is shifted left once per byte, so a byte stops affecting it after
+# 64 steps: h[i] is the sum of GEAR[data[i - k]] << k for k < 64
+GEAR_WINDOW = 64
+
+# Bytes hashed per NumPy pass; most chunks are cut well before max_size
+SCAN_BLOCK = 64 * 1024
+
+# progress(bytes_done, bytes_total)
+ProgressCallback = Callable[[int, int], None]
+
+
+def _mask(bits: int) -> int:
+    """Mask with `bits` one-bits spread over the high half of the hash"""
+    mask = 0
+    for i in range(bits):
+        mask |= 1 << (63 - 2 * i)
+    return mask
+
+
+class Chunker:
+    """
+    FastCDC content-defined chunking with a gear rolling hash
+
+    Boundaries depend on content rather than offsets, so an insert early in
+    a file only changes the chunks around it. Normalized chunking (a
+    stricter mask before avg_size, a looser one after) keeps chunk sizes
+    close to the average. The hash is computed a block at a time with NumPy
+    rather than byte by byte.
+    """
+
+    def __init__(self, min_size: int = 256 * 1024, avg_size: int = 1024 * 1024, max_size: int = 4 * 1024 * 1024):
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        bits = max(1, avg_size.bit_length() - 1)
+        self.mask_s = _mask(bits + 2)
+        self.mask_l = _mask(max(1, bits - 2))
+
+    def _hashes(self, data, start: int, stop: int) -> np.ndarray:
+        """Rolling hash after each byte of data[start:stop], starting from 0 at min_size"""
+        lo = max(self.min_size, start - (GEAR_WINDOW - 1))
+        h = np.zeros(stop - start + GEAR_WINDOW - 1, dtype=np.uint64)
+        np.take(GEAR, np.frombuffer(data, dtype=np.uint8, count=stop - lo, offset=lo),
+                out=h[GEAR_WINDOW - 1 - (start - lo):])
+        # Sum the window by doubling: h holds the last `width` terms, then
+        # adds the previous `width` shifted past them (wrapping like the
+        # 64-bit hash does)
+        shifted = np.empty_like(h)
+        width = 1
+        while width < GEAR_WINDOW:
+            np.left_shift(h[:-width], np.uint64(width), out=shifted[width:])
+            np.add(h[width:], shifted[width:], out=h[width:])
+            width *= 2
+        return h[GEAR_WINDOW - 1:]
+
+    def _find(self, data, start: int, stop: int, mask: int) -> Optional[int]:
+        """Index of the first byte in data[start:stop] after which the hash has no mask bits set"""
+        mask = np.uint64(mask)
+        for block in range(start, stop, SCAN_BLOCK):
+            block_stop = min(block + SCAN_BLOCK, stop)
+            hits = np.flatnonzero((self._hashes(data, block, block_stop) & mask) == 0)
+            if hits.size:
+                return block + int(hits[0])
+        return None
+
+    def cut_point(self, data, end: int) -> int:
+        """Length of the first chunk in data[:end]"""
+        if end <= self.min_size:
+            return end
+        limit = min(end, self.max_size)
+        normal = min(self.avg_size, limit)
+        i = self._find(data, self.min_size, normal, self.mask_s)
+        if i is None:
+            i = self._find(data, normal, limit, self.mask_l)
+        return limit if i is None else i + 1
+
+    def chunks(self, fileobj, read_size: int = 8 * 1024 * 1024) -> Iterator[bytes]:
+        """Split a file object into content-defined chunks"""
+        buffer = bytearray()
+        eof = False
+        while True:
+            while not eof and len(buffer) < self.max_size:
+                data = fileobj.read(read_size)
+                if not data:
+                    eof = True
+                else:
+                    buffer += data
+            if not buffer:
+                return
+            cut = self.cut_point(buffer, len(buffer))
+            yield bytes(buffer[:cut])
+            del buffer[:cut]
+
+
+class ChunkStore:
+    """
+    Content-addressed store of compressed chunks
+
+    A chunk lives at <root>/<sha256[:2]>/<sha256> and is written once;
+    every backup referencing the same content shares it.
+    """
+
+    def __init__(self, root: str, level: int = 6, write_limiter: Optional[BandwidthLimiter] = None):
+        self.root = root
+        self.level = level
+        self.write_limiter = write_limiter
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """Store a chunk, returns (digest, bytes written to disk)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, self.level)
+        if self.write_limiter is not None:
+            self.write_limiter.consume(len(compressed))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        return digest, len(compressed)
+
+    def get(self, digest: str) -> bytes:
+        """Read and verify a chunk"""
+        with open(self._path(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupt")
+        return data
+
+
+class IncrementalBackup:
+    """
+    Deduplicated backups of server volumes on top of a ChunkStore
+
+    A backup is a JSON manifest listing every entry of the tree; regular
+    files map to a list of chunk digests. Files whose size and mtime match
+    the previous manifest reuse its chunk list without being read, and
+    chunks already in the store are never written again.
+    """
+
+    def __init__(self, backup_dir: str, level: int = 6, chunker: Optional[Chunker] = None,
+                 read_limiter: Optional[BandwidthLimiter] = None, write_limiter: Optional[BandwidthLimiter] = None):
+        self.backup_dir = backup_dir
+        self.store = ChunkStore(os.path.join(backup_dir, "chunks"), level, write_limiter)
+        self.chunker = chunker or Chunker()
+        self.read_limiter = read_limiter
+
+    @classmethod
+    def from_config(cls, config) -> "IncrementalBackup":
+        return cls(
+            config.get("backup_dir", "backups"),
+            level=config.get("backup_compression_level") or 6,
+            read_limiter=BandwidthLimiter.from_mb(config.get("backup_read_limit", 0)),
+            write_limiter=BandwidthLimiter.from_mb(config.get("backup_write_limit", 0)),
+        )
+
+    @staticmethod
+    def latest_manifest(directory: str) -> Optional[str]:
+        """Newest manifest in a server's backup directory"""
+        if not os.path.isdir(directory):
+            return None
+        manifests = [name for name in os.listdir(directory) if name.endswith(MANIFEST_SUFFIX)]
+        if not manifests:
+            return None
+        return os.path.join(directory, max(manifests, key=lambda name: os.path.getmtime(os.path.join(directory, name))))
+
+    @staticmethod
+    def load_manifest(path: str) -> Dict:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version in {path}")
+        return manifest
+
+    def _store_file(self, path: str, on_read: Callable[[int], None]) -> Tuple[List[str], int, int]:
+        """Chunk a file into the store, returns (digests, bytes read, bytes written)"""
+        digests = []
+        size = written = 0
+        with open(path, "rb") as f:
+            for chunk in self.chunker.chunks(f):
+                if self.read_limiter is not None:
+                    self.read_limiter.consume(len(chunk))
+                digest, stored = self.store.put(chunk)
+                digests.append(digest)
+                size += len(chunk)
+                written += stored
+                on_read(len(chunk))
+        return digests, size, written
+
+    def create(self, sources: List[Tuple[str, str]], manifest_path: str,
+               previous: Optional[str] = None, progress: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Back up (source directory, name in backup) pairs into a new manifest
+
+        Blocking; run it in an executor. Returns the manifest summary with
+        the logical size and the bytes actually added to the store.
+        """
+        previous_files = {}
+        if previous:
+            try:
+                previous_files = {
+                    entry["path"]: entry for entry in self.load_manifest(previous)["entries"]
+                    if entry["type"] == "file"
+                }
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring previous manifest {previous}: {e}")
+
+        total = 0
+        for source, _ in sources:
+            for root, _, files in os.walk(source):
+                for name in files:
+                    try:
+                        total += os.lstat(os.path.join(root, name)).st_size
+                    except OSError:
+                        pass
+
+        done = 0
+
+        def on_read(n: int):
+            nonlocal done
+            done += n
+            if progress is not None:
+                progress(done, total)
+
+        entries = []
+        stats = {"files": 0, "reused_files": 0, "size": 0, "stored_bytes": 0}
+        for source, arcname in sources:
+            prefix = arcname.strip("/") or "."
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                rel = os.path.relpath(root, source)
+                base = prefix if rel == "." else os.path.join(prefix, rel)
+                try:
+                    st = os.lstat(root)
+                except FileNotFoundError:
+                    continue
+                entries.append({"path": base, "type": "dir", "mode": stat.S_IMODE(st.st_mode),
+                                "mtime_ns": st.st_mtime_ns})
+
+                for name in sorted(files) + sorted(d for d in dirs if os.path.islink(os.path.join(root, d))):
+                    path = os.path.join(root, name)
+                    entry_path = os.path.join(base, name)
+                    try:
+                        st = os.lstat(path)
+                        if stat.S_ISLNK(st.st_mode):
+                            entries.append({"path": entry_path, "type": "symlink", "target": os.readlink(path)})
+                            continue
+                        if not stat.S_ISREG(st.st_mode):
+                            continue
+
+                        entry = {"path": entry_path, "type": "file", "mode": stat.S_IMODE(st.st_mode),
+                                 "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+                        old = previous_files.get(entry_path)
+                        if (old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns
+                                and all(self.store.has(digest) for digest in old["chunks"])):
+                            # Unchanged since the last backup: don't even open it
+                            entry["chunks"] = old["chunks"]
+                            stats["reused_files"] += 1
+                            on_read(st.st_size)
+                        else:
+                            entry["chunks"], entry["size"], written = self._store_file(path, on_read)
+                            stats["stored_bytes"] += written
+                    except FileNotFoundError:
+                        # Deleted by the game server while we were walking
+                        continue
+                    entries.append(entry)
+                    stats["files"] += 1
+                    stats["size"] += entry["size"]
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "created_at": time.time(),
+            "previous": os.path.basename(previous) if previous else None,
+            "stats": stats,
+            "entries": entries,
+        }
+        tmp_path = manifest_path + ".part"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(tmp_path, manifest_path)
+
+        if progress is not None:
+            progress(total, total)
+        return stats
+
+    @staticmethod
+    def _safe_join(target: str, path: str) -> str:
+        """Join an entry path to target, refusing anything that escapes it"""
+        full = os.path.normpath(os.path.join(target, path))
+        if os.path.isabs(path) or not (full == os.path.normpath(target) or full.startswith(os.path.normpath(target) + os.sep)):
+            raise ValueError(f"Refusing to restore outside the target: {path}")
+        return full
+
+    def restore(self, manifest_path: str, target: str, prefix: str = ".", clean: bool = False) -> int:
+        """
+        Rebuild the tree described by a manifest under target
+
+        Only entries below `prefix` (a name given at backup time) are
+        restored, relative to it. With clean, anything under target that
+        is not in the manifest is removed. Returns the number of bytes written.
+        """
+        manifest = self.load_manifest(manifest_path)
+        prefix = prefix.strip("/") or "."
+        written = 0
+        directories = []
+        restored = {os.path.normpath(target)}
+
+        for entry in manifest["entries"]:
+            if prefix != ".":
+                if entry["path"] != prefix and not entry["path"].startswith(prefix + "/"):
+                    continue
+                rel = os.path.relpath(entry["path"], prefix)
+            else:
+                rel = entry["path"]
+            path = self._safe_join(target, rel)
+            restored.add(path)
+
+            if entry["type"] == "dir":
+                os.makedirs(path, exist_ok=True)
+                directories.append((path, entry))
+            elif entry["type"] == "symlink":
+                if os.path.lexists(path):
+                    os.remove(path)
+                os.symlink(entry["target"], path)
+            elif entry["type"] == "file":
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".restore"
+                with open(tmp_path, "wb") as f:
+                    for digest in entry["chunks"]:
+                        data = self.store.get(digest)
+                        f.write(data)
+                        written += len(data)
+                os.chmod(tmp_path, entry["mode"])
+                os.utime(tmp_path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                os.replace(tmp_path, path)
+
+        if clean:
+            for root, dirs, files in os.walk(target, topdown=False):
+                for name in files + dirs:
+                    path = os.path.normpath(os.path.join(root, name))
+                    if path in restored:
+                        continue
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        os.rmdir(path)
+                    else:
+                        os.remove(path)
+
+        # Directory metadata last, writing files into them changes mtimes
+        for path, entry in reversed(directories):
+            os.chmod(path, entry["mode"])
+            os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        return written
@@ -1,17 +1,35 @@
 #!/usr/bin/env python3
 import asyncio
+import collections
 import docker
+import functools
 import json
 import logging
 import os
+import re
 import signal
+import socket
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Optional
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import psutil
 
+# Allow running as a script (python daemon/daemon.py) with package imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from daemon.action_channel import ActionChannel
+from daemon.api_client import ApiClient
+from daemon.backup_engine import BackupEngine
+from daemon.backup_scheduler import BackupScheduler
+from daemon.chunk_store import IncrementalBackup, MANIFEST_SUFFIX
+from daemon.events import DockerEventWatcher, SERVER_ID_LABEL, event_action
+from daemon.io_throttle import lower_io_priority
+from daemon.stats_buffer import StatsBuffer
+from daemon.stats_stream import StatsStreamManager, parse_started_at
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,9 +57,62 @@ class PyroServerDaemon:
         self.config = self._load_config(config_path)
         self.docker_client = docker.from_env()
         self.servers: Dict[int, Dict] = {}  # Server ID -> Server info
+        self.sync_revision = 0  # Last server-list revision received from the API
+        self.servers_etag: Optional[str] = None
         self.running = True
         self.api_base_url = self.config.get("api_url", "http://localhost:8000")
         self.api_key = self.config.get("api_key", "")
+        self.api = ApiClient.from_config(self.config)
+        
+        # Worker pool for blocking Docker SDK calls made from the event loop
+        self.monitor_concurrency = max(1, self.config.get("monitor_concurrency", 16))
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.monitor_concurrency,
+            thread_name_prefix="docker-worker"
+        )
+        
+        # Persistent stats subscribers ("stream") or one-shot snapshots ("poll")
+        self.stats_mode = self.config.get("stats_mode", "stream")
+        self.stats_streams = None
+        if self.stats_mode == "stream":
+            self.stats_streams = StatsStreamManager(
+                docker.from_env(max_pool_size=self.config.get("stats_max_streams", 512)),
+                max_age=self.config.get("stats_max_age", 5)
+            )
+        
+        # Samples are buffered and sent to the API in batches
+        self.host_name = self.config.get("host_name") or socket.gethostname()
+        self.stats_buffer = StatsBuffer(
+            max_batch=self.config.get("stats_batch_size", 500),
+            max_age=self.config.get("stats_flush_interval", 10),
+            capacity=self.config.get("stats_buffer_capacity", 50000)
+        )
+        
+        # Docker events drive container state; full inspects only reconcile
+        self.docker_events = self.config.get("docker_events", True)
+        self.event_queue: Optional[asyncio.Queue] = None
+        self.event_watcher: Optional[DockerEventWatcher] = None
+        self.stopping_servers = set()  # Server IDs whose container the daemon asked to stop
+        
+        # Push-based action delivery, polling is only the fallback
+        self.action_channel = ActionChannel(self.api, self.handle_action) \
+            if self.config.get("action_channel", True) else None
+        self.active_actions = set()  # Action IDs currently running
+        self.recent_actions = collections.deque(maxlen=1000)  # Recently finished action IDs
+        
+        # Backups are archived and compressed off the event loop
+        self.backup_mode = self.config.get("backup_mode", "full")
+        self.backup_engine = BackupEngine.from_config(self.config)
+        self.incremental_backup = IncrementalBackup.from_config(self.config) \
+            if self.backup_mode == "incremental" else None
+        self.backup_scheduler = BackupScheduler.from_config(self.config)
+        self.backup_executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.get("backup_concurrency", 1)),
+            thread_name_prefix="backup",
+            initializer=lower_io_priority,
+            initargs=(self.config.get("backup_io_priority", "low"),)
+        )
+        self.backup_progress: Dict[int, float] = {}  # Server ID -> percent done
         
         # Register signal handlers
         signal.signal(signal.SIGINT, self._handle_exit)
@@ -73,81 +144,139 @@ class PyroServerDaemon:
         logger.info("Shutdown signal received, stopping daemon...")
         self.running = False
     
-    async def _fetch_servers(self) -> List[Dict]:
-        """Fetch server list from API"""
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call (Docker SDK) in the worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    async def _sync_servers(self):
+        """
+        Sync the local server cache with the API
+        
+        Only servers changed or deleted since the last known revision are
+        transferred; a 304 means nothing changed at all.
+        """
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = requests.get(f"{self.api_base_url}/api/servers", headers=headers)
+            headers = {"If-None-Match": self.servers_etag} if self.servers_etag else {}
+            response = await self.api.get(
+                "/api/servers/changes",
+                params={"since": self.sync_revision},
+                headers=headers
+            )
             
-            if response.status_code == 200:
-                return response.json()
-            else:
+            if response.status_code == 304:
+                return
+            if response.status_code != 200:
                 logger.error(f"Failed to fetch servers: {response.status_code} {response.text}")
-                return []
+                return
+            
+            changes = response.json()
+            if changes["full"]:
+                fresh = {server["id"]: server for server in changes["servers"]}
+                removed = [server_id for server_id in self.servers if server_id not in fresh]
+                self.servers = fresh
+            else:
+                for server in changes["servers"]:
+                    self.servers[server["id"]] = server
+                removed = [server_id for server_id in changes["deleted"] if server_id in self.servers]
+                for server_id in removed:
+                    del self.servers[server_id]
+            
+            for server_id in removed:
+                logger.info(f"Server {server_id} was deleted upstream")
+                self._stop_stats_stream(server_id)
+            
+            self.sync_revision = changes["revision"]
+            self.servers_etag = response.headers.get("ETag")
         except Exception as e:
             logger.error(f"Error fetching servers: {e}")
-            return []
     
     async def _update_server_status(self, server_id: int, status: str, container_id: Optional[str] = None):
         """Update server status in API"""
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}"}
             data = {"status": status}
             
             if container_id is not None:
                 data["container_id"] = container_id
             
-            response = requests.put(
-                f"{self.api_base_url}/api/servers/{server_id}/status", 
-                headers=headers,
-                json=data
-            )
+            response = await self.api.put(f"/api/servers/{server_id}/status", json=data)
             
             if response.status_code != 200:
                 logger.error(f"Failed to update server status: {response.status_code} {response.text}")
         except Exception as e:
             logger.error(f"Error updating server status: {e}")
     
-    async def _collect_server_stats(self, server_id: int, container_id: str):
+    async def _poll_server_stats(self, container) -> Dict:
+        """Take a one-shot stats snapshot (Docker samples twice, ~1-2s)"""
+        stats = await self._run_blocking(container.stats, stream=False)
+        
+        # Calculate CPU usage
+        cpu_delta = stats["cpu_stats"]["cpu_usage"]["total_usage"] - \
+                    stats["precpu_stats"]["cpu_usage"]["total_usage"]
+        system_delta = stats["cpu_stats"]["system_cpu_usage"] - \
+                      stats["precpu_stats"]["system_cpu_usage"]
+        cpu_usage = (cpu_delta / system_delta) * 100.0
+        
+        # Calculate memory usage
+        memory_usage = stats["memory_stats"]["usage"]
+        
+        # Get uptime
+        started_at = parse_started_at(container.attrs)
+        uptime = int((datetime.now(timezone.utc) - started_at).total_seconds()) if started_at else 0
+        
+        return {
+            "cpu_usage": cpu_usage,
+            "memory_usage": memory_usage,
+            "uptime": uptime
+        }
+    
+    async def _collect_server_stats(self, server_id: int, container):
         """Collect server resource usage stats"""
         try:
-            container = self.docker_client.containers.get(container_id)
-            stats = container.stats(stream=False)
-            
-            # Calculate CPU usage
-            cpu_delta = stats["cpu_stats"]["cpu_usage"]["total_usage"] - \
-                        stats["precpu_stats"]["cpu_usage"]["total_usage"]
-            system_delta = stats["cpu_stats"]["system_cpu_usage"] - \
-                          stats["precpu_stats"]["system_cpu_usage"]
-            cpu_usage = (cpu_delta / system_delta) * 100.0
-            
-            # Calculate memory usage
-            memory_usage = stats["memory_stats"]["usage"]
-            
-            # Get uptime
-            container_info = container.attrs
-            started_at = datetime.fromisoformat(container_info["State"]["StartedAt"].replace("Z", "+00:00"))
-            uptime = (datetime.now() - started_at).total_seconds()
-            
-            # Send stats to API
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            data = {
-                "cpu_usage": cpu_usage,
-                "memory_usage": memory_usage,
-                "uptime": uptime
-            }
-            
-            response = requests.post(
-                f"{self.api_base_url}/api/servers/{server_id}/stats", 
-                headers=headers,
-                json=data
-            )
+            if self.stats_streams is not None:
+                # Read the cached values kept up to date by the stats stream
+                self.stats_streams.ensure(server_id, container)
+                data = self.stats_streams.get(server_id)
+                if data is None:
+                    logger.debug(f"No stats yet for server {server_id}, stream warming up")
+                    return
+            else:
+                data = await self._poll_server_stats(container)
             
-            if response.status_code != 200:
-                logger.error(f"Failed to send server stats: {response.status_code} {response.text}")
+            await self._send_server_stats(server_id, data)
         except Exception as e:
             logger.error(f"Error collecting server stats: {e}")
     
+    async def _send_server_stats(self, server_id: int, data: Optional[Dict]):
+        """Queue a server's stats sample for the next batch"""
+        if data is None:
+            return
+        data.pop("updated_at", None)
+        
+        self.stats_buffer.add_server_sample(server_id, data)
+    
+    async def flush_stats(self, force: bool = False):
+        """Send buffered samples to the API in batches"""
+        while len(self.stats_buffer) and (force or self.stats_buffer.due()):
+            servers, hosts = self.stats_buffer.take()
+            try:
+                response = await self.api.post("/api/stats/batch", json={"servers": servers, "hosts": hosts})
+                # A 4xx other than a timeout/rate limit means the batch itself is bad
+                rejected = 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+                if response.status_code != 200 and not rejected:
+                    raise RuntimeError(f"{response.status_code} {response.text}")
+            except Exception as e:
+                # Keep the samples for the next attempt
+                self.stats_buffer.requeue(servers, hosts)
+                logger.error(f"Failed to send stats batch ({len(self.stats_buffer)} samples buffered): {e}")
+                return
+            if rejected:
+                self.stats_buffer.dropped += len(servers) + len(hosts)
+                logger.error(
+                    f"Stats batch rejected, dropping {len(servers) + len(hosts)} samples: "
+                    f"{response.status_code} {response.text}"
+                )
+    
     async def start_server(self, server_id: int, server_info: Dict):
         """Start a game server container"""
         try:
@@ -155,10 +284,10 @@ class PyroServerDaemon:
             container_id = server_info.get("container_id")
             if container_id:
                 try:
-                    container = self.docker_client.containers.get(container_id)
+                    container = await self._run_blocking(self.docker_client.containers.get, container_id)
                     if container.status != "running":
                         logger.info(f"Starting existing container for server {server_id}")
-                        container.start()
+                        await self._run_blocking(container.start)
                     else:
                         logger.info(f"Container for server {server_id} is already running")
                     
@@ -179,12 +308,14 @@ class PyroServerDaemon:
             ports = {f"{server_info['port']}/tcp": server_info['port']}
             
             # Create container
-            container = self.docker_client.containers.run(
+            container = await self._run_blocking(
+                self.docker_client.containers.run,
                 server_info["image"],
                 detach=True,
                 environment=env_vars,
                 ports=ports,
                 name=f"pyropanel-server-{server_id}",
+                labels={SERVER_ID_LABEL: str(server_id)},
                 mem_limit=f"{server_info['memory_limit']}m",
                 cpu_quota=int(server_info['cpu_limit'] * 100000),
                 restart_policy={"Name": "unless-stopped"}
@@ -206,13 +337,15 @@ class PyroServerDaemon:
                 return
             
             try:
-                container = self.docker_client.containers.get(container_id)
+                container = await self._run_blocking(self.docker_client.containers.get, container_id)
                 if container.status == "running":
                     logger.info(f"Stopping container for server {server_id}")
-                    container.stop(timeout=30)  # Give 30 seconds for graceful shutdown
+                    self.stopping_servers.add(server_id)
+                    await self._run_blocking(container.stop, timeout=30)  # Give 30 seconds for graceful shutdown
                 else:
                     logger.info(f"Container for server {server_id} is already stopped")
                 
+                self._stop_stats_stream(server_id)
                 await self._update_server_status(server_id, "stopped", container_id)
             except docker.errors.NotFound:
                 logger.warning(f"Container {container_id} not found")
@@ -230,9 +363,10 @@ class PyroServerDaemon:
                 return
             
             try:
-                container = self.docker_client.containers.get(container_id)
+                container = await self._run_blocking(self.docker_client.containers.get, container_id)
                 logger.info(f"Restarting container for server {server_id}")
-                container.restart(timeout=30)  # Give 30 seconds for graceful shutdown
+                self.stopping_servers.add(server_id)
+                await self._run_blocking(container.restart, timeout=30)  # Give 30 seconds for graceful shutdown
                 await self._update_server_status(server_id, "running", container_id)
             except docker.errors.NotFound:
                 logger.warning(f"Container {container_id} not found, starting new container")
@@ -241,129 +375,339 @@ class PyroServerDaemon:
             logger.error(f"Error restarting server {server_id}: {e}")
             await self._update_server_status(server_id, "error")
     
+    async def _backup_sources(self, server_id: int, server_info: Dict) -> List:
+        """(volume data path, mount destination) pairs of a server's volumes"""
+        container_id = server_info.get("container_id")
+        if not container_id:
+            logger.warning(f"No container ID for server {server_id}")
+            return []
+        
+        container = await self._run_blocking(self.docker_client.containers.get, container_id)
+        
+        # Get container info to find volumes
+        mounts = container.attrs.get("Mounts", [])
+        return [
+            (f"/var/lib/docker/volumes/{mount['Name']}/_data", mount["Destination"])
+            for mount in mounts if mount["Type"] == "volume"
+        ]
+    
     async def create_backup(self, server_id: int, server_info: Dict):
         """Create a backup of the game server data"""
         try:
-            container_id = server_info.get("container_id")
-            if not container_id:
-                logger.warning(f"No container ID for server {server_id}")
-                return None
-            
-            # Create backup directory if it doesn't exist
-            backup_dir = os.path.join(self.config.get("backup_dir", "backups"), str(server_id))
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Generate backup filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"{server_info['name']}_{timestamp}.tar.gz"
-            backup_path = os.path.join(backup_dir, backup_name)
-            
-            # Create backup
-            logger.info(f"Creating backup for server {server_id}")
-            container = self.docker_client.containers.get(container_id)
-            
-            # Get container info to find volumes
-            container_info = container.attrs
-            mounts = container_info.get("Mounts", [])
-            
-            if not mounts:
+            # Scheduled and on-demand backups share the per-host limit
+            async with self.backup_scheduler.semaphore:
+                return await self._create_backup(server_id, server_info)
+        except Exception as e:
+            self.backup_progress.pop(server_id, None)
+            logger.error(f"Error creating backup for server {server_id}: {e}")
+            return None
+    
+    async def _create_backup(self, server_id: int, server_info: Dict):
+        """Create a backup, raising on failure"""
+        logger.info(f"Creating backup for server {server_id}")
+        sources = await self._backup_sources(server_id, server_info)
+        if not sources:
+            logger.warning(f"No volumes found for server {server_id}")
+            return None
+        
+        # Create backup directory if it doesn't exist
+        backup_dir = os.path.join(self.config.get("backup_dir", "backups"), str(server_id))
+        os.makedirs(backup_dir, exist_ok=True)
+        
+        # Generate backup filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        incremental = self.incremental_backup is not None
+        extension = MANIFEST_SUFFIX if incremental else self.backup_engine.extension
+        backup_name = f"{server_info['name']}_{timestamp}{extension}"
+        backup_path = os.path.join(backup_dir, backup_name)
+        
+        # Archive in the backup pool so the loop keeps serving
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        progress = self._backup_progress_callback(server_id)
+        if incremental:
+            previous = IncrementalBackup.latest_manifest(backup_dir)
+            summary = await loop.run_in_executor(
+                self.backup_executor,
+                functools.partial(
+                    self.incremental_backup.create, sources, backup_path,
+                    previous=previous, progress=progress
+                )
+            )
+            # Disk cost of this backup: new chunks plus its manifest
+            backup_size = summary["stored_bytes"] + os.path.getsize(backup_path)
+            logger.info(f"Incremental backup of server {server_id}: {summary['files']} files, "
+                        f"{summary['reused_files']} unchanged, {summary['size']} bytes logical")
+        else:
+            backup_size = await loop.run_in_executor(
+                self.backup_executor,
+                functools.partial(self.backup_engine.create_archive, sources, backup_path, progress=progress)
+            )
+        self.backup_progress.pop(server_id, None)
+        
+        # Register backup in API
+        data = {
+            "name": backup_name,
+            "path": backup_path,
+            "size": backup_size,
+            "kind": "incremental" if incremental else "full"
+        }
+        
+        response = await self.api.post(f"/api/servers/{server_id}/backups", json=data)
+        
+        if response.status_code != 201:
+            logger.error(f"Failed to register backup: {response.status_code} {response.text}")
+        
+        logger.info(f"Backup created for server {server_id}: {backup_path} "
+                    f"({backup_size} bytes in {time.monotonic() - started:.1f}s)")
+        return backup_path
+    
+    async def restore_backup(self, server_id: int, server_info: Dict, manifest_path: str) -> bool:
+        """
+        Rebuild a server's volumes from an incremental backup manifest
+        
+        The server should be stopped; files not in the backup are removed.
+        """
+        try:
+            sources = await self._backup_sources(server_id, server_info)
+            if not sources:
                 logger.warning(f"No volumes found for server {server_id}")
-                return None
-            
-            # Create tar archive of volume data
-            import tarfile
-            with tarfile.open(backup_path, "w:gz") as tar:
-                for mount in mounts:
-                    if mount["Type"] == "volume":
-                        volume_name = mount["Name"]
-                        dest_path = mount["Destination"]
-                        
-                        # Add volume data to tar archive
-                        tar.add(f"/var/lib/docker/volumes/{volume_name}/_data", arcname=dest_path)
-            
-            # Get backup size
-            backup_size = os.path.getsize(backup_path)
+                return False
+            
+            store = self.incremental_backup or IncrementalBackup.from_config(self.config)
+            loop = asyncio.get_running_loop()
+            for volume_path, destination in sources:
+                written = await loop.run_in_executor(
+                    self.backup_executor,
+                    functools.partial(store.restore, manifest_path, volume_path, prefix=destination, clean=True)
+                )
+                logger.info(f"Restored {destination} of server {server_id} ({written} bytes)")
+            return True
+        except Exception as e:
+            logger.error(f"Error restoring backup for server {server_id}: {e}")
+            return False
+    
+    def _backup_progress_callback(self, server_id: int):
+        """Progress callback for the backup engine, called from the backup thread"""
+        last_logged = [0.0]
+        
+        def progress(done: int, total: int):
+            percent = 100.0 * done / total if total else 100.0
+            self.backup_progress[server_id] = percent
+            if percent - last_logged[0] >= 10 or (percent >= 100 and last_logged[0] < 100):
+                last_logged[0] = percent
+                logger.info(f"Backup of server {server_id}: {percent:.0f}% ({done}/{total} bytes)")
+        
+        return progress
+    
+    async def handle_action(self, action: Dict):
+        """
+        Execute a server action
+        
+        Returns (status, message) for the completion ack, or None when the
+        action is already running or was just handled (actions can arrive
+        both over the channel and through polling).
+        """
+        action_id = action["id"]
+        if action_id in self.active_actions or action_id in self.recent_actions:
+            return None
+        
+        self.active_actions.add(action_id)
+        try:
+            server_id = action["server_id"]
+            action_type = action["action"]
             
-            # Register backup in API
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            data = {
-                "name": backup_name,
-                "path": backup_path,
-                "size": backup_size
-            }
+            if server_id not in self.servers:
+                # The server may have been created after our last sync
+                await self._sync_servers()
+            if server_id not in self.servers:
+                return "failed", f"Unknown server {server_id}"
             
-            response = requests.post(
-                f"{self.api_base_url}/api/servers/{server_id}/backups", 
-                headers=headers,
-                json=data
-            )
+            server_info = self.servers[server_id]
             
-            if response.status_code != 201:
-                logger.error(f"Failed to register backup: {response.status_code} {response.text}")
+            if action_type == "start":
+                await self.start_server(server_id, server_info)
+            elif action_type == "stop":
+                await self.stop_server(server_id, server_info)
+            elif action_type == "restart":
+                await self.restart_server(server_id, server_info)
+            elif action_type == "backup":
+                await self.create_backup(server_id, server_info)
+            else:
+                logger.warning(f"Unknown action type: {action_type}")
+                return "failed", f"Unknown action type: {action_type}"
             
-            logger.info(f"Backup created for server {server_id}: {backup_path} ({backup_size} bytes)")
-            return backup_path
-        except Exception as e:
-            logger.error(f"Error creating backup for server {server_id}: {e}")
-            return None
+            return "completed", None
+        finally:
+            self.active_actions.discard(action_id)
+            self.recent_actions.append(action_id)
     
     async def check_pending_actions(self):
-        """Check for pending server actions"""
+        """Check for pending server actions (fallback when the action channel is down)"""
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = requests.get(f"{self.api_base_url}/api/actions/pending", headers=headers)
+            response = await self.api.get("/api/actions/pending")
             
             if response.status_code == 200:
                 actions = response.json()
                 
                 for action in actions:
-                    server_id = action["server_id"]
-                    action_type = action["action"]
+                    result = await self.handle_action(action)
+                    if result is None:
+                        continue
                     
-                    if server_id in self.servers:
-                        server_info = self.servers[server_id]
-                        
-                        if action_type == "start":
-                            await self.start_server(server_id, server_info)
-                        elif action_type == "stop":
-                            await self.stop_server(server_id, server_info)
-                        elif action_type == "restart":
-                            await self.restart_server(server_id, server_info)
-                        elif action_type == "backup":
-                            await self.create_backup(server_id, server_info)
-                        else:
-                            logger.warning(f"Unknown action type: {action_type}")
-                        
-                        # Mark action as completed
-                        requests.put(
-                            f"{self.api_base_url}/api/actions/{action['id']}/complete", 
-                            headers=headers
-                        )
+                    # Mark action as completed
+                    status, message = result
+                    await self.api.put(
+                        f"/api/actions/{action['id']}/complete",
+                        json={"status": status, "message": message}
+                    )
         except Exception as e:
             logger.error(f"Error checking pending actions: {e}")
     
-    async def monitor_servers(self):
-        """Monitor running servers and collect stats"""
+    def _stop_stats_stream(self, server_id: int):
+        """Tear down the stats stream of a server that is no longer running"""
+        if self.stats_streams is not None:
+            self.stats_streams.stop(server_id)
+    
+    async def _monitor_server(self, server_id: int, server_info: Dict, inspect: bool = True):
+        """Check a single server's container and collect its stats"""
+        try:
+            if not inspect and self.stats_streams is not None and self.stats_streams.has_stream(server_id):
+                # State is kept current by Docker events, only read cached stats
+                await self._send_server_stats(server_id, self.stats_streams.get(server_id))
+                return
+            
+            container = await self._run_blocking(self.docker_client.containers.get, server_info["container_id"])
+            if container.status == "running":
+                await self._collect_server_stats(server_id, container)
+            else:
+                logger.warning(f"Container for server {server_id} is not running: {container.status}")
+                self._stop_stats_stream(server_id)
+                await self._update_server_status(server_id, container.status, server_info["container_id"])
+        except docker.errors.NotFound:
+            logger.warning(f"Container {server_info['container_id']} for server {server_id} not found")
+            self._stop_stats_stream(server_id)
+            await self._update_server_status(server_id, "error", None)
+        except Exception as e:
+            logger.error(f"Error monitoring server {server_id}: {e}")
+    
+    async def monitor_servers(self, reconcile: bool = True):
+        """
+        Monitor running servers and collect stats
+        
+        Servers are checked concurrently, at most `monitor_concurrency` at a
+        time, and the whole pass is bounded by `monitor_deadline` seconds.
+        Checks still running at the deadline are cancelled and picked up
+        again on the next pass.
+        
+        With `reconcile` off, containers that already have a stats stream
+        are not inspected: Docker events keep their state up to date.
+        """
+        targets = [
+            (server_id, server_info)
+            for server_id, server_info in list(self.servers.items())
+            if server_info.get("status") == "running" and server_info.get("container_id")
+        ]
+        if self.stats_streams is not None:
+            self.stats_streams.prune(server_id for server_id, _ in targets)
+        if not targets:
+            return
+        
+        deadline = self.config.get("monitor_deadline", self.config.get("update_interval", 10))
+        semaphore = asyncio.Semaphore(self.monitor_concurrency)
+        
+        async def bounded(server_id: int, server_info: Dict):
+            async with semaphore:
+                await self._monitor_server(server_id, server_info, inspect=reconcile)
+        
+        tasks = [asyncio.ensure_future(bounded(server_id, server_info)) for server_id, server_info in targets]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        
+        if pending:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"Monitoring pass hit the {deadline}s deadline, {len(pending)}/{len(tasks)} servers skipped")
+    
+    def _server_for_event(self, event: Dict) -> Optional[int]:
+        """Resolve the server ID a container event belongs to"""
+        actor = event.get("Actor") or {}
+        attributes = actor.get("Attributes") or {}
+        
+        label = attributes.get(SERVER_ID_LABEL)
+        if label and label.isdigit():
+            return int(label)
+        
+        container_id = actor.get("ID") or event.get("id")
         for server_id, server_info in self.servers.items():
-            if server_info.get("status") == "running" and server_info.get("container_id"):
-                try:
-                    container = self.docker_client.containers.get(server_info["container_id"])
-                    if container.status == "running":
-                        await self._collect_server_stats(server_id, server_info["container_id"])
-                    else:
-                        logger.warning(f"Container for server {server_id} is not running: {container.status}")
-                        await self._update_server_status(server_id, container.status, server_info["container_id"])
-                except docker.errors.NotFound:
-                    logger.warning(f"Container {server_info['container_id']} for server {server_id} not found")
-                    await self._update_server_status(server_id, "error", None)
-                except Exception as e:
-                    logger.error(f"Error monitoring server {server_id}: {e}")
+            if container_id and server_info.get("container_id") == container_id:
+                return server_id
+        
+        # Containers created before labels were added
+        match = re.fullmatch(r"pyropanel-server-(\d+)", attributes.get("name", ""))
+        return int(match.group(1)) if match else None
+    
+    async def _handle_docker_event(self, event: Dict):
+        """Apply a container event to the local cache and report it"""
+        server_id = self._server_for_event(event)
+        if server_id is None or server_id not in self.servers:
+            return
+        
+        action = event_action(event)
+        attributes = (event.get("Actor") or {}).get("Attributes") or {}
+        container_id = (event.get("Actor") or {}).get("ID") or event.get("id")
+        
+        if action == "start":
+            status = "running"
+            self.stopping_servers.discard(server_id)
+        elif action == "die":
+            # SIGTERM/SIGKILL from a requested stop exit nonzero (143/137) too
+            requested = server_id in self.stopping_servers
+            status = "stopped" if requested or attributes.get("exitCode", "0") == "0" else "error"
+        elif action == "oom":
+            logger.warning(f"Container for server {server_id} ran out of memory")
+            status = "error"
+        elif action == "stop":
+            status = "stopped"
+        elif action == "destroy":
+            status = "stopped"
+            self.stopping_servers.discard(server_id)
+        elif action == "health_status":
+            health = (event.get("Action") or event.get("status") or "").split(":", 1)[-1].strip()
+            status = "error" if health == "unhealthy" else "running"
+        else:
+            return
+        
+        if status != "running":
+            self._stop_stats_stream(server_id)
+        
+        server_info = self.servers[server_id]
+        if action == "destroy":
+            server_info["container_id"] = None
+        elif container_id:
+            server_info["container_id"] = container_id
+        
+        if server_info.get("status") == status:
+            return
+        
+        logger.info(f"Server {server_id} is now {status} (docker event: {action})")
+        server_info["status"] = status
+        await self._update_server_status(server_id, status, server_info.get("container_id"))
+    
+    async def process_docker_events(self):
+        """Consume container events forwarded by the event watcher"""
+        while True:
+            event = await self.event_queue.get()
+            try:
+                await self._handle_docker_event(event)
+            except Exception as e:
+                logger.error(f"Error handling docker event: {e}")
     
     async def collect_system_stats(self):
         """Collect system-wide resource usage stats"""
         try:
-            # Get CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # Get CPU usage since the previous call (non-blocking)
+            cpu_percent = psutil.cpu_percent(interval=None)
             
             # Get memory usage
             memory = psutil.virtual_memory()
@@ -377,9 +721,9 @@ class PyroServerDaemon:
             disk_total = disk.total
             disk_percent = disk.percent
             
-            # Send stats to API
-            headers = {"Authorization": f"Bearer {self.api_key}"}
+            # Queue stats for the next batch
             data = {
+                "host": self.host_name,
                 "cpu_percent": cpu_percent,
                 "memory_used": memory_used,
                 "memory_total": memory_total,
@@ -389,14 +733,7 @@ class PyroServerDaemon:
                 "disk_percent": disk_percent
             }
             
-            response = requests.post(
-                f"{self.api_base_url}/api/system/stats", 
-                headers=headers,
-                json=data
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to send system stats: {response.status_code} {response.text}")
+            self.stats_buffer.add_host_sample(data)
         except Exception as e:
             logger.error(f"Error collecting system stats: {e}")
     
@@ -404,46 +741,74 @@ class PyroServerDaemon:
         """Main daemon loop"""
         update_interval = self.config.get("update_interval", 10)
         stats_interval = self.config.get("stats_interval", 60)
-        backup_interval = self.config.get("backup_interval", 86400)  # Default: daily
+        reconcile_interval = self.config.get("reconcile_interval", 300)
         
         last_stats_time = 0
-        last_backup_time = 0
+        last_reconcile_time = 0
         
         logger.info("Starting PyroPanel Daemon main loop")
         
+        events_task = None
+        if self.docker_events:
+            self.event_queue = asyncio.Queue()
+            self.event_watcher = DockerEventWatcher(self.docker_client, asyncio.get_running_loop(), self.event_queue)
+            self.event_watcher.start()
+            events_task = asyncio.ensure_future(self.process_docker_events())
+        
+        channel_task = None
+        if self.action_channel is not None:
+            channel_task = asyncio.ensure_future(self.action_channel.run())
+        
         while self.running:
             try:
-                # Fetch servers from API
-                servers = await self._fetch_servers()
-                
-                # Update local server cache
-                for server in servers:
-                    self.servers[server["id"]] = server
+                # Sync server cache with the API
+                await self._sync_servers()
                 
-                # Check for pending actions
-                await self.check_pending_actions()
+                # Poll for pending actions only while the action channel is down
+                if self.action_channel is None or not self.action_channel.connected:
+                    await self.check_pending_actions()
                 
-                # Monitor running servers
-                await self.monitor_servers()
+                # Monitor running servers, with a full reconcile now and then
+                current_time = time.time()
+                reconcile = not self.docker_events or current_time - last_reconcile_time >= reconcile_interval
+                await self.monitor_servers(reconcile=reconcile)
+                if reconcile:
+                    last_reconcile_time = current_time
                 
                 # Collect system stats periodically
-                current_time = time.time()
                 if current_time - last_stats_time >= stats_interval:
                     await self.collect_system_stats()
                     last_stats_time = current_time
                 
-                # Create scheduled backups
-                if current_time - last_backup_time >= backup_interval:
-                    for server_id, server_info in self.servers.items():
-                        if server_info.get("status") == "running" and server_info.get("container_id"):
-                            await self.create_backup(server_id, server_info)
-                    last_backup_time = current_time
+                # Send buffered stats
+                await self.flush_stats()
+                
+                # Start scheduled backups in the background, staggered over the interval
+                for server_id in self.backup_scheduler.due(self.servers.keys(), current_time):
+                    server_info = self.servers[server_id]
+                    if server_info.get("status") == "running" and server_info.get("container_id"):
+                        self.backup_scheduler.submit(server_id, self.create_backup(server_id, server_info))
                 
                 # Sleep until next update
                 await asyncio.sleep(update_interval)
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
                 await asyncio.sleep(update_interval)
+        
+        if self.event_watcher is not None:
+            self.event_watcher.stop()
+        if events_task is not None:
+            events_task.cancel()
+        if channel_task is not None:
+            channel_task.cancel()
+        await self.backup_scheduler.close()
+        await self.flush_stats(force=True)
+        await self.api.close()
+        if self.stats_streams is not None:
+            self.stats_streams.close()
+        self.executor.shutdown(wait=False)
+        self.backup_executor.shutdown(wait=False)
+        self.backup_engine.close()
     
     def start(self):
         """Start the daemon"""
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+# Container event actions the daemon reacts to
+WATCHED_ACTIONS = ("start", "die", "oom", "stop", "destroy", "health_status")
+
+# Label set on containers created by the daemon
+SERVER_ID_LABEL = "pyropanel.server_id"
+
+
+def event_action(event: Dict) -> str:
+    """Normalize an event action ("health_status: healthy" -> "health_status")"""
+    return (event.get("Action") or event.get("status") or "").split(":", 1)[0].strip()
+
+
+class DockerEventWatcher(threading.Thread):
+    """
+    Subscribes to the Docker events stream and forwards container events
+
+    The blocking events generator runs in this thread; every watched event
+    is handed to the daemon's asyncio queue with call_soon_threadsafe. If
+    the stream drops (dockerd restart), it reconnects and resumes from the
+    last event time so nothing in between is lost.
+    """
+
+    def __init__(self, docker_client, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue,
+                 reconnect_delay: float = 2.0):
+        super().__init__(name="docker-events", daemon=True)
+        self.docker_client = docker_client
+        self.loop = loop
+        self.queue = queue
+        self.reconnect_delay = reconnect_delay
+        self._stop_event = threading.Event()
+        self._stream = None
+        self._since: Optional[int] = None
+
+    def stop(self):
+        """Stop watching and close the events connection"""
+        self._stop_event.set()
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+
+    def run(self):
+        filters = {"type": "container", "event": list(WATCHED_ACTIONS)}
+        while not self._stop_event.is_set():
+            try:
+                self._stream = self.docker_client.events(decode=True, filters=filters, since=self._since)
+                for event in self._stream:
+                    if self._stop_event.is_set():
+                        break
+                    self._since = event.get("time", self._since)
+                    self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                logger.warning(f"Docker events stream interrupted: {e}")
+
+            if not self._stop_event.is_set():
+                if self._since is None:
+                    self._since = int(time.time())
+                self._stop_event.wait(self.reconnect_delay)
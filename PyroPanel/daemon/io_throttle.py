@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+import psutil
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+IO_PRIORITIES = ("normal", "low", "idle")
+
+
+class BandwidthLimiter:
+    """
+    Token bucket limiting bytes per second, shared by all backup threads
+
+    consume() blocks the calling thread until the bytes fit the budget. The
+    bucket may go into debt so a large read waits proportionally instead of
+    being rejected.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_mb(cls, mb_per_second: float) -> Optional["BandwidthLimiter"]:
+        """Limiter for a MB/s setting, None when unlimited"""
+        if not mb_per_second or mb_per_second <= 0:
+            return None
+        return cls(mb_per_second * 1024 * 1024)
+
+    def consume(self, n: int):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ThrottledWriter:
+    """File wrapper whose writes go through a BandwidthLimiter"""
+
+    def __init__(self, fileobj, limiter: BandwidthLimiter):
+        self.fileobj = fileobj
+        self.limiter = limiter
+
+    def write(self, data) -> int:
+        self.limiter.consume(len(data))
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def lower_io_priority(priority: str = "low"):
+    """
+    Lower the disk priority of the calling thread (Linux, best effort)
+
+    Used as the initializer of the backup thread pool. Only schedulers
+    that honour I/O classes (BFQ, CFQ) take it into account.
+    """
+    if priority == "normal" or not hasattr(psutil, "IOPRIO_CLASS_IDLE"):
+        return
+    try:
+        thread = psutil.Process(threading.get_native_id())
+        if priority == "idle":
+            thread.ionice(psutil.IOPRIO_CLASS_IDLE)
+        else:
+            thread.ionice(psutil.IOPRIO_CLASS_BE, value=7)
+    except (psutil.Error, OSError) as e:
+        logger.warning(f"Could not lower backup I/O priority: {e}")
@@ -0,0 +1,67 @@
+import collections
+import time
+from typing import Dict, List, Tuple
+
+
+class StatsBuffer:
+    """
+    In-memory buffer of stats samples waiting to be sent to the API
+
+    Samples are flushed in one batch once `max_batch` are queued or the
+    oldest is `max_age` seconds old. A failed flush puts the batch back at
+    the front, so short API outages only delay samples; a batch the API
+    rejects as invalid is dropped instead of retried. The buffer holds
+    at most `capacity` samples; on a long outage the oldest are dropped.
+    """
+
+    def __init__(self, max_batch: int = 500, max_age: float = 10.0, capacity: int = 50000):
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.capacity = capacity
+        self._servers: collections.deque = collections.deque()
+        self._hosts: collections.deque = collections.deque()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._servers) + len(self._hosts)
+
+    def add_server_sample(self, server_id: int, data: Dict):
+        """Queue a sample for one server"""
+        self._servers.append({"server_id": server_id, "timestamp": time.time(), **data})
+        self._trim()
+
+    def add_host_sample(self, data: Dict):
+        """Queue a host-wide sample"""
+        self._hosts.append({"timestamp": time.time(), **data})
+        self._trim()
+
+    def _oldest_timestamp(self):
+        timestamps = [queue[0]["timestamp"] for queue in (self._servers, self._hosts) if queue]
+        return min(timestamps) if timestamps else None
+
+    def due(self) -> bool:
+        """Whether a flush should happen now"""
+        if len(self) >= self.max_batch:
+            return True
+        oldest = self._oldest_timestamp()
+        return oldest is not None and time.time() - oldest >= self.max_age
+
+    def take(self) -> Tuple[List[Dict], List[Dict]]:
+        """Remove and return up to max_batch samples (servers, hosts)"""
+        hosts = [self._hosts.popleft() for _ in range(min(len(self._hosts), self.max_batch))]
+        remaining = self.max_batch - len(hosts)
+        servers = [self._servers.popleft() for _ in range(min(len(self._servers), remaining))]
+        return servers, hosts
+
+    def requeue(self, servers: List[Dict], hosts: List[Dict]):
+        """Put a batch that failed to send back at the front"""
+        self._servers.extendleft(reversed(servers))
+        self._hosts.extendleft(reversed(hosts))
+        self._trim()
+
+    def _trim(self):
+        """Drop the oldest samples beyond capacity"""
+        while len(self) > self.capacity:
+            queue = self._servers if len(self._servers) >= len(self._hosts) else self._hosts
+            queue.popleft()
+            self.dropped += 1
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger("PyroPanel-Daemon")
+
+
+def parse_started_at(container_attrs: Dict) -> Optional[datetime]:
+    """Parse a container's State.StartedAt into an aware datetime"""
+    started_at = container_attrs.get("State", {}).get("StartedAt")
+    if not started_at or started_at.startswith("0001-"):
+        return None
+    # Docker reports nanoseconds, fromisoformat only accepts microseconds
+    started_at = started_at.replace("Z", "")
+    if "." in started_at:
+        seconds, fraction = started_at.split(".", 1)
+        started_at = f"{seconds}.{fraction[:6]}"
+    return datetime.fromisoformat(started_at).replace(tzinfo=timezone.utc)
+
+
+def _sum_network(frame: Dict):
+    """Total received/transmitted bytes across all container networks"""
+    rx = tx = 0
+    for net in (frame.get("networks") or {}).values():
+        rx += net.get("rx_bytes", 0)
+        tx += net.get("tx_bytes", 0)
+    return rx, tx
+
+
+def _sum_blkio(frame: Dict):
+    """Total read/written bytes from the block I/O counters"""
+    read = write = 0
+    entries = (frame.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+    for entry in entries:
+        op = entry.get("op", "").lower()
+        if op == "read":
+            read += entry.get("value", 0)
+        elif op == "write":
+            write += entry.get("value", 0)
+    return read, write
+
+
+class ContainerStatsStream(threading.Thread):
+    """
+    Long-lived subscriber to Docker's streaming stats for one container
+
+    Docker pushes one decoded frame per second on a single connection; each
+    frame is turned into rates against the previous one and kept as the
+    latest snapshot. The stream ends by itself when the container stops.
+    """
+
+    def __init__(self, server_id: int, docker_api, container_id: str, started_at: Optional[datetime]):
+        super().__init__(name=f"stats-{server_id}", daemon=True)
+        self.server_id = server_id
+        self.docker_api = docker_api
+        self.container_id = container_id
+        self.started_at = started_at
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict] = None
+        self._previous = None  # (monotonic time, rx, tx, read, write)
+
+    def stop(self):
+        """Ask the stream to stop after the next frame"""
+        self._stop_event.set()
+
+    @property
+    def latest(self) -> Optional[Dict]:
+        with self._lock:
+            return dict(self._latest) if self._latest else None
+
+    def run(self):
+        try:
+            for frame in self.docker_api.stats(self.container_id, stream=True, decode=True):
+                if self._stop_event.is_set():
+                    break
+                self._handle_frame(frame)
+        except Exception as e:
+            if not self._stop_event.is_set():
+                logger.warning(f"Stats stream for server {self.server_id} ended: {e}")
+        finally:
+            self._stop_event.set()
+
+    def _handle_frame(self, frame: Dict):
+        """Decode one stats frame into the latest snapshot"""
+        now = time.monotonic()
+        cpu_stats = frame.get("cpu_stats") or {}
+        precpu_stats = frame.get("precpu_stats") or {}
+
+        cpu_usage = 0.0
+        cpu_delta = cpu_stats.get("cpu_usage", {}).get("total_usage", 0) - \
+                    precpu_stats.get("cpu_usage", {}).get("total_usage", 0)
+        system_delta = cpu_stats.get("system_cpu_usage", 0) - precpu_stats.get("system_cpu_usage", 0)
+        if cpu_delta > 0 and system_delta > 0:
+            cpu_usage = (cpu_delta / system_delta) * 100.0
+
+        memory_stats = frame.get("memory_stats") or {}
+        rx, tx = _sum_network(frame)
+        read, write = _sum_blkio(frame)
+
+        rates = {"net_rx_rate": 0.0, "net_tx_rate": 0.0, "blk_read_rate": 0.0, "blk_write_rate": 0.0}
+        if self._previous is not None:
+            prev_time, prev_rx, prev_tx, prev_read, prev_write = self._previous
+            elapsed = now - prev_time
+            if elapsed > 0:
+                rates = {
+                    "net_rx_rate": max(0, rx - prev_rx) / elapsed,
+                    "net_tx_rate": max(0, tx - prev_tx) / elapsed,
+                    "blk_read_rate": max(0, read - prev_read) / elapsed,
+                    "blk_write_rate": max(0, write - prev_write) / elapsed,
+                }
+        self._previous = (now, rx, tx, read, write)
+
+        snapshot = {
+            "cpu_usage": cpu_usage,
+            "memory_usage": memory_stats.get("usage", 0),
+            "memory_limit": memory_stats.get("limit", 0),
+            **rates,
+            "updated_at": now,
+        }
+        with self._lock:
+            self._latest = snapshot
+
+
+class StatsStreamManager:
+    """Keeps one ContainerStatsStream per running server"""
+
+    def __init__(self, docker_client, max_age: float = 5.0):
+        """
+        docker_client should be dedicated to streaming: every stream holds
+        one connection open for as long as the container runs.
+        """
+        self.docker_client = docker_client
+        self.max_age = max_age
+        self._streams: Dict[int, ContainerStatsStream] = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, server_id: int, container):
+        """Start a stream for the container unless a live one exists"""
+        with self._lock:
+            stream = self._streams.get(server_id)
+            if stream is not None and stream.is_alive() and stream.container_id == container.id:
+                return
+            if stream is not None:
+                stream.stop()
+
+            stream = ContainerStatsStream(
+                server_id,
+                self.docker_client.api,
+                container.id,
+                parse_started_at(container.attrs),
+            )
+            self._streams[server_id] = stream
+            stream.start()
+            logger.debug(f"Started stats stream for server {server_id}")
+
+    def has_stream(self, server_id: int) -> bool:
+        """Whether a live stream exists for a server"""
+        with self._lock:
+            stream = self._streams.get(server_id)
+        return stream is not None and stream.is_alive()
+
+    def stop(self, server_id: int):
+        """Tear down the stream for a server, if any"""
+        with self._lock:
+            stream = self._streams.pop(server_id, None)
+        if stream is not None:
+            stream.stop()
+            logger.debug(f"Stopped stats stream for server {server_id}")
+
+    def prune(self, active_server_ids: Iterable[int]):
+        """Stop streams for servers that are no longer running"""
+        active = set(active_server_ids)
+        with self._lock:
+            stale = [server_id for server_id in self._streams if server_id not in active]
+        for server_id in stale:
+            self.stop(server_id)
+
+    def get(self, server_id: int) -> Optional[Dict]:
+        """Latest snapshot for a server, or None if missing or stale"""
+        with self._lock:
+            stream = self._streams.get(server_id)
+        if stream is None:
+            return None
+
+        snapshot = stream.latest
+        if snapshot is None or time.monotonic() - snapshot["updated_at"] > self.max_age:
+            return None
+
+        if stream.started_at is not None:
+            snapshot["uptime"] = int((datetime.now(timezone.utc) - stream.started_at).total_seconds())
+        else:
+            snapshot["uptime"] = 0
+        return snapshot
+
+    def close(self):
+        """Stop all streams"""
+        with self._lock:
+            streams = list(self._streams.values())
+            self._streams.clear()
+        for stream in streams:
+            stream.stop()
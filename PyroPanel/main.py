@@ -49,41 +49,41 @@ def start_daemon():
         logger.info("Daemon stopped by user")
 
 def setup_database():
-    """Set up the database"""
-    from app.database import engine
-    from app import models
+    """Set up the database (applies pending migrations)"""
+    from app.migrations import upgrade_database
     
     logger.info("Setting up database")
-    models.Base.metadata.create_all(bind=engine)
+    upgrade_database()
     logger.info("Database setup complete")
 
 def create_admin_user(username, password, email):
     """Create an admin user"""
-    from sqlalchemy.orm import Session
-    from app.database import SessionLocal
+    import asyncio
+    from app.database import AsyncSessionLocal, async_engine
     from app import crud, schemas
     
     logger.info(f"Creating admin user: {username}")
     
-    db = SessionLocal()
-    try:
-        # Check if user already exists
-        db_user = crud.get_user_by_username(db, username=username)
-        if db_user:
-            logger.warning(f"User {username} already exists")
-            return
-        
-        # Create user
-        user_create = schemas.UserCreate(
-            username=username,
-            password=password,
-            email=email,
-            role="admin"
-        )
-        crud.create_user(db=db, user=user_create)
-        logger.info(f"Admin user {username} created successfully")
-    finally:
-        db.close()
+    async def create():
+        async with AsyncSessionLocal() as db:
+            # Check if user already exists
+            db_user = await crud.get_user_by_username(db, username=username)
+            if db_user:
+                logger.warning(f"User {username} already exists")
+                return
+            
+            # Create user
+            user_create = schemas.UserCreate(
+                username=username,
+                password=password,
+                email=email,
+                role="admin"
+            )
+            await crud.create_user(db=db, user=user_create)
+            logger.info(f"Admin user {username} created successfully")
+        await async_engine.dispose()
+    
+    asyncio.run(create())
 
 def main():
     """Main entry point"""
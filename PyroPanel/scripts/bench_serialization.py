@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Compare the server list serialization paths.
+
+"model" is the response_model path: ORM objects (children selectin-loaded)
+validated into schemas.Server and encoded by pydantic. "rows" is the fast path: plain rows
+shaped into dicts and encoded with orjson. Each size runs against a fresh
+temporary SQLite database.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+def seed(engine, count: int, variables: int, backups: int):
+    """Insert `count` servers with variables and backups"""
+    from sqlalchemy import insert
+    from app import models
+
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "username": "bench", "email": "bench@example.com",
+                                            "hashed_password": "", "role": "admin"}])
+        conn.execute(insert(models.Server), [
+            {"id": i, "name": f"server-{i}", "description": "benchmark server", "game_type": "minecraft",
+             "image": "itzg/minecraft-server", "status": "running", "memory_limit": 2048, "cpu_limit": 1.5,
+             "disk_limit": 10240, "port": 25565 + i % 1000, "owner_id": 1, "revision": i, "updated_at": now}
+            for i in range(1, count + 1)
+        ])
+        conn.execute(insert(models.ServerVariable), [
+            {"key": f"VAR_{j}", "value": str(j), "server_id": i}
+            for i in range(1, count + 1) for j in range(variables)
+        ])
+        if backups:
+            conn.execute(insert(models.Backup), [
+                {"name": f"backup-{j}.tar.gz", "path": f"/backups/{i}/backup-{j}.tar.gz", "size": 1 << 30,
+                 "kind": "full", "server_id": i}
+                for i in range(1, count + 1) for j in range(backups)
+            ])
+
+async def model_path(db, count: int):
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from app import crud, models, schemas
+
+    adapter = TypeAdapter(List[schemas.Server])
+    start = time.perf_counter()
+    result = await db.scalars(select(models.Server).options(*crud.SERVER_DETAIL_OPTIONS).order_by(models.Server.id).limit(count))
+    servers = result.all()
+    loaded = time.perf_counter()
+    body = adapter.dump_json(adapter.validate_python(servers, from_attributes=True))
+    return loaded - start, time.perf_counter() - loaded, body
+
+async def rows_path(db, count: int):
+    from app import crud, serialization
+
+    start = time.perf_counter()
+    servers = await crud.get_server_dicts(db, limit=count)
+    loaded = time.perf_counter()
+    body = serialization.dumps(servers)
+    return loaded - start, time.perf_counter() - loaded, body
+
+async def run(count: int, repeat: int):
+    from app.database import AsyncSessionLocal, async_engine
+
+    results = {}
+    for name, path in (("model", model_path), ("rows", rows_path)):
+        timings = []
+        for _ in range(repeat):
+            # Fresh session each round, so nothing is served from the identity map
+            async with AsyncSessionLocal() as db:
+                timings.append(await path(db, count))
+        results[name] = (min(t[0] for t in timings), min(t[1] for t in timings), timings[-1][2])
+    await async_engine.dispose()
+    return results
+
+def bench(count: int, variables: int, backups: int, repeat: int):
+    """Benchmark one size against a new database"""
+    directory = tempfile.mkdtemp(prefix="pyropanel-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/bench.db"
+    for module in [m for m in sys.modules if m == "app" or m.startswith("app.")]:
+        del sys.modules[module]
+
+    from app.database import engine
+    from app.migrations import upgrade_database
+
+    upgrade_database()
+    seed(engine, count, variables, backups)
+    results = asyncio.run(run(count, repeat))
+    engine.dispose()
+
+    if json.loads(results["model"][2]) != json.loads(results["rows"][2]):
+        print(f"{count} servers: output differs between paths")
+        sys.exit(1)
+
+    print(f"{count} servers ({len(results['rows'][2]) / 1024:.0f} KiB, best of {repeat}):")
+    for name, (load, encode, _) in results.items():
+        print(f"  {name:5}  load {load * 1000:8.1f} ms  encode {encode * 1000:8.1f} ms  total {(load + encode) * 1000:8.1f} ms")
+    model_total = sum(results["model"][:2])
+    rows_total = sum(results["rows"][:2])
+    print(f"  speedup {model_total / rows_total:.1f}x")
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark server list serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Server counts to benchmark")
+    parser.add_argument("--variables", type=int, default=5, help="Variables per server")
+    parser.add_argument("--backups", type=int, default=2, help="Backups per server")
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds per path, the best is reported")
+    
+    args = parser.parse_args()
+    
+    for count in args.sizes:
+        bench(count, args.variables, args.backups, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 Initialize the database with a default admin user.
 """
 
+import asyncio
 import os
 import sys
 import argparse
@@ -11,20 +12,24 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.database import engine, SessionLocal
-from app import models, schemas, crud
+from app.database import async_engine, AsyncSessionLocal
+from app import schemas, crud
+from app.migrations import upgrade_database
 from app.auth import get_password_hash
 
 def init_db(username, password, email):
     """Initialize the database with a default admin user."""
-    # Create tables
-    models.Base.metadata.create_all(bind=engine)
+    # Create or upgrade tables
+    upgrade_database()
     
     # Create admin user
-    db = SessionLocal()
-    try:
+    asyncio.run(create_admin(username, password, email))
+
+async def create_admin(username, password, email):
+    """Create the admin user unless it already exists."""
+    async with AsyncSessionLocal() as db:
         # Check if user already exists
-        db_user = crud.get_user_by_username(db, username=username)
+        db_user = await crud.get_user_by_username(db, username=username)
         if db_user:
             print(f"User {username} already exists")
             return
@@ -36,10 +41,9 @@ def init_db(username, password, email):
             email=email,
             role="admin"
         )
-        crud.create_user(db=db, user=user_create)
+        await crud.create_user(db=db, user=user_create)
         print(f"Admin user {username} created successfully")
-    finally:
-        db.close()
+    await async_engine.dispose()
 
 def main():
     """Main entry point."""
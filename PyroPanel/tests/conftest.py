@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The app reads its settings at import time, so point it at a scratch
+# database and backup directory before any test module imports it
+_tmp = tempfile.mkdtemp(prefix="pyropanel-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["BACKUP_DIR"] = os.path.join(_tmp, "backups")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.migrations import upgrade_database
+
+upgrade_database()
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run fn(db) in a fresh async session"""
+    from app.database import AsyncSessionLocal, async_engine
+
+    def run(fn):
+        async def go():
+            async with AsyncSessionLocal() as db:
+                result = await fn(db)
+            await async_engine.dispose()
+            return result
+        return asyncio.run(go())
+    return run
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def login(client):
+    """Authorization headers for a user whose password is pw"""
+    def login(username: str) -> dict:
+        response = client.post("/token", data={"username": username, "password": "pw"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return login
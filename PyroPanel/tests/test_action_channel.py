@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+
+
+@pytest.fixture(scope="module")
+def action_id(run):
+    async def setup(db):
+        admin = await crud.create_user(db, schemas.UserCreate(
+            username="channel-daemon", email="channel-daemon@example.com", password="pw", role="admin"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="channel", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=admin.id)
+        action = await crud.create_action(db, server.id, "start", admin.id)
+        return action.id
+    return run(setup)
+
+
+def action_status(action_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(models.ServerAction.status).filter_by(id=action_id).scalar()
+    finally:
+        db.close()
+
+
+def test_malformed_acks_are_skipped(client, login, action_id):
+    with client.websocket_connect("/api/actions/ws", headers=login("channel-daemon")) as websocket:
+        websocket.send_text("not json")
+        websocket.send_json({"type": "ack", "id": "abc"})
+        websocket.send_json({"type": "ack"})
+        websocket.send_json(["ack"])
+        websocket.send_json({"type": "ack", "id": action_id, "status": "failed", "message": "boom"})
+
+        # Only reached if the channel survived the frames above
+        deadline = time.monotonic() + 5
+        while action_status(action_id) != "failed" and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert action_status(action_id) == "failed"
+
+
+def test_query_token_is_rejected(client, login, action_id):
+    token = login("channel-daemon")["Authorization"].split(" ", 1)[1]
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/api/actions/ws?token={token}") as websocket:
+            websocket.receive_json()
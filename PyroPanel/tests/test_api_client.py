@@ -0,0 +1,67 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from daemon.api_client import ApiClient
+
+
+async def call(method: str, status: int, retries: int = 2) -> tuple:
+    """Send one request to a server that always answers `status`; returns (status, requests received)"""
+    hits = []
+
+    async def handler(request):
+        hits.append(request.method)
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_route("*", "/api/test", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    client = ApiClient(f"http://127.0.0.1:{port}", retries=retries, backoff=0)
+    try:
+        response = await client.request(method, "/api/test")
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return response.status_code, len(hits)
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT"])
+def test_idempotent_requests_are_retried(method):
+    assert asyncio.run(call(method, 503)) == (503, 3)
+
+
+@pytest.mark.parametrize("status", [502, 503, 504])
+def test_post_is_not_retried_after_reaching_the_api(status):
+    assert asyncio.run(call("POST", status)) == (status, 1)
+
+
+def test_rate_limited_post_is_retried():
+    assert asyncio.run(call("POST", 429)) == (429, 3)
+
+
+def test_post_is_retried_when_the_connection_fails():
+    attempts = []
+
+    class Client(ApiClient):
+        def _retry_delay(self, attempt):
+            attempts.append(attempt)
+            return 0
+
+    async def go():
+        # Nothing listens on port 9 (discard) here, so every connect is refused
+        client = Client("http://127.0.0.1:9", retries=2)
+        try:
+            await client.post("/api/stats/batch", json={})
+        finally:
+            await client.close()
+
+    with pytest.raises(aiohttp.ClientConnectorError):
+        asyncio.run(go())
+    assert attempts == [0, 1]
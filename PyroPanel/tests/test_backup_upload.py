@@ -0,0 +1,35 @@
+import gzip
+import os
+
+from app import crud, schemas
+from app.backup_routes import BACKUP_DIR
+
+
+def test_upload_with_pending_part_file_conflicts(run, client, login):
+    async def setup(db):
+        owner = await crud.create_user(db, schemas.UserCreate(username="uploader", email="uploader@example.com", password="pw"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="uploads", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=owner.id)
+        return server.id
+
+    server_id = run(setup)
+    headers = login("uploader")
+    archive = gzip.compress(b"world" * 1000)
+
+    # Another upload of the same name is still being written
+    backup_dir = os.path.join(BACKUP_DIR, str(server_id))
+    os.makedirs(backup_dir, exist_ok=True)
+    part_path = os.path.join(backup_dir, "world.tar.gz.part")
+    with open(part_path, "wb") as f:
+        f.write(archive[:10])
+
+    response = client.post(f"/servers/{server_id}/backups/upload?name=world.tar.gz", content=archive, headers=headers)
+    assert response.status_code == 409
+    assert os.path.exists(part_path)
+
+    os.remove(part_path)
+    response = client.post(f"/servers/{server_id}/backups/upload?name=world.tar.gz", content=archive, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["size"] == len(archive)
@@ -0,0 +1,67 @@
+"""
+Chunker boundaries must not move: existing chunk stores only deduplicate
+against new backups if the same content is cut at the same places.
+"""
+
+import io
+import random
+
+import pytest
+
+from daemon.chunk_store import GEAR, Chunker
+
+
+def reference_cut_point(chunker: Chunker, data, end: int) -> int:
+    """Byte-at-a-time gear hash the vectorized Chunker has to agree with"""
+    if end <= chunker.min_size:
+        return end
+    limit = min(end, chunker.max_size)
+    normal = min(chunker.avg_size, limit)
+    gear = [int(g) for g in GEAR]
+    h = 0
+    for i in range(chunker.min_size, limit):
+        h = ((h << 1) + gear[data[i]]) & ((1 << 64) - 1)
+        if not h & (chunker.mask_s if i < normal else chunker.mask_l):
+            return i + 1
+    return limit
+
+
+def reference_chunks(chunker: Chunker, data: bytes):
+    sizes = []
+    while data:
+        cut = reference_cut_point(chunker, data, len(data))
+        sizes.append(cut)
+        data = data[cut:]
+    return sizes
+
+SIZES = [
+    dict(min_size=64, avg_size=256, max_size=1024),
+    dict(min_size=2048, avg_size=8192, max_size=32768),
+    dict(min_size=1000, avg_size=4096, max_size=5000),
+]
+
+
+@pytest.mark.parametrize("sizes", SIZES)
+@pytest.mark.parametrize("content", ["random", "zeros", "repeating"])
+def test_chunks_match_reference(sizes, content):
+    length = 200_000
+    if content == "random":
+        data = random.Random(0).randbytes(length)
+    elif content == "zeros":
+        data = bytes(length)
+    else:
+        data = (b"PyroPanel" * length)[:length]
+    chunker = Chunker(**sizes)
+
+    chunks = list(chunker.chunks(io.BytesIO(data), read_size=7000))
+
+    assert b"".join(chunks) == data
+    assert [len(chunk) for chunk in chunks] == reference_chunks(chunker, data)
+
+
+def test_insert_only_changes_nearby_chunks():
+    data = random.Random(1).randbytes(300_000)
+    chunker = Chunker(**SIZES[1])
+    before = set(chunker.chunks(io.BytesIO(data)))
+    after = set(chunker.chunks(io.BytesIO(data[:1000] + b"inserted" + data[1000:])))
+    assert len(before - after) <= 2
@@ -0,0 +1,81 @@
+import time
+
+from sqlalchemy import func, select
+
+from app import crud, models, schemas, timeseries
+from app.database import SessionLocal
+
+
+def test_delete_server_removes_dependent_rows(run):
+    async def setup(db):
+        owner = await crud.create_user(db, schemas.UserCreate(username="delete-owner", email="delete-owner@example.com", password="pw"))
+        guest = await crud.create_user(db, schemas.UserCreate(username="delete-guest", email="delete-guest@example.com", password="pw"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="doomed", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+            variables=[schemas.ServerVariableCreate(key="EULA", value="TRUE")],
+        ), user_id=owner.id)
+        await crud.create_backup(db, schemas.BackupCreate(name="b", path="/backups/b.tar.gz", size=1), server.id)
+        await crud.add_user_to_server(db, server.id, guest.id)
+        await crud.create_action(db, server.id, "start", owner.id)
+        await crud.ingest_stats(db, schemas.StatsBatch(servers=[
+            schemas.ServerStatsSample(server_id=server.id, timestamp=int(time.time()), cpu_usage=1.0, memory_usage=1)
+        ]))
+        db.add(models.ServerStatRollup(server_id=server.id, resolution=60, bucket=0, samples=1))
+        await db.commit()
+        return server.id
+
+    server_id = run(setup)
+    assert run(lambda db: crud.delete_server(db, server_id)).id == server_id
+
+    async def remaining(db):
+        counts = {}
+        for model in (models.Server, models.ServerVariable, models.Backup, models.ServerAction,
+                      models.ServerStatSample, models.ServerStatRollup):
+            column = model.id if model is models.Server else model.server_id
+            counts[model.__tablename__] = await db.scalar(select(func.count()).where(column == server_id))
+        association = models.user_server_association
+        counts[association.name] = await db.scalar(
+            select(func.count()).select_from(association).where(association.c.server_id == server_id))
+        counts["server_tombstones"] = await db.scalar(
+            select(func.count()).where(models.ServerTombstone.server_id == server_id))
+        return counts
+
+    counts = run(remaining)
+    assert counts.pop("server_tombstones") == 1
+    assert counts == dict.fromkeys(counts, 0)
+
+
+def test_pruned_tombstones_force_a_full_sync(run, client, login):
+    async def setup(db):
+        admin = await crud.create_user(db, schemas.UserCreate(
+            username="tombstone-admin", email="tombstone-admin@example.com", password="pw", role="admin"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="pruned", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=admin.id)
+        synced = await crud.get_revision(db)
+        await crud.delete_server(db, server.id)
+        return server.id, synced
+
+    server_id, synced = run(setup)
+    headers = login("tombstone-admin")
+
+    def changes(since: int) -> dict:
+        return client.get("/api/servers/changes", params={"since": since}, headers=headers).json()
+
+    assert changes(synced)["deleted"] == [server_id]
+
+    db = SessionLocal()
+    try:
+        timeseries.prune_tombstones(db, int(time.time()) + timeseries.TOMBSTONE_RETENTION + 60)
+        db.commit()
+        remaining = db.query(models.ServerTombstone).filter_by(server_id=server_id).count()
+    finally:
+        db.close()
+    assert remaining == 0
+
+    # The deletion can no longer be sent as a delta
+    stale = changes(synced)
+    assert stale["full"] and server_id not in [server["id"] for server in stale["servers"]]
+    assert not changes(stale["revision"])["full"]
@@ -0,0 +1,45 @@
+import asyncio
+
+from daemon.daemon import PyroServerDaemon
+from daemon.events import SERVER_ID_LABEL
+
+
+def make_daemon() -> PyroServerDaemon:
+    daemon = PyroServerDaemon.__new__(PyroServerDaemon)
+    daemon.servers = {1: {"status": "running", "container_id": "abc123"}}
+    daemon.stats_streams = None
+    daemon.stopping_servers = set()
+    daemon.reported = []
+
+    async def update_server_status(server_id, status, container_id=None):
+        daemon.reported.append(status)
+    daemon._update_server_status = update_server_status
+    return daemon
+
+
+def event(action: str, **attributes) -> dict:
+    return {"Type": "container", "Action": action,
+            "Actor": {"ID": "abc123", "Attributes": {SERVER_ID_LABEL: "1", **attributes}}}
+
+
+def test_requested_stop_is_not_an_error():
+    daemon = make_daemon()
+    daemon.stopping_servers.add(1)
+
+    asyncio.run(daemon._handle_docker_event(event("die", exitCode="143")))
+
+    assert daemon.reported == ["stopped"]
+
+
+def test_crash_is_an_error():
+    daemon = make_daemon()
+    daemon.stopping_servers.add(1)
+
+    async def crash():
+        await daemon._handle_docker_event(event("start"))
+        await daemon._handle_docker_event(event("die", exitCode="1"))
+
+    asyncio.run(crash())
+
+    # Already running, so only the crash is reported
+    assert daemon.reported == ["error"]
@@ -0,0 +1,20 @@
+import asyncio
+
+from app import fleet_stats
+
+
+def test_concurrent_misses_compute_once(run, monkeypatch):
+    calls = []
+    compute_dashboard = fleet_stats.compute_dashboard
+
+    def counting_compute_dashboard(db, top_n):
+        calls.append(top_n)
+        return compute_dashboard(db, top_n)
+
+    monkeypatch.setattr(fleet_stats, "compute_dashboard", counting_compute_dashboard)
+    cache = fleet_stats.FleetStatsCache(ttl=60)
+
+    results = run(lambda db: asyncio.gather(*[cache.get(top_n=3) for _ in range(5)]))
+
+    assert calls == [3]
+    assert all(result is results[0] for result in results)
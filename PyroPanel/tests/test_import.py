@@ -0,0 +1,28 @@
+import tracemalloc
+import zlib
+
+import pytest
+
+from app import crud, schemas
+
+
+@pytest.fixture(scope="module")
+def admin_headers(run, login):
+    run(lambda db: crud.create_user(db, schemas.UserCreate(
+        username="import-admin", email="import-admin@example.com", password="pw", role="admin")))
+    return login("import-admin")
+
+
+def test_gzip_bomb_is_rejected_without_inflating(client, admin_headers):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    body = compressor.compress(b"\0" * (64 * 1024 * 1024)) + compressor.flush()
+
+    tracemalloc.start()
+    try:
+        response = client.post("/admin/import/servers", content=body, headers=admin_headers)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 413
+    assert peak < 16 * 1024 * 1024
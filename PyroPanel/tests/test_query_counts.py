@@ -0,0 +1,115 @@
+"""
+Query-count regression tests for server listings
+
+A page of servers must cost the same number of queries whatever it holds;
+a lazy load sneaking into the list path shows up here as a count that
+grows with the page.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, schemas
+from app.database import async_engine
+
+
+@contextmanager
+def count_queries():
+    """Collect the statements the async engine executes inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def server(name: str) -> schemas.ServerCreate:
+    return schemas.ServerCreate(
+        name=name, game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+        cpu_limit=1.0, disk_limit=1024, port=25565,
+        variables=[schemas.ServerVariableCreate(key=f"VAR_{i}", value=str(i)) for i in range(3)],
+    )
+
+
+async def add_servers(db, user_id: int, count: int, shared_with=None):
+    created = await crud.create_servers(db, [server(f"server-{i}") for i in range(count)], user_id=user_id)
+    for db_server in created:
+        await crud.create_backup(db, schemas.BackupCreate(name="b", path="/backups/b.tar.gz", size=1), db_server.id)
+        if shared_with is not None:
+            await crud.add_user_to_server(db, db_server.id, shared_with)
+    return created
+
+
+@pytest.fixture(scope="module")
+def users(run):
+    admin = run(lambda db: crud.create_user(db, schemas.UserCreate(
+        username="admin", email="admin@example.com", password="pw", role="admin")))
+    owner = run(lambda db: crud.create_user(db, schemas.UserCreate(
+        username="owner", email="owner@example.com", password="pw")))
+    guest = run(lambda db: crud.create_user(db, schemas.UserCreate(
+        username="guest", email="guest@example.com", password="pw")))
+    return admin.id, owner.id, guest.id
+
+
+def list_queries(client, headers: dict):
+    with count_queries() as statements:
+        response = client.get("/servers/", params={"limit": 100}, headers=headers)
+    assert response.status_code == 200
+    return len(response.json()), len(statements)
+
+
+@pytest.mark.parametrize("username", ["admin", "guest"])
+def test_list_servers_query_count_is_constant(run, client, login, users, username):
+    _, owner_id, guest_id = users
+    headers = login(username)
+    # Authenticate once so the principal cache is warm for both measurements
+    client.get("/users/me", headers=headers)
+
+    run(lambda db: add_servers(db, owner_id, 2, shared_with=guest_id))
+    small, small_queries = list_queries(client, headers)
+    run(lambda db: add_servers(db, owner_id, 20, shared_with=guest_id))
+    large, large_queries = list_queries(client, headers)
+
+    assert large == small + 20
+    assert large_queries == small_queries
+
+
+def test_get_server_dicts_query_count(run, users):
+    _, owner_id, guest_id = users
+    run(lambda db: add_servers(db, owner_id, 10, shared_with=guest_id))
+
+    for user_id in (None, guest_id):
+        with count_queries() as statements:
+            servers = run(lambda db: crud.get_server_dicts(db, limit=100, user_id=user_id))
+        assert len(servers) >= 10
+        assert all(s["variables"] and s["backups"] for s in servers if s["owner_id"] == owner_id)
+        # servers, variables, backups
+        assert len(statements) == 3
+
+
+def test_get_server_does_not_load_children(run, users):
+    _, owner_id, _ = users
+    server_id = run(lambda db: add_servers(db, owner_id, 1))[0].id
+
+    with count_queries() as statements:
+        run(lambda db: crud.get_server(db, server_id))
+    assert len(statements) == 1
+
+
+def test_status_update_returns_children(run, client, login, users):
+    _, owner_id, _ = users
+    server_id = run(lambda db: add_servers(db, owner_id, 1))[0].id
+
+    response = client.put(f"/api/servers/{server_id}/status", json={"status": "running", "container_id": "abc"},
+                          headers=login("admin"))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "running"
+    assert len(body["variables"]) == 3 and len(body["backups"]) == 1
@@ -0,0 +1,91 @@
+import time
+
+from app import crud, models, schemas, timeseries
+from app.database import SessionLocal
+
+
+def test_late_samples_are_rolled_up(run):
+    async def setup(db):
+        owner = await crud.create_user(db, schemas.UserCreate(username="rollups", email="rollups@example.com", password="pw"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="rollups", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=owner.id)
+        return server.id
+
+    server_id = run(setup)
+    base = timeseries._floor(int(time.time()) - 3 * timeseries.HOUR, timeseries.HOUR)
+
+    def ingest(*samples):
+        batch = schemas.StatsBatch(servers=[
+            schemas.ServerStatsSample(server_id=server_id, timestamp=ts, cpu_usage=cpu, memory_usage=1)
+            for ts, cpu in samples
+        ])
+        run(lambda db: crud.ingest_stats(db, batch))
+
+    def maintenance(now: int):
+        db = SessionLocal()
+        try:
+            timeseries.run_maintenance(db, now)
+        finally:
+            db.close()
+
+    def rollup(resolution: int):
+        db = SessionLocal()
+        try:
+            row = db.query(models.ServerStatRollup).filter_by(
+                server_id=server_id, resolution=resolution, bucket=base).one()
+            return row.samples, row.cpu_avg, row.cpu_max
+        finally:
+            db.close()
+
+    ingest((base + 10, 10.0))
+    maintenance(base + 2 * timeseries.HOUR)
+    assert rollup(timeseries.MINUTE) == (1, 10.0, 10.0)
+    assert rollup(timeseries.HOUR) == (1, 10.0, 10.0)
+
+    # Buffered by a daemon and delivered after both buckets were rolled up
+    ingest((base + 30, 30.0), (base + 90, 50.0))
+    maintenance(base + 2 * timeseries.HOUR + 60)
+    assert rollup(timeseries.MINUTE) == (2, 20.0, 30.0)
+    assert rollup(timeseries.HOUR) == (3, 30.0, 50.0)
+
+
+def test_concurrent_late_marker_insert(run, monkeypatch):
+    name = f"rollup:race:{timeseries.MINUTE}"
+    db = SessionLocal()
+    try:
+        db.add(models.SyncCounter(name=name, value=1000))
+        db.commit()
+    finally:
+        db.close()
+
+    lower_late_marker = timeseries.lower_late_marker
+    calls = []
+
+    def racing_lower_late_marker(marker_name, ts):
+        calls.append(ts)
+        if len(calls) > 1:
+            return lower_late_marker(marker_name, ts)
+        # Another ingest creates the marker between our update and insert
+        other = SessionLocal()
+        try:
+            other.add(models.SyncCounter(name=timeseries.late_marker(marker_name), value=900))
+            other.commit()
+        finally:
+            other.close()
+        return lower_late_marker(f"{marker_name}:missing", ts)
+
+    monkeypatch.setattr(timeseries, "lower_late_marker", racing_lower_late_marker)
+
+    async def mark(db):
+        await crud._mark_late_samples(db, "race", 500)
+        await db.commit()
+
+    run(mark)
+    db = SessionLocal()
+    try:
+        marker = db.query(models.SyncCounter.value).filter_by(name=timeseries.late_marker(name)).scalar()
+    finally:
+        db.close()
+    assert marker == 500
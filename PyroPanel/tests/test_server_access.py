@@ -0,0 +1,24 @@
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+
+
+def test_repeat_grant_is_a_no_op(run):
+    async def setup(db):
+        owner = await crud.create_user(db, schemas.UserCreate(username="access-owner", email="access-owner@example.com", password="pw"))
+        guest = await crud.create_user(db, schemas.UserCreate(username="access-guest", email="access-guest@example.com", password="pw"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="shared", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=owner.id)
+        return server.id, guest.id
+
+    server_id, guest_id = run(setup)
+    first = run(lambda db: crud.add_user_to_server(db, server_id, guest_id))
+    second = run(lambda db: crud.add_user_to_server(db, server_id, guest_id))
+
+    association = models.user_server_association
+    grants = run(lambda db: db.scalar(
+        select(func.count()).select_from(association).where(association.c.server_id == server_id)))
+    assert grants == 1
+    assert second.revision == first.revision
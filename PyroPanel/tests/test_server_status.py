@@ -0,0 +1,20 @@
+from app import crud, schemas
+
+
+def test_unchanged_status_keeps_revision(run):
+    async def setup(db):
+        owner = await crud.create_user(db, schemas.UserCreate(username="status-owner", email="status-owner@example.com", password="pw"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="status", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=owner.id)
+        return server.id
+
+    server_id = run(setup)
+    started = run(lambda db: crud.update_server_status(db, server_id, "running", "abc123"))
+    repeated = run(lambda db: crud.update_server_status(db, server_id, "running"))
+    stopped = run(lambda db: crud.update_server_status(db, server_id, "stopped"))
+
+    assert repeated.revision == started.revision
+    assert stopped.revision > started.revision
+    assert (stopped.status, stopped.container_id) == ("stopped", "abc123")
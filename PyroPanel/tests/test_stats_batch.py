@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from daemon.api_client import ApiResponse
+from daemon.daemon import PyroServerDaemon
+from daemon.stats_buffer import StatsBuffer
+from daemon.stats_stream import ContainerStatsStream, StatsStreamManager
+
+
+FRAME = {
+    "cpu_stats": {"cpu_usage": {"total_usage": 2_000_000}, "system_cpu_usage": 40_000_000},
+    "precpu_stats": {"cpu_usage": {"total_usage": 1_000_000}, "system_cpu_usage": 20_000_000},
+    "memory_stats": {"usage": 512 * 1024 * 1024, "limit": 1024 * 1024 * 1024},
+    "networks": {"eth0": {"rx_bytes": 1000, "tx_bytes": 2000}},
+}
+STARTED_AT = datetime.now(timezone.utc) - timedelta(seconds=90.5)
+
+
+class AppApi:
+    """Stands in for ApiClient, sending requests through the app's TestClient"""
+
+    def __init__(self, client, headers: dict):
+        self.client = client
+        self.headers = headers
+
+    async def post(self, path: str, json=None) -> ApiResponse:
+        response = self.client.post(path, json=json, headers=self.headers)
+        return ApiResponse(response.status_code, response.headers, response.content)
+
+
+class FakeContainer:
+    id = "abc123"
+    attrs = {"State": {"StartedAt": STARTED_AT.isoformat()}}
+
+    def stats(self, stream: bool):
+        return FRAME
+
+
+def make_daemon(api) -> PyroServerDaemon:
+    daemon = PyroServerDaemon.__new__(PyroServerDaemon)
+    daemon.api = api
+    daemon.host_name = "test-host"
+    daemon.stats_buffer = StatsBuffer()
+    daemon.executor = ThreadPoolExecutor(max_workers=1)
+    daemon.stats_streams = StatsStreamManager(docker_client=None)
+    return daemon
+
+
+def sample_count(run, server_id: int) -> int:
+    async def count(db):
+        return await db.scalar(select(func.count()).select_from(models.ServerStatSample)
+                               .where(models.ServerStatSample.server_id == server_id))
+    return run(count)
+
+
+@pytest.fixture(scope="module")
+def daemon_headers(run, login):
+    run(lambda db: crud.create_user(db, schemas.UserCreate(
+        username="stats-daemon", email="stats-daemon@example.com", password="pw", role="admin")))
+    return login("stats-daemon")
+
+
+def test_daemon_snapshots_are_accepted(run, client, daemon_headers):
+    async def setup(db):
+        owner = await crud.create_user(db, schemas.UserCreate(
+            username="stats-owner", email="stats-owner@example.com", password="pw"))
+        server = await crud.create_server(db, schemas.ServerCreate(
+            name="stats", game_type="minecraft", image="itzg/minecraft-server", memory_limit=1024,
+            cpu_limit=1.0, disk_limit=1024, port=25565,
+        ), user_id=owner.id)
+        return server.id
+
+    server_id = run(setup)
+    daemon = make_daemon(AppApi(client, daemon_headers))
+
+    # One snapshot from a stats stream, one from a one-shot poll
+    stream = ContainerStatsStream(server_id, None, FakeContainer.id, STARTED_AT)
+    stream._handle_frame(FRAME)
+    daemon.stats_streams._streams[server_id] = stream
+
+    async def collect():
+        await daemon._send_server_stats(server_id, daemon.stats_streams.get(server_id))
+        await daemon._send_server_stats(server_id, await daemon._poll_server_stats(FakeContainer()))
+        await daemon.collect_system_stats()
+        await daemon.flush_stats(force=True)
+
+    asyncio.run(collect())
+    daemon.executor.shutdown()
+
+    assert len(daemon.stats_buffer) == 0
+    assert daemon.stats_buffer.dropped == 0
+    assert sample_count(run, server_id) == 2
+
+
+def test_rejected_batch_is_dropped(client, daemon_headers):
+    daemon = make_daemon(AppApi(client, daemon_headers))
+    daemon.stats_buffer.add_server_sample(1, {"cpu_usage": "busy", "memory_usage": 1})
+
+    asyncio.run(daemon.flush_stats(force=True))
+
+    assert len(daemon.stats_buffer) == 0
+    assert daemon.stats_buffer.dropped == 1